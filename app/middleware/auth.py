@@ -1,6 +1,7 @@
 from functools import wraps
 from core.response import Response
 from services.auth_service import get_authenticated_user
+from utils.trace import span
 
 
 def require_auth(handler):
@@ -25,7 +26,8 @@ def require_auth(handler):
             response.status(401, "Unauthorized")
             return response.to_bytes()
 
-        username = get_authenticated_user(auth_token)
+        with span('auth'):
+            username = get_authenticated_user(auth_token)
 
         if not username:
             response = Response.bad_request(b"Invalid or expired token")
@@ -58,7 +60,8 @@ def optional_auth(handler):
         request.user = None
 
         if auth_token:
-            username = get_authenticated_user(auth_token)
+            with span('auth'):
+                username = get_authenticated_user(auth_token)
             if username:
                 request.user = username
 
@@ -6,7 +6,8 @@ from models.session import verify_xsrf_token
 def require_xsrf(handler):
     """Middleware decorator to require XSRF token validation.
 
-    Validates XSRF token from request body against stored token for user.
+    Validates XSRF token from request body against the user's session
+    (stored token in db mode, signature check in hmac mode).
     Only enforces if user is authenticated (request.user exists).
 
     Usage:
@@ -31,7 +32,9 @@ def require_xsrf(handler):
             response.status(403, "Forbidden")
             return response.to_bytes()
 
-        if not verify_xsrf_token(username, xsrf_token):
+        auth_token = request.cookies.get('auth_token')
+
+        if not verify_xsrf_token(username, xsrf_token, auth_token):
             response = Response.bad_request(b"Invalid XSRF token")
             response.status(403, "Forbidden")
             return response.to_bytes()
@@ -0,0 +1,60 @@
+"""Compare GET /chat-messages latency with the message cache cold and warm.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python -m bench.bench_chat_history [messages] [requests]
+"""
+import os
+import sys
+import time
+
+from pymongo import MongoClient
+
+from bench.common import report
+import database.connection as connection
+from core.request import Request
+from models import message
+from routes.chat import handle_get_messages
+
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
+BENCH_DB_NAME = 'chat-server-bench'
+
+
+def run(requests: int, cold: bool) -> list[float]:
+    request_bytes = b'GET /chat-messages HTTP/1.1\r\nHost: localhost\r\n\r\n'
+    samples = []
+
+    for _ in range(requests):
+        if cold:
+            message.clear_cache()
+        request = Request(request_bytes)
+        start = time.perf_counter()
+        handle_get_messages(request)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return samples
+
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    client = MongoClient(MONGO_URI)
+    client.drop_database(BENCH_DB_NAME)
+    db = client[BENCH_DB_NAME]
+    connection.ensure_indexes(db)
+    connection.db_instance = db
+
+    print(f"Seeding {message_count} messages...")
+    for i in range(message_count):
+        message.create_message("bench", f"message {i}")
+
+    report("cold", run(requests, cold=True), width=6)
+    message.clear_cache()
+    report("warm", run(requests, cold=False), width=6)
+    print(f"cache stats: {message.get_cache_stats()}")
+
+    client.drop_database(BENCH_DB_NAME)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Measure login throughput and unrelated-endpoint latency during a login storm.
+
+Run against a live server:
+    BENCH_HOST=localhost BENCH_PORT=8080 python -m bench.bench_login_storm [login_threads] [seconds]
+"""
+import http.client
+import os
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+from bench.common import report
+
+BENCH_HOST = os.environ.get('BENCH_HOST', 'localhost')
+BENCH_PORT = int(os.environ.get('BENCH_PORT', 8080))
+PASSWORD = "Bench123!"
+
+
+def request(method: str, path: str, body: dict = None) -> int:
+    connection = http.client.HTTPConnection(BENCH_HOST, BENCH_PORT, timeout=60)
+    try:
+        headers = {}
+        encoded = None
+        if body is not None:
+            encoded = urlencode(body)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        connection.request(method, path, body=encoded, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def login_storm(username: str, stop: threading.Event, statuses: list):
+    while not stop.is_set():
+        statuses.append(request('POST', '/login', {'username': username, 'password': PASSWORD}))
+
+
+def probe_unrelated(stop: threading.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        request('GET', '/chat-messages?limit=20')
+        samples.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.01)
+
+
+def main():
+    login_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    username = f"bench_{uuid.uuid4().hex[:8]}"
+    request('POST', '/register', {'username': username, 'password': PASSWORD})
+
+    baseline_stop = threading.Event()
+    baseline = []
+    probe = threading.Thread(target=probe_unrelated, args=(baseline_stop, baseline))
+    probe.start()
+    time.sleep(min(duration, 3))
+    baseline_stop.set()
+    probe.join()
+
+    stop = threading.Event()
+    statuses = []
+    during = []
+    threads = [threading.Thread(target=login_storm, args=(username, stop, statuses)) for _ in range(login_threads)]
+    threads.append(threading.Thread(target=probe_unrelated, args=(stop, during)))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    ok = statuses.count(200)
+    rejected = statuses.count(503)
+    print(f"logins: {ok / elapsed:.1f}/s ok, {rejected / elapsed:.1f}/s rejected (503), {len(statuses)} total")
+    report("GET /chat-messages idle:", baseline, width=25, precision=2)
+    report("GET /chat-messages storm:", during, width=25, precision=2)
+
+
+if __name__ == '__main__':
+    main()
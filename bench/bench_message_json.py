@@ -0,0 +1,68 @@
+"""Compare building GET /chat-messages bodies with json.dumps against
+joining pre-serialized message fragments.
+
+Pages are requested at random positions in the history so that, at large
+sizes, some fragments are not cached and have to be serialized.
+
+Usage:
+    python -m bench.bench_message_json [requests] [limit] [sizes ...]
+
+Sizes default to 1000 10000 100000 messages, held in the memory backend.
+"""
+import json
+import random
+import sys
+import time
+
+from bench.common import report
+from database.backends.memory import MemoryBackend
+from database.storage import set_backend
+from models import message
+from services.chat_service import encode_messages, get_messages
+
+
+def seed(count: int) -> list[str]:
+    backend = MemoryBackend()
+    set_backend(backend)
+    message.clear_cache()
+
+    cursors = []
+    for i in range(count):
+        doc = message.create_message("bench", f"message {i} with a little more text to serialize")
+        cursors.append(message.encode_cursor(doc))
+    return cursors
+
+
+def run(cursors: list[str], requests: int, limit: int, fragments: bool) -> list[float]:
+    rng = random.Random(42)
+    samples = []
+
+    for _ in range(requests):
+        before = rng.choice(cursors)
+        start = time.perf_counter()
+        messages, next_cursor = get_messages(limit, before)
+        if fragments:
+            encode_messages(messages, next=next_cursor)
+        else:
+            json.dumps({'messages': messages, 'next': next_cursor}).encode()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return samples
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else message.DEFAULT_PAGE_SIZE
+    sizes = [int(size) for size in sys.argv[3:]] or [1000, 10000, 100000]
+
+    for size in sizes:
+        cursors = seed(size)
+        report(f"{size} json.dumps", run(cursors, requests, limit, fragments=False), width=18)
+        report(f"{size} fragments", run(cursors, requests, limit, fragments=True), width=18)
+        print(f"json cache: {message.message_json_cache.stats()}")
+
+    set_backend(None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Compare the hot-path operations across storage backends.
+
+Usage:
+    python -m bench.bench_storage [operations] [backend ...]
+
+Backends default to memory and sqlite; add mongo (MONGO_URI) to include it.
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo import MongoClient
+
+from bench.common import report
+import database.connection as connection
+from database.backends.memory import MemoryBackend
+from database.backends.mongo import MongoBackend
+from database.backends.sqlite import SQLiteBackend
+
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
+BENCH_DB_NAME = 'chat-server-bench'
+
+
+def timed(samples: list[float], fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    samples.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def run(backend, operations: int) -> dict[str, list[float]]:
+    samples = {'insert_message': [], 'list_messages': [], 'find_session': [], 'insert_session': []}
+    now = datetime.now(timezone.utc)
+    hashes = []
+
+    for n in range(operations):
+        timed(samples['insert_message'], backend.insert_message, {
+            'id': str(uuid.uuid4()),
+            'username': 'bench',
+            'message': f'message {n}',
+            'created_at': time.time()
+        })
+
+        token_hash = uuid.uuid4().hex
+        hashes.append(token_hash)
+        timed(samples['insert_session'], backend.insert_session, {
+            'username': 'bench',
+            'hash': token_hash,
+            'access_token': token_hash,
+            'created_at': now,
+            'expires_at': now + timedelta(hours=1)
+        })
+
+    for n in range(operations):
+        timed(samples['find_session'], backend.find_session, hashes[n])
+        timed(samples['list_messages'], backend.list_messages, 50)
+
+    return samples
+
+
+def report_backend(name: str, samples: dict[str, list[float]]):
+    for operation, values in samples.items():
+        label = f"{name} {operation}"
+        report(label, values, width=28, precision=4)
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    names = sys.argv[2:] or ['memory', 'sqlite']
+
+    for name in names:
+        if name == 'memory':
+            report_backend(name, run(MemoryBackend(), operations))
+
+        elif name == 'sqlite':
+            with tempfile.TemporaryDirectory() as tmp:
+                backend = SQLiteBackend(os.path.join(tmp, 'bench.db'))
+                backend.ensure_schema()
+                report_backend(name, run(backend, operations))
+
+        elif name == 'mongo':
+            client = MongoClient(MONGO_URI)
+            client.drop_database(BENCH_DB_NAME)
+            db = client[BENCH_DB_NAME]
+            connection.ensure_indexes(db)
+            report_backend(name, run(MongoBackend(db), operations))
+            client.drop_database(BENCH_DB_NAME)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Compare per-request XSRF verification cost in db and hmac modes.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python -m bench.bench_xsrf [requests]
+"""
+import os
+import sys
+import time
+
+from pymongo import MongoClient
+
+from bench.common import report
+import database.connection as connection
+from models import session
+
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017')
+BENCH_DB_NAME = 'chat-server-bench'
+
+
+def run(requests: int, username: str, xsrf_token: str, auth_token: str, clear_cache: bool) -> list[float]:
+    samples = []
+
+    for _ in range(requests):
+        if clear_cache:
+            session.clear_session_cache()
+        start = time.perf_counter()
+        assert session.verify_xsrf_token(username, xsrf_token, auth_token)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return samples
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    client = MongoClient(MONGO_URI)
+    client.drop_database(BENCH_DB_NAME)
+    db = client[BENCH_DB_NAME]
+    connection.ensure_indexes(db)
+    connection.db_instance = db
+
+    session.XSRF_MODE = 'db'
+    auth_token, db_token = session.create_session_with_xsrf("bench")
+    report("db (uncached)", run(requests, "bench", db_token, auth_token, clear_cache=True), precision=4)
+    report("db (cached)", run(requests, "bench", db_token, auth_token, clear_cache=False), precision=4)
+
+    session.XSRF_MODE = 'hmac'
+    auth_token, hmac_token = session.create_session_with_xsrf("bench")
+    report("hmac", run(requests, "bench", hmac_token, auth_token, clear_cache=False), precision=4)
+
+    client.drop_database(BENCH_DB_NAME)
+
+
+if __name__ == '__main__':
+    main()
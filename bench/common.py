@@ -0,0 +1,14 @@
+"""Helpers shared by the benchmarks."""
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+
+def report(label: str, samples: list[float], width: int = 14, precision: int = 3):
+    """Print p50, p99 and mean of samples (milliseconds) after label."""
+    print(f"{label:<{width}} p50={percentile(samples, 50):.{precision}f}ms "
+          f"p99={percentile(samples, 99):.{precision}f}ms "
+          f"mean={sum(samples) / len(samples):.{precision}f}ms")
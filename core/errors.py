@@ -0,0 +1,4 @@
+class ServiceUnavailable(Exception):
+    """A dependency is saturated or down; the request should get a 503."""
+
+    retry_after = 1
@@ -0,0 +1,238 @@
+import os
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+from core.request import Request
+from core.response import Response, StreamingResponse, FileSegment
+
+# More ranges than this in one request are ignored and the whole file is sent
+MAX_RANGES = 16
+# Prefix of nginx's internal file locations (e.g. /_accel). When set, file
+# routes answer with X-Accel-Redirect and nginx sends the bytes; when empty
+# this process sends them itself.
+X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '').rstrip('/')
+
+
+class RangeNotSatisfiable(ValueError):
+    """None of the requested byte ranges overlap the file."""
+
+
+def parse_byte_ranges(header: str, size: int) -> list[tuple[int, int]] | None:
+    """Parse a Range header into sorted, merged (start, end) pairs, end inclusive.
+
+    Returns:
+        list: The ranges to send, or None if the header should be ignored
+            (malformed, another unit, or too many ranges)
+
+    Raises:
+        RangeNotSatisfiable: If the header is valid but no range overlaps the file
+    """
+    unit, sep, specs = header.partition('=')
+    if not sep or unit.strip().lower() != 'bytes':
+        return None
+
+    specs = [spec.strip() for spec in specs.split(',') if spec.strip()]
+    if not specs or len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        first, dash, last = spec.partition('-')
+        if not dash:
+            return None
+
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else max(start, size - 1)
+                if start < 0 or end < start:
+                    return None
+            else:
+                suffix = int(last)
+                if suffix < 0:
+                    return None
+                if suffix == 0:
+                    continue
+                start, end = max(0, size - suffix), size - 1
+        except ValueError:
+            return None
+
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable(header)
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def make_etag(stat: os.stat_result) -> str:
+    """Strong validator from the file's size and modification time."""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _if_range_matches(value: str, etag: str, mtime: float) -> bool:
+    value = value.strip()
+    if value.startswith('"') or value.startswith('W/'):
+        # If-Range only accepts strong validators
+        return value == etag
+
+    try:
+        return int(parsedate_to_datetime(value).timestamp()) == int(mtime)
+    except (TypeError, ValueError):
+        return False
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.get_header('If-None-Match')
+    if if_none_match is not None:
+        # Weak comparison: W/"x" matches "x"
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag.removeprefix('W/') in tags
+
+    if_modified_since = request.get_header('If-Modified-Since')
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def file_response(request: Request, path: str, content_type: str, headers: dict = None,
+                  etag: str = None, last_modified: float = None):
+    """Serve a file, honouring conditional requests, Range and If-Range.
+
+    A matching If-None-Match or If-Modified-Since gets a 304. Single ranges
+    are sent as 206 with Content-Range, several as a multipart/byteranges
+    206, and unsatisfiable ones as 416. File bytes always go out with
+    sendfile.
+
+    Args:
+        request: The request (Range/If-Range headers are read from it)
+        path: File to send
+        content_type: Content-Type of the file
+        headers: Extra headers for every response (e.g. Cache-Control)
+        etag: Validator to use instead of one derived from the file's stat
+        last_modified: Modification time (epoch seconds) to use instead of
+            the file's mtime
+
+    Returns:
+        StreamingResponse, or bytes for a 304 or 416
+
+    Raises:
+        OSError: If the file cannot be opened
+    """
+    f = open(path, 'rb')
+
+    try:
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        etag = etag or make_etag(stat)
+        mtime = stat.st_mtime if last_modified is None else last_modified
+
+        common = dict(headers or {})
+        common['Accept-Ranges'] = 'bytes'
+        common['ETag'] = etag
+        common['Last-Modified'] = formatdate(mtime, usegmt=True)
+
+        if _not_modified(request, etag, mtime):
+            f.close()
+            return _bodyless(304, common)
+
+        ranges = None
+        range_header = request.get_header('Range')
+        if range_header:
+            if_range = request.get_header('If-Range')
+            if if_range is None or _if_range_matches(if_range, etag, mtime):
+                try:
+                    ranges = parse_byte_ranges(range_header, size)
+                except RangeNotSatisfiable:
+                    f.close()
+                    common['Content-Range'] = f"bytes */{size}"
+                    return _bodyless(416, common)
+
+        if ranges is None:
+            response = StreamingResponse(f, content_length=size)
+            response.set_header("Content-Type", content_type)
+
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            f.seek(start)
+            response = StreamingResponse(f, status_code=206, content_length=end - start + 1)
+            response.set_header("Content-Type", content_type)
+            response.set_header("Content-Range", f"bytes {start}-{end}/{size}")
+
+        else:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for start, end in ranges:
+                parts.append(
+                    f"\r\n--{boundary}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n".encode()
+                )
+                parts.append(FileSegment(f, start, end - start + 1))
+            parts.append(f"\r\n--{boundary}--\r\n".encode())
+
+            response = StreamingResponse(_closing(parts, f), status_code=206,
+                                         content_length=sum(len(part) for part in parts))
+            response.set_header("Content-Type", f"multipart/byteranges; boundary={boundary}")
+
+        for name, value in common.items():
+            response.set_header(name, value)
+        return response
+
+    except BaseException:
+        f.close()
+        raise
+
+
+def accel_redirect(location: str, content_type: str, headers: dict = None) -> bytes:
+    """Hand a file to nginx instead of sending it.
+
+    The response has no body; its X-Accel-Redirect header names the file
+    under nginx's internal location X_ACCEL_REDIRECT_PREFIX/location, and
+    nginx serves it (with Range and conditional request handling) using
+    the Content-Type and other headers given here.
+
+    Args:
+        location: Path below the prefix, e.g. "public/index.html"
+        content_type: Content-Type of the file
+        headers: Extra headers for the response (e.g. Cache-Control)
+
+    Returns:
+        bytes: The response
+    """
+    response = Response(200)
+    for name, value in (headers or {}).items():
+        response.set_header(name, value)
+    response.set_header("Content-Type", content_type)
+    response.set_header("X-Accel-Redirect", quote(f"{X_ACCEL_REDIRECT_PREFIX}/{location.lstrip('/')}"))
+    return response.to_bytes()
+
+
+def _bodyless(status_code: int, headers: dict) -> bytes:
+    response = Response(status_code)
+    for name, value in headers.items():
+        response.set_header(name, value)
+    return response.to_bytes()
+
+
+def _closing(parts: list, f):
+    """Yield parts, closing f when the response is done with them."""
+    try:
+        yield from parts
+    finally:
+        f.close()
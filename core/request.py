@@ -1,5 +1,34 @@
 import typing
 
+
+class BodyStream:
+    """Reads a request body from the client socket on demand.
+
+    Used for routes registered with stream_body=True, so large bodies are
+    consumed in chunks instead of being buffered before routing.
+    """
+
+    def __init__(self, sock, initial: bytes, content_length: int):
+        self.sock = sock
+        self._pending = initial[:content_length]
+        self.remaining = content_length - len(self._pending)
+
+    def read(self, size: int = 65536) -> bytes:
+        """Return up to size bytes, or b'' once the body is exhausted."""
+        if self._pending:
+            data, self._pending = self._pending[:size], self._pending[size:]
+            return data
+
+        if self.remaining <= 0:
+            return b''
+
+        data = self.sock.recv(min(size, self.remaining))
+        self.remaining -= len(data)
+        if not data:
+            self.remaining = 0
+        return data
+
+
 class Request:
     def __init__(self,raw_http):
         
@@ -11,6 +40,7 @@ class Request:
         self.query_params:dict = {}
         self.body:bytes = b''
         self.path_params:dict = {}
+        self.body_stream:BodyStream = None
         self.raw_http:bytes = raw_http
         self.construct_req()
     
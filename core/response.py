@@ -1,16 +1,28 @@
+import os
 import typing
 
+# Bytes read from a file body per send when it cannot use sendfile
+STREAM_CHUNK_SIZE = 64 * 1024
+# Seconds a streaming send may block on a client that stopped reading
+STREAM_SEND_TIMEOUT = float(os.environ.get('STREAM_SEND_TIMEOUT', 30))
+
 class Response:
       REASON_PHRASES = {
           200: "OK",
           201: "Created",
           204: "No Content",
+          206: "Partial Content",
           301: "Moved Permanently",
           302: "Found",
+          304: "Not Modified",
           400: "Bad Request",
           401: "Unauthorized",
           403: "Forbidden",
           404: "Not Found",
+          409: "Conflict",
+          413: "Payload Too Large",
+          416: "Range Not Satisfiable",
+          429: "Too Many Requests",
           500: "Internal Server Error",
           502: "Bad Gateway",
           503: "Service Unavailable",
@@ -51,7 +63,11 @@ class Response:
           return self
 
       def to_bytes(self) -> bytes:
-          self.set_header("Content-Length", str(len(self.body)))
+          if self.status_code != 304:
+              self.set_header("Content-Length", str(len(self.body)))
+          return self._header_bytes() + self.body
+
+      def _header_bytes(self) -> bytes:
           self.set_header("X-Content-Type-Options", "nosniff")
 
           response_lines = [
@@ -67,8 +83,7 @@ class Response:
           response_lines.append("")
           response_lines.append("")
 
-          header_bytes = "\r\n".join(response_lines).encode()
-          return header_bytes + self.body
+          return "\r\n".join(response_lines).encode()
 
       def status(self, status_code: int):
           self.status_code = status_code
@@ -88,7 +103,15 @@ class Response:
 
       def json(self, data: typing.Any):
           import json
-          self.body = json.dumps(data).encode()
+          from utils.trace import span
+          with span('serialize'):
+              self.body = json.dumps(data).encode()
+          self.set_header("Content-Type", "application/json; charset=utf-8")
+          return self
+
+      def json_bytes(self, body: bytes):
+          """Use an already serialized JSON document as the body."""
+          self.body = body
           self.set_header("Content-Type", "application/json; charset=utf-8")
           return self
 
@@ -108,3 +131,137 @@ class Response:
       @classmethod
       def server_error(cls, body: bytes = b""):
           return cls(500, body)
+
+      @classmethod
+      def service_unavailable(cls, body: bytes = b"", retry_after: int = None):
+          response = cls(503, body)
+          if retry_after is not None:
+              response.set_header("Retry-After", str(retry_after))
+          return response
+
+
+class FileSegment:
+      """count bytes of an open file starting at offset; a StreamingResponse
+      body item that is sent with sendfile instead of being read."""
+
+      def __init__(self, file, offset: int, count: int):
+          self.file = file
+          self.offset = offset
+          self.count = count
+
+      def __len__(self) -> int:
+          return self.count
+
+      def read(self) -> bytes:
+          return os.pread(self.file.fileno(), self.count, self.offset)
+
+
+class StreamingResponse(Response):
+      """Response whose body is sent as it is produced.
+
+      The body is either an iterable of byte chunks (which may include
+      FileSegment items) or a binary file object. With a known
+      content_length (files default to their remaining size) the body is
+      sent as-is after a Content-Length header; otherwise it is framed with
+      chunked Transfer-Encoding. Route handlers return the response object
+      itself and handle_client calls write_to.
+      """
+
+      def __init__(self, body, status_code: int = 200, content_length: int = None):
+          super().__init__(status_code)
+          self.stream = body
+          self.content_length = content_length
+          self.headers_sent = False
+
+          if content_length is None and hasattr(body, 'fileno'):
+              try:
+                  self.content_length = os.fstat(body.fileno()).st_size - body.tell()
+              except (OSError, ValueError):
+                  pass
+
+      def _prepare_headers(self) -> bytes:
+          if self.content_length is not None:
+              self.set_header("Content-Length", str(self.content_length))
+          else:
+              self.set_header("Transfer-Encoding", "chunked")
+          return self._header_bytes()
+
+      def _iter_body(self):
+          if hasattr(self.stream, 'fileno') and self.content_length is not None:
+              yield FileSegment(self.stream, self.stream.tell(), self.content_length)
+          elif hasattr(self.stream, 'read'):
+              while True:
+                  data = self.stream.read(STREAM_CHUNK_SIZE)
+                  if not data:
+                      return
+                  yield data
+          else:
+              yield from self.stream
+
+      def write_to(self, sock):
+          """Send the response on sock.
+
+          The first chunk is produced before anything is sent, so errors
+          opening the body (e.g. the database being down) can still become
+          an error response. Once headers_sent is True a failure can only
+          abort the connection.
+
+          Each send blocks until the client has read enough to make room
+          for it, for at most STREAM_SEND_TIMEOUT seconds. FileSegment items
+          go out with sendfile.
+          """
+          sock.settimeout(STREAM_SEND_TIMEOUT)
+          chunked = self.content_length is None
+
+          try:
+              items = self._iter_body()
+              first = next(items, b"")
+              pending = self._prepare_headers()
+              self.headers_sent = True
+
+              for item in _prepend(first, items):
+                  if not len(item):
+                      continue
+
+                  if chunked:
+                      pending += b"%X\r\n" % len(item)
+
+                  if isinstance(item, FileSegment):
+                      sock.sendall(pending)
+                      sock.sendfile(item.file, item.offset, item.count)
+                      pending = b""
+                  else:
+                      pending += item
+                      sock.sendall(pending)
+                      pending = b""
+
+                  if chunked:
+                      pending = b"\r\n"
+
+              if chunked:
+                  pending += b"0\r\n\r\n"
+              if pending:
+                  sock.sendall(pending)
+          finally:
+              self.close()
+
+      def to_bytes(self) -> bytes:
+          """Drain the whole body; for callers that need a plain response."""
+          try:
+              self.body = b"".join(
+                  item.read() if isinstance(item, FileSegment) else item for item in self._iter_body()
+              )
+          finally:
+              self.close()
+          self.headers.pop("Transfer-Encoding", None)
+          return super().to_bytes()
+
+      def close(self):
+          close = getattr(self.stream, 'close', None)
+          if close is not None:
+              close()
+
+
+def _prepend(first: bytes, rest):
+    yield first
+    yield from rest
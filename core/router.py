@@ -1,14 +1,46 @@
 import typing
 import re
+import time
 from core.request import Request
+from core.errors import ServiceUnavailable
+from utils import metrics
+from utils.trace import current_trace, record_span
+
+HTTP_REQUESTS = metrics.counter(
+    'http_requests_total', 'Requests handled by a route.', ('method', 'route', 'status'))
+HTTP_REQUEST_DURATION = metrics.histogram(
+    'http_request_duration_seconds', 'Time spent in route handlers.', ('method', 'route'))
+HTTP_REQUEST_SIZE = metrics.histogram(
+    'http_request_size_bytes', 'Request body sizes (Content-Length).', ('method', 'route'),
+    metrics.SIZE_BUCKETS)
+HTTP_RESPONSE_SIZE = metrics.histogram(
+    'http_response_size_bytes', 'Response sizes, including headers for buffered responses.',
+    ('method', 'route'), metrics.SIZE_BUCKETS)
+
+
+def response_status(response) -> str:
+    """Status code of a handler's return value, as a string."""
+    status_code = getattr(response, 'status_code', None)
+    if status_code is not None:
+        return str(status_code)
+    # b"HTTP/1.1 200 OK..."
+    return response[9:12].decode('ascii', 'replace')
+
+
+def _response_size(response) -> int | None:
+    if isinstance(response, (bytes, bytearray)):
+        return len(response)
+    return getattr(response, 'content_length', None)
 
 
 class Route:
-      def __init__(self, method, path, handler, pattern):
+      def __init__(self, method, path, handler, pattern, stream_body=False):
           self.method = method
           self.path = path
           self.handler = handler
-          self.pattern = pattern  
+          self.pattern = pattern
+          # Handler reads request.body_stream itself instead of request.body
+          self.stream_body = stream_body
 
 class Router:
 
@@ -29,15 +61,22 @@ class Router:
           return re.compile(pattern)
     
     
-      def add_route(self, method, path):
+      def add_route(self, method, path, stream_body=False):
           def dec(handler):
            
               regex_pattern = self._path_to_regex(path)
-              route = Route(method, path, handler, regex_pattern)
+              route = Route(method, path, handler, regex_pattern, stream_body)
               self.routes.append(route)
               return handler
           return dec
 
+      def find(self, request: Request) -> Route | None:
+          """Return the route matching the request without calling it."""
+          for route in self.routes:
+              if route.method == request.method and route.pattern.match(request.path):
+                  return route
+          return None
+
       def route(self, request: Request):
        
           for route in self.routes:
@@ -51,19 +90,49 @@ class Router:
               
                   request.path_params = match.groupdict()
               
-                  return route.handler(request)
+                  return self._call(route, request)
 
       
           return None
 
+      def _call(self, route: Route, request: Request):
+          """Run the handler, recording its status, latency and sizes
+          under the route's path template."""
+          start_ns = time.perf_counter_ns()
+          response = None
+          status = '500'
+          try:
+              response = route.handler(request)
+              status = response_status(response)
+              return response
+          except ServiceUnavailable:
+              status = '503'
+              raise
+          finally:
+              record_span('route', start_ns, route.path)
+              trace = current_trace()
+              if trace is not None:
+                  trace.name = f"{request.method} {route.path}"
+                  trace.status = status
+              HTTP_REQUEST_DURATION.observe((time.perf_counter_ns() - start_ns) / 1e9, request.method, route.path)
+              HTTP_REQUESTS.inc(request.method, route.path, status)
+              try:
+                  request_size = int(request.get_header('Content-Length', 0) or 0)
+              except ValueError:
+                  request_size = 0
+              HTTP_REQUEST_SIZE.observe(request_size, request.method, route.path)
+              response_size = _response_size(response) if response is not None else None
+              if response_size is not None:
+                  HTTP_RESPONSE_SIZE.observe(response_size, request.method, route.path)
+
       def get(self, path):
           return self.add_route("GET", path)
 
-      def put(self, path):
-          return self.add_route("PUT", path)
+      def put(self, path, stream_body=False):
+          return self.add_route("PUT", path, stream_body)
 
-      def post(self, path):
-          return self.add_route("POST", path)
+      def post(self, path, stream_body=False):
+          return self.add_route("POST", path, stream_body)
 
       def delete(self, path):
           return self.add_route("DELETE", path)
@@ -2,7 +2,19 @@ import hashlib
 import base64
 import struct
 import json
+import time
 from typing import Optional
+from utils import metrics
+
+WEBSOCKET_CONNECTIONS = metrics.gauge(
+    'websocket_connections', 'Open WebSocket connections.')
+WEBSOCKET_CONNECTIONS_OPENED = metrics.counter(
+    'websocket_connections_opened_total', 'WebSocket connections accepted.')
+WEBSOCKET_BROADCAST_DURATION = metrics.histogram(
+    'websocket_broadcast_duration_seconds', 'Time to fan a message out to every recipient.', ('kind',))
+WEBSOCKET_BROADCAST_RECIPIENTS = metrics.histogram(
+    'websocket_broadcast_recipients', 'Connections a broadcast was sent to.', ('kind',),
+    (1, 5, 10, 50, 100, 500, 1000, 5000))
 
 
 class WebSocketFrame:
@@ -128,12 +140,17 @@ class WebSocketManager:
 
     def add_connection(self, connection: WebSocketConnection):
         self.connections.append(connection)
+        WEBSOCKET_CONNECTIONS.inc()
+        WEBSOCKET_CONNECTIONS_OPENED.inc()
 
     def remove_connection(self, connection: WebSocketConnection):
         if connection in self.connections:
             self.connections.remove(connection)
+            WEBSOCKET_CONNECTIONS.dec()
 
     def broadcast(self, message: dict, exclude: Optional[WebSocketConnection] = None):
+        start = time.perf_counter()
+        sent = 0
         dead_connections = []
 
         for conn in self.connections:
@@ -144,14 +161,20 @@ class WebSocketManager:
 
             try:
                 conn.send_json(message)
+                sent += 1
             except:
                 conn.closed = True
                 dead_connections.append(conn)
 
+        WEBSOCKET_BROADCAST_DURATION.observe(time.perf_counter() - start, 'all')
+        WEBSOCKET_BROADCAST_RECIPIENTS.observe(sent, 'all')
+
         for conn in dead_connections:
             self.remove_connection(conn)
 
     def broadcast_to_authenticated(self, message: dict):
+        start = time.perf_counter()
+        sent = 0
         dead_connections = []
 
         for conn in self.connections:
@@ -162,10 +185,14 @@ class WebSocketManager:
 
             try:
                 conn.send_json(message)
+                sent += 1
             except:
                 conn.closed = True
                 dead_connections.append(conn)
 
+        WEBSOCKET_BROADCAST_DURATION.observe(time.perf_counter() - start, 'authenticated')
+        WEBSOCKET_BROADCAST_RECIPIENTS.observe(sent, 'authenticated')
+
         for conn in dead_connections:
             self.remove_connection(conn)
 
@@ -0,0 +1,188 @@
+from datetime import datetime
+
+
+class StorageBackend:
+    """Storage interface the models are written against.
+
+    Every method is one logical operation, so each backend can implement it
+    as a single statement or round-trip. Documents are plain dicts shaped
+    like the MongoDB documents (no '_id'); datetimes are timezone-aware UTC.
+    Message sort keys are (created_at, id) tuples.
+    """
+
+    name = 'base'
+
+    def ensure_schema(self):
+        """Create tables/indexes. Must be idempotent."""
+        raise NotImplementedError
+
+    def ping(self):
+        """Raise if the store cannot be reached."""
+        raise NotImplementedError
+
+    # users
+
+    def insert_user(self, user: dict) -> bool:
+        """Insert a user; return False if the username is taken."""
+        raise NotImplementedError
+
+    def find_user(self, username: str) -> dict | None:
+        raise NotImplementedError
+
+    # sessions
+
+    def insert_session(self, session: dict):
+        raise NotImplementedError
+
+    def find_session(self, token_hash: str) -> dict | None:
+        raise NotImplementedError
+
+    def delete_session(self, token_hash: str) -> bool:
+        raise NotImplementedError
+
+    def update_session_expiry(self, token_hash: str, expires_at: datetime):
+        raise NotImplementedError
+
+    def upsert_xsrf_token(self, username: str, xsrf_token: str, expires_at: datetime):
+        raise NotImplementedError
+
+    def find_xsrf_token(self, username: str) -> str | None:
+        raise NotImplementedError
+
+    def sweep_expired(self, now: datetime, session_expiry: datetime, xsrf_expiry: datetime) -> dict:
+        """Delete sessions/XSRF tokens that expired before now and give
+        documents without an expiry the supplied one.
+
+        Returns:
+            dict: {'tokens': {'deleted', 'backfilled'}, 'xsrf_tokens': {...}}
+        """
+        raise NotImplementedError
+
+    # messages
+
+    def insert_message(self, message: dict):
+        raise NotImplementedError
+
+    def find_message(self, message_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def delete_message(self, message_id: str, username: str = None) -> bool:
+        """Delete a message, only if owned by username when one is given."""
+        raise NotImplementedError
+
+    def list_messages(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+        """Return up to limit messages, oldest first.
+
+        Without a key, the newest messages. With before, the newest
+        messages older than that key; with after, the oldest messages newer
+        than it.
+        """
+        raise NotImplementedError
+
+    def iter_messages(self, after: tuple = None, batch_size: int = 500, archived: bool = False):
+        """Yield every message newer than after (all without a key), oldest
+        first, fetching batch_size at a time. archived selects the archive."""
+        raise NotImplementedError
+
+    def message_key_at(self, offset: int) -> tuple | None:
+        """Sort key of the message offset places from the newest (0 is the
+        newest), or None if there are not that many messages."""
+        raise NotImplementedError
+
+    # archive
+
+    def archive_messages(self, before: tuple, limit: int) -> int:
+        """Move up to limit of the oldest messages older than before into
+        the archive.
+
+        Only messages this call removes from the hot tier are archived, so
+        a message deleted concurrently is not brought back. Safe to re-run
+        after a partial failure; backends that cannot move a message
+        atomically (MongoDB) may lose the one message in flight if the
+        process dies between removing and archiving it.
+
+        Returns:
+            int: Number of messages moved
+        """
+        raise NotImplementedError
+
+    def find_archived_message(self, message_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def delete_archived_message(self, message_id: str, username: str = None) -> bool:
+        raise NotImplementedError
+
+    def list_archived_messages(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+        """Same contract as list_messages, over the archive."""
+        raise NotImplementedError
+
+    # uploads
+
+    def insert_upload(self, upload: dict):
+        """Record an uploaded file's metadata (id, filename, original_filename,
+        mime_type, size, sha256, owner, created_at)."""
+        raise NotImplementedError
+
+    def find_upload(self, filename: str) -> dict | None:
+        """Metadata for the upload stored under filename."""
+        raise NotImplementedError
+
+    def delete_upload(self, filename: str) -> dict | None:
+        """Delete an upload record.
+
+        Returns:
+            dict: The deleted record, or None if there was none
+        """
+        raise NotImplementedError
+
+    def iter_uploads(self, created_before: float, batch_size: int = 500):
+        """Yield every upload created before created_before, oldest first,
+        fetching batch_size at a time."""
+        raise NotImplementedError
+
+    def referenced_media_urls(self, urls: list[str]) -> set[str]:
+        """Which of urls appear as media.url in a hot or archived message."""
+        raise NotImplementedError
+
+    def add_upload_bytes(self, username: str, delta: int) -> int:
+        """Adjust the bytes counted against username's upload quota.
+
+        Returns:
+            int: The new total
+        """
+        raise NotImplementedError
+
+    def get_upload_bytes(self, username: str) -> int:
+        raise NotImplementedError
+
+    # blobs (content-addressed upload storage)
+
+    def add_blob_ref(self, sha256: str, size: int, mime_type: str) -> int:
+        """Count one more upload referencing the blob, creating its record
+        on first use.
+
+        Returns:
+            int: The blob's reference count after the increment
+        """
+        raise NotImplementedError
+
+    def release_blob_ref(self, sha256: str) -> int:
+        """Drop one reference. The record is kept at zero references so the
+        blob can be found and removed later.
+
+        Returns:
+            int: The remaining reference count (0 for an unknown blob)
+        """
+        raise NotImplementedError
+
+    def find_blob(self, sha256: str) -> dict | None:
+        """Blob record: sha256, size, mime_type, refs, created_at."""
+        raise NotImplementedError
+
+    def list_unreferenced_blobs(self, limit: int) -> list[dict]:
+        """Up to limit blob records with no references left."""
+        raise NotImplementedError
+
+    def delete_blob(self, sha256: str) -> bool:
+        """Delete a blob record, only while it has no references."""
+        raise NotImplementedError
@@ -0,0 +1,55 @@
+import functools
+import inspect
+import time
+from database.backends.base import StorageBackend
+from utils import metrics
+from utils.trace import record_span
+
+STORAGE_OPERATION_DURATION = metrics.histogram(
+    'storage_operation_duration_seconds', 'Latency of storage backend operations.', ('backend', 'operation'))
+STORAGE_OPERATION_ERRORS = metrics.counter(
+    'storage_operation_errors_total', 'Storage backend operations that raised.', ('backend', 'operation'))
+
+
+class InstrumentedBackend(StorageBackend):
+    """Wraps a backend and records the latency of every StorageBackend
+    operation, labelled with the backend name and method, and as a "db"
+    span of the request being traced.
+
+    Generator methods (iter_*) are passed through untimed: their cost is
+    spread over the caller's loop. Anything else is forwarded unchanged.
+    """
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self.name = backend.name
+
+        for operation, _ in inspect.getmembers(StorageBackend, inspect.isfunction):
+            if operation.startswith('_'):
+                continue
+            method = getattr(backend, operation)
+            if not inspect.isgeneratorfunction(method):
+                method = self._timed(operation, method)
+            setattr(self, operation, method)
+
+    def _timed(self, operation: str, method):
+        duration = STORAGE_OPERATION_DURATION
+        errors = STORAGE_OPERATION_ERRORS
+        name = self.name
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start_ns = time.perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            except BaseException:
+                errors.inc(name, operation)
+                raise
+            finally:
+                record_span('db', start_ns, operation)
+                duration.observe((time.perf_counter_ns() - start_ns) / 1e9, name, operation)
+
+        return wrapper
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
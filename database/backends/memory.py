@@ -0,0 +1,272 @@
+import bisect
+import threading
+import time
+from datetime import datetime
+from database.backends.base import StorageBackend
+
+
+def _message_key(message: dict) -> tuple:
+    return (message.get('created_at') or 0.0, message['id'])
+
+
+def _copy_message(message: dict) -> dict:
+    # media is the only nested value; avoid deepcopy on the listing path
+    copied = dict(message)
+    if copied.get('media'):
+        copied['media'] = dict(copied['media'])
+    return copied
+
+
+class _MessageTier:
+    """Messages by id plus their sort keys in order. Not thread-safe; the
+    backend holds its lock around every call."""
+
+    def __init__(self):
+        self.by_id = {}
+        self.keys = []
+
+    def insert(self, message: dict):
+        if message['id'] in self.by_id:
+            raise ValueError(f"Duplicate message id {message['id']}")
+        self.by_id[message['id']] = _copy_message(message)
+        bisect.insort(self.keys, _message_key(message))
+
+    def find(self, message_id: str) -> dict | None:
+        message = self.by_id.get(message_id)
+        return _copy_message(message) if message else None
+
+    def delete(self, message_id: str, username: str = None) -> bool:
+        message = self.by_id.get(message_id)
+        if message is None or (username is not None and message['username'] != username):
+            return False
+        del self.by_id[message_id]
+        del self.keys[bisect.bisect_left(self.keys, _message_key(message))]
+        return True
+
+    def page(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+        if after:
+            start = bisect.bisect_right(self.keys, after)
+            selected = self.keys[start:start + limit]
+        else:
+            end = bisect.bisect_left(self.keys, before) if before else len(self.keys)
+            selected = self.keys[max(0, end - limit):end]
+        return [_copy_message(self.by_id[message_id]) for _, message_id in selected]
+
+
+class MemoryBackend(StorageBackend):
+    """Process-local dict storage for tests, benchmarks and CI without a
+    database. Nothing is persisted."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.users = {}
+        self.sessions = {}
+        self.xsrf_tokens = {}
+        self.messages = _MessageTier()
+        self.archive = _MessageTier()
+        self.uploads = {}
+        self.blobs = {}
+        self.upload_bytes = {}
+
+    def ensure_schema(self):
+        pass
+
+    def ping(self):
+        pass
+
+    def insert_user(self, user: dict) -> bool:
+        with self._lock:
+            if user['username'] in self.users:
+                return False
+            self.users[user['username']] = dict(user)
+            return True
+
+    def find_user(self, username: str) -> dict | None:
+        with self._lock:
+            user = self.users.get(username)
+            return dict(user) if user else None
+
+    def insert_session(self, session: dict):
+        with self._lock:
+            if session['hash'] in self.sessions:
+                raise ValueError(f"Duplicate session hash {session['hash']}")
+            self.sessions[session['hash']] = dict(session)
+
+    def find_session(self, token_hash: str) -> dict | None:
+        with self._lock:
+            session = self.sessions.get(token_hash)
+            return dict(session) if session else None
+
+    def delete_session(self, token_hash: str) -> bool:
+        with self._lock:
+            return self.sessions.pop(token_hash, None) is not None
+
+    def update_session_expiry(self, token_hash: str, expires_at: datetime):
+        with self._lock:
+            if token_hash in self.sessions:
+                self.sessions[token_hash]['expires_at'] = expires_at
+
+    def upsert_xsrf_token(self, username: str, xsrf_token: str, expires_at: datetime):
+        with self._lock:
+            self.xsrf_tokens[username] = {'username': username, 'xsrf_token': xsrf_token, 'expires_at': expires_at}
+
+    def find_xsrf_token(self, username: str) -> str | None:
+        with self._lock:
+            entry = self.xsrf_tokens.get(username)
+            return entry['xsrf_token'] if entry else None
+
+    def sweep_expired(self, now: datetime, session_expiry: datetime, xsrf_expiry: datetime) -> dict:
+        result = {}
+        with self._lock:
+            for name, store, expiry in (('tokens', self.sessions, session_expiry),
+                                        ('xsrf_tokens', self.xsrf_tokens, xsrf_expiry)):
+                deleted = backfilled = 0
+                for key, doc in list(store.items()):
+                    if doc.get('expires_at') is None:
+                        doc['expires_at'] = expiry
+                        backfilled += 1
+                    elif doc['expires_at'] < now:
+                        del store[key]
+                        deleted += 1
+                result[name] = {'deleted': deleted, 'backfilled': backfilled}
+        return result
+
+    def insert_message(self, message: dict):
+        with self._lock:
+            self.messages.insert(message)
+
+    def find_message(self, message_id: str) -> dict | None:
+        with self._lock:
+            return self.messages.find(message_id)
+
+    def delete_message(self, message_id: str, username: str = None) -> bool:
+        with self._lock:
+            return self.messages.delete(message_id, username)
+
+    def list_messages(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+        with self._lock:
+            return self.messages.page(limit, before, after)
+
+    def iter_messages(self, after: tuple = None, batch_size: int = 500, archived: bool = False):
+        tier = self.archive if archived else self.messages
+        key = after or (float('-inf'), '')
+        while True:
+            with self._lock:
+                batch = tier.page(batch_size, after=key)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            key = _message_key(batch[-1])
+
+    def message_key_at(self, offset: int) -> tuple | None:
+        with self._lock:
+            keys = self.messages.keys
+            return keys[-1 - offset] if offset < len(keys) else None
+
+    def archive_messages(self, before: tuple, limit: int) -> int:
+        with self._lock:
+            end = min(bisect.bisect_left(self.messages.keys, before), limit)
+            for _, message_id in self.messages.keys[:end]:
+                message = self.messages.by_id[message_id]
+                if message_id not in self.archive.by_id:
+                    self.archive.insert(message)
+                self.messages.delete(message_id)
+            return end
+
+    def find_archived_message(self, message_id: str) -> dict | None:
+        with self._lock:
+            return self.archive.find(message_id)
+
+    def delete_archived_message(self, message_id: str, username: str = None) -> bool:
+        with self._lock:
+            return self.archive.delete(message_id, username)
+
+    def list_archived_messages(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+        with self._lock:
+            return self.archive.page(limit, before, after)
+
+    def insert_upload(self, upload: dict):
+        with self._lock:
+            if upload['filename'] in self.uploads:
+                raise ValueError(f"Duplicate upload {upload['filename']}")
+            self.uploads[upload['filename']] = dict(upload)
+
+    def find_upload(self, filename: str) -> dict | None:
+        with self._lock:
+            upload = self.uploads.get(filename)
+            return dict(upload) if upload else None
+
+    def delete_upload(self, filename: str) -> dict | None:
+        with self._lock:
+            return self.uploads.pop(filename, None)
+
+    def iter_uploads(self, created_before: float, batch_size: int = 500):
+        key = (float('-inf'), '')
+        while True:
+            with self._lock:
+                batch = sorted(
+                    (dict(u) for u in self.uploads.values()
+                     if key < (u['created_at'], u['filename']) and u['created_at'] < created_before),
+                    key=lambda u: (u['created_at'], u['filename'])
+                )[:batch_size]
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            key = (batch[-1]['created_at'], batch[-1]['filename'])
+
+    def referenced_media_urls(self, urls: list[str]) -> set[str]:
+        wanted = set(urls)
+        with self._lock:
+            return {
+                message['media'].get('url')
+                for tier in (self.messages, self.archive)
+                for message in tier.by_id.values()
+                if message.get('media') and message['media'].get('url') in wanted
+            }
+
+    def add_upload_bytes(self, username: str, delta: int) -> int:
+        with self._lock:
+            total = self.upload_bytes.get(username, 0) + delta
+            self.upload_bytes[username] = total
+            return total
+
+    def get_upload_bytes(self, username: str) -> int:
+        with self._lock:
+            return self.upload_bytes.get(username, 0)
+
+    def add_blob_ref(self, sha256: str, size: int, mime_type: str) -> int:
+        with self._lock:
+            blob = self.blobs.get(sha256)
+            if blob is None:
+                blob = self.blobs[sha256] = {
+                    'sha256': sha256, 'size': size, 'mime_type': mime_type, 'refs': 0, 'created_at': time.time()
+                }
+            blob['refs'] += 1
+            return blob['refs']
+
+    def release_blob_ref(self, sha256: str) -> int:
+        with self._lock:
+            blob = self.blobs.get(sha256)
+            if blob is None:
+                return 0
+            blob['refs'] = max(0, blob['refs'] - 1)
+            return blob['refs']
+
+    def find_blob(self, sha256: str) -> dict | None:
+        with self._lock:
+            blob = self.blobs.get(sha256)
+            return dict(blob) if blob else None
+
+    def list_unreferenced_blobs(self, limit: int) -> list[dict]:
+        with self._lock:
+            return [dict(blob) for blob in self.blobs.values() if blob['refs'] <= 0][:limit]
+
+    def delete_blob(self, sha256: str) -> bool:
+        with self._lock:
+            blob = self.blobs.get(sha256)
+            if blob is None or blob['refs'] > 0:
+                return False
+            del self.blobs[sha256]
+            return True
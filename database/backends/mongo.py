@@ -0,0 +1,268 @@
+import time
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database.backends.base import StorageBackend
+from database.circuit import guarded
+from database.connection import get_db, ensure_schema
+
+
+def _as_utc(value):
+    # pymongo returns naive datetimes that are already UTC
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _keyset_filter(key: tuple, op: str) -> dict:
+    created_at, message_id = key
+    return {'$or': [
+        {'created_at': {op: created_at}},
+        {'created_at': created_at, 'id': {op: message_id}}
+    ]}
+
+
+def _delete_one(collection, message_id: str, username: str = None) -> bool:
+    query = {'id': message_id}
+    if username is not None:
+        query['username'] = username
+    return collection.delete_one(query).deleted_count > 0
+
+
+def _list_page(collection, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+    if after:
+        cursor = collection.find(_keyset_filter(after, '$gt'), {'_id': 0})
+        return list(cursor.sort([('created_at', 1), ('id', 1)]).limit(limit))
+
+    query = _keyset_filter(before, '$lt') if before else {}
+    cursor = collection.find(query, {'_id': 0})
+    newest_first = list(cursor.sort([('created_at', -1), ('id', -1)]).limit(limit))
+    newest_first.reverse()
+    return newest_first
+
+
+class MongoBackend(StorageBackend):
+    """MongoDB storage; every method is a single command.
+
+    Connection failures are reported to the circuit breaker and surface as
+    DatabaseUnavailable.
+    """
+
+    name = 'mongo'
+
+    def __init__(self, db=None):
+        self._db = db
+
+    def db(self):
+        return self._db if self._db is not None else get_db()
+
+    @guarded
+    def ensure_schema(self):
+        ensure_schema(self.db())
+
+    @guarded
+    def ping(self):
+        self.db().command('ping')
+
+    @guarded
+    def insert_user(self, user: dict) -> bool:
+        try:
+            self.db()['users'].insert_one(dict(user))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    @guarded
+    def find_user(self, username: str) -> dict | None:
+        return self.db()['users'].find_one({'username': username}, {'_id': 0})
+
+    @guarded
+    def insert_session(self, session: dict):
+        self.db()['tokens'].insert_one(dict(session))
+
+    @guarded
+    def find_session(self, token_hash: str) -> dict | None:
+        session = self.db()['tokens'].find_one({'hash': token_hash}, {'_id': 0})
+        if session:
+            for field in ('created_at', 'expires_at'):
+                if field in session:
+                    session[field] = _as_utc(session[field])
+        return session
+
+    @guarded
+    def delete_session(self, token_hash: str) -> bool:
+        result = self.db()['tokens'].delete_one({'hash': token_hash})
+        return result.deleted_count > 0
+
+    @guarded
+    def update_session_expiry(self, token_hash: str, expires_at: datetime):
+        self.db()['tokens'].update_one({'hash': token_hash}, {'$set': {'expires_at': expires_at}})
+
+    @guarded
+    def upsert_xsrf_token(self, username: str, xsrf_token: str, expires_at: datetime):
+        self.db()['xsrf_tokens'].update_one(
+            {'username': username},
+            {'$set': {'xsrf_token': xsrf_token, 'expires_at': expires_at}},
+            upsert=True
+        )
+
+    @guarded
+    def find_xsrf_token(self, username: str) -> str | None:
+        result = self.db()['xsrf_tokens'].find_one({'username': username}, {'_id': 0})
+        return result['xsrf_token'] if result else None
+
+    @guarded
+    def sweep_expired(self, now: datetime, session_expiry: datetime, xsrf_expiry: datetime) -> dict:
+        db = self.db()
+        result = {}
+
+        for name, expiry in (('tokens', session_expiry), ('xsrf_tokens', xsrf_expiry)):
+            collection = db[name]
+            deleted = collection.delete_many({'expires_at': {'$lt': now}})
+            backfilled = collection.update_many({'expires_at': None}, {'$set': {'expires_at': expiry}})
+            result[name] = {'deleted': deleted.deleted_count, 'backfilled': backfilled.modified_count}
+
+        return result
+
+    @guarded
+    def insert_message(self, message: dict):
+        self.db()['chat'].insert_one(dict(message))
+
+    @guarded
+    def find_message(self, message_id: str) -> dict | None:
+        return self.db()['chat'].find_one({'id': message_id}, {'_id': 0})
+
+    @guarded
+    def delete_message(self, message_id: str, username: str = None) -> bool:
+        return _delete_one(self.db()['chat'], message_id, username)
+
+    @guarded
+    def list_messages(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+        return _list_page(self.db()['chat'], limit, before, after)
+
+    @guarded
+    def iter_messages(self, after: tuple = None, batch_size: int = 500, archived: bool = False):
+        collection = self.db()['chat_archive' if archived else 'chat']
+        query = _keyset_filter(after, '$gt') if after else {}
+        cursor = collection.find(query, {'_id': 0}).sort([('created_at', 1), ('id', 1)]).batch_size(batch_size)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    @guarded
+    def message_key_at(self, offset: int) -> tuple | None:
+        cursor = self.db()['chat'].find({}, {'_id': 0, 'created_at': 1, 'id': 1})
+        found = list(cursor.sort([('created_at', -1), ('id', -1)]).skip(offset).limit(1))
+        return (found[0].get('created_at') or 0.0, found[0]['id']) if found else None
+
+    @guarded
+    def archive_messages(self, before: tuple, limit: int) -> int:
+        db = self.db()
+        cursor = db['chat'].find(_keyset_filter(before, '$lt'), {'_id': 0, 'id': 1})
+        ids = [message['id'] for message in cursor.sort([('created_at', 1), ('id', 1)]).limit(limit)]
+
+        moved = 0
+        for message_id in ids:
+            # Only what this call actually removed is archived, so a message
+            # a user deleted since the find (or another archiver claimed) is
+            # not brought back
+            message = db['chat'].find_one_and_delete({'id': message_id}, projection={'_id': 0})
+            if message is None:
+                continue
+            try:
+                db['chat_archive'].insert_one(message)
+            except DuplicateKeyError:
+                pass
+            moved += 1
+
+        return moved
+
+    @guarded
+    def find_archived_message(self, message_id: str) -> dict | None:
+        return self.db()['chat_archive'].find_one({'id': message_id}, {'_id': 0})
+
+    @guarded
+    def delete_archived_message(self, message_id: str, username: str = None) -> bool:
+        return _delete_one(self.db()['chat_archive'], message_id, username)
+
+    @guarded
+    def list_archived_messages(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+        return _list_page(self.db()['chat_archive'], limit, before, after)
+
+    @guarded
+    def insert_upload(self, upload: dict):
+        self.db()['uploads'].insert_one(dict(upload))
+
+    @guarded
+    def find_upload(self, filename: str) -> dict | None:
+        return self.db()['uploads'].find_one({'filename': filename}, {'_id': 0})
+
+    @guarded
+    def delete_upload(self, filename: str) -> dict | None:
+        return self.db()['uploads'].find_one_and_delete({'filename': filename}, projection={'_id': 0})
+
+    @guarded
+    def iter_uploads(self, created_before: float, batch_size: int = 500):
+        cursor = self.db()['uploads'].find({'created_at': {'$lt': created_before}}, {'_id': 0})
+        cursor = cursor.sort([('created_at', 1), ('filename', 1)]).batch_size(batch_size)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    @guarded
+    def referenced_media_urls(self, urls: list[str]) -> set[str]:
+        db = self.db()
+        query = {'media.url': {'$in': list(urls)}}
+        return set(db['chat'].distinct('media.url', query)) | set(db['chat_archive'].distinct('media.url', query))
+
+    @guarded
+    def add_upload_bytes(self, username: str, delta: int) -> int:
+        usage = self.db()['upload_usage'].find_one_and_update(
+            {'username': username},
+            {'$inc': {'bytes': delta}},
+            projection={'_id': 0, 'bytes': 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return usage['bytes']
+
+    @guarded
+    def get_upload_bytes(self, username: str) -> int:
+        usage = self.db()['upload_usage'].find_one({'username': username}, {'_id': 0, 'bytes': 1})
+        return usage['bytes'] if usage else 0
+
+    @guarded
+    def add_blob_ref(self, sha256: str, size: int, mime_type: str) -> int:
+        blob = self.db()['blobs'].find_one_and_update(
+            {'sha256': sha256},
+            {'$inc': {'refs': 1},
+             '$setOnInsert': {'size': size, 'mime_type': mime_type, 'created_at': time.time()}},
+            projection={'_id': 0, 'refs': 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return blob['refs']
+
+    @guarded
+    def release_blob_ref(self, sha256: str) -> int:
+        blob = self.db()['blobs'].find_one_and_update(
+            {'sha256': sha256, 'refs': {'$gt': 0}},
+            {'$inc': {'refs': -1}},
+            projection={'_id': 0, 'refs': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return blob['refs'] if blob else 0
+
+    @guarded
+    def find_blob(self, sha256: str) -> dict | None:
+        return self.db()['blobs'].find_one({'sha256': sha256}, {'_id': 0})
+
+    @guarded
+    def list_unreferenced_blobs(self, limit: int) -> list[dict]:
+        return list(self.db()['blobs'].find({'refs': {'$lte': 0}}, {'_id': 0}).limit(limit))
+
+    @guarded
+    def delete_blob(self, sha256: str) -> bool:
+        return self.db()['blobs'].delete_one({'sha256': sha256, 'refs': {'$lte': 0}}).deleted_count > 0
@@ -0,0 +1,395 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from database.backends.base import StorageBackend
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        salt BLOB,
+        hash BLOB NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS tokens (
+        hash TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        access_token TEXT NOT NULL,
+        xsrf_token TEXT,
+        created_at REAL,
+        expires_at REAL
+    )''',
+    'CREATE INDEX IF NOT EXISTS tokens_expires_at ON tokens (expires_at)',
+    '''CREATE TABLE IF NOT EXISTS xsrf_tokens (
+        username TEXT PRIMARY KEY,
+        xsrf_token TEXT NOT NULL,
+        expires_at REAL
+    )''',
+    'CREATE INDEX IF NOT EXISTS xsrf_tokens_expires_at ON xsrf_tokens (expires_at)',
+    '''CREATE TABLE IF NOT EXISTS chat (
+        id TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        media TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS chat_created_at_id ON chat (created_at, id)',
+    '''CREATE TABLE IF NOT EXISTS chat_archive (
+        id TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        media TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS chat_archive_created_at_id ON chat_archive (created_at, id)',
+    '''CREATE TABLE IF NOT EXISTS uploads (
+        filename TEXT PRIMARY KEY,
+        id TEXT NOT NULL,
+        original_filename TEXT,
+        mime_type TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        owner TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS uploads_owner_created_at ON uploads (owner, created_at)',
+    'CREATE INDEX IF NOT EXISTS uploads_created_at_filename ON uploads (created_at, filename)',
+    "CREATE INDEX IF NOT EXISTS chat_media_url ON chat (json_extract(media, '$.url'))",
+    "CREATE INDEX IF NOT EXISTS chat_archive_media_url ON chat_archive (json_extract(media, '$.url'))",
+    '''CREATE TABLE IF NOT EXISTS blobs (
+        sha256 TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mime_type TEXT NOT NULL,
+        refs INTEGER NOT NULL,
+        created_at REAL NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS blobs_refs ON blobs (refs)',
+    '''CREATE TABLE IF NOT EXISTS upload_usage (
+        username TEXT PRIMARY KEY,
+        bytes INTEGER NOT NULL
+    )''',
+]
+
+MESSAGE_COLUMNS = 'id, username, message, created_at, media'
+UPLOAD_FIELDS = ('filename', 'id', 'original_filename', 'mime_type', 'size', 'sha256', 'owner', 'created_at')
+UPLOAD_COLUMNS = ', '.join(UPLOAD_FIELDS)
+
+
+def _to_epoch(value: datetime | None) -> float | None:
+    return value.timestamp() if value is not None else None
+
+
+def _from_epoch(value: float | None) -> datetime | None:
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None else None
+
+
+def _message_row(row) -> dict:
+    message = {'id': row[0], 'username': row[1], 'message': row[2], 'created_at': row[3]}
+    if row[4]:
+        message['media'] = json.loads(row[4])
+    return message
+
+
+def _blob_row(row) -> dict:
+    return {'sha256': row[0], 'size': row[1], 'mime_type': row[2], 'refs': row[3], 'created_at': row[4]}
+
+
+class SQLiteBackend(StorageBackend):
+    """Embedded SQLite storage in WAL mode.
+
+    Each thread gets its own connection; statements use fixed SQL with bound
+    parameters so sqlite3's per-connection statement cache reuses the
+    prepared statements.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = 'chat.db'):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, cached_statements=256)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def ensure_schema(self):
+        conn = self._conn()
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+    def ping(self):
+        self._conn().execute('SELECT 1').fetchone()
+
+    def insert_user(self, user: dict) -> bool:
+        try:
+            self._conn().execute(
+                'INSERT INTO users (username, salt, hash) VALUES (?, ?, ?)',
+                (user['username'], user.get('salt'), user['hash'])
+            )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def find_user(self, username: str) -> dict | None:
+        row = self._conn().execute(
+            'SELECT username, salt, hash FROM users WHERE username = ?', (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'username': row[0], 'salt': row[1], 'hash': row[2]}
+
+    def insert_session(self, session: dict):
+        self._conn().execute(
+            'INSERT INTO tokens (hash, username, access_token, xsrf_token, created_at, expires_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (session['hash'], session['username'], session['access_token'], session.get('xsrf_token'),
+             _to_epoch(session.get('created_at')), _to_epoch(session.get('expires_at')))
+        )
+
+    def find_session(self, token_hash: str) -> dict | None:
+        row = self._conn().execute(
+            'SELECT hash, username, access_token, xsrf_token, created_at, expires_at FROM tokens WHERE hash = ?',
+            (token_hash,)
+        ).fetchone()
+        if row is None:
+            return None
+        session = {
+            'hash': row[0],
+            'username': row[1],
+            'access_token': row[2],
+            'created_at': _from_epoch(row[4]),
+            'expires_at': _from_epoch(row[5]),
+        }
+        if row[3]:
+            session['xsrf_token'] = row[3]
+        return session
+
+    def delete_session(self, token_hash: str) -> bool:
+        cursor = self._conn().execute('DELETE FROM tokens WHERE hash = ?', (token_hash,))
+        return cursor.rowcount > 0
+
+    def update_session_expiry(self, token_hash: str, expires_at: datetime):
+        self._conn().execute('UPDATE tokens SET expires_at = ? WHERE hash = ?', (_to_epoch(expires_at), token_hash))
+
+    def upsert_xsrf_token(self, username: str, xsrf_token: str, expires_at: datetime):
+        self._conn().execute(
+            'INSERT INTO xsrf_tokens (username, xsrf_token, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT (username) DO UPDATE SET xsrf_token = excluded.xsrf_token, expires_at = excluded.expires_at',
+            (username, xsrf_token, _to_epoch(expires_at))
+        )
+
+    def find_xsrf_token(self, username: str) -> str | None:
+        row = self._conn().execute('SELECT xsrf_token FROM xsrf_tokens WHERE username = ?', (username,)).fetchone()
+        return row[0] if row else None
+
+    def sweep_expired(self, now: datetime, session_expiry: datetime, xsrf_expiry: datetime) -> dict:
+        conn = self._conn()
+        result = {}
+
+        for table, expiry in (('tokens', session_expiry), ('xsrf_tokens', xsrf_expiry)):
+            deleted = conn.execute(f'DELETE FROM {table} WHERE expires_at < ?', (_to_epoch(now),)).rowcount
+            backfilled = conn.execute(
+                f'UPDATE {table} SET expires_at = ? WHERE expires_at IS NULL', (_to_epoch(expiry),)
+            ).rowcount
+            result[table] = {'deleted': deleted, 'backfilled': backfilled}
+
+        return result
+
+    def insert_message(self, message: dict):
+        media = message.get('media')
+        self._conn().execute(
+            f'INSERT INTO chat ({MESSAGE_COLUMNS}) VALUES (?, ?, ?, ?, ?)',
+            (message['id'], message['username'], message['message'], message['created_at'],
+             json.dumps(media) if media else None)
+        )
+
+    def find_message(self, message_id: str) -> dict | None:
+        return self._find(message_id, 'chat')
+
+    def delete_message(self, message_id: str, username: str = None) -> bool:
+        return self._delete(message_id, username, 'chat')
+
+    def list_messages(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+        return self._list(limit, before, after, 'chat')
+
+    def iter_messages(self, after: tuple = None, batch_size: int = 500, archived: bool = False):
+        table = 'chat_archive' if archived else 'chat'
+        key = after or (float('-inf'), '')
+        cursor = self._conn().execute(
+            f'SELECT {MESSAGE_COLUMNS} FROM {table} WHERE (created_at, id) > (?, ?) ORDER BY created_at, id',
+            key
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                yield from (_message_row(row) for row in rows)
+                if len(rows) < batch_size:
+                    return
+        finally:
+            cursor.close()
+
+    def message_key_at(self, offset: int) -> tuple | None:
+        row = self._conn().execute(
+            'SELECT created_at, id FROM chat ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?', (offset,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def archive_messages(self, before: tuple, limit: int) -> int:
+        oldest = 'FROM chat WHERE (created_at, id) < (?, ?) ORDER BY created_at, id LIMIT ?'
+        params = (before[0], before[1], limit)
+        conn = self._conn()
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(f'INSERT OR IGNORE INTO chat_archive ({MESSAGE_COLUMNS}) SELECT {MESSAGE_COLUMNS} {oldest}', params)
+            moved = conn.execute(f'DELETE FROM chat WHERE id IN (SELECT id {oldest})', params).rowcount
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        return moved
+
+    def find_archived_message(self, message_id: str) -> dict | None:
+        return self._find(message_id, 'chat_archive')
+
+    def delete_archived_message(self, message_id: str, username: str = None) -> bool:
+        return self._delete(message_id, username, 'chat_archive')
+
+    def list_archived_messages(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict]:
+        return self._list(limit, before, after, 'chat_archive')
+
+    def insert_upload(self, upload: dict):
+        self._conn().execute(
+            f'INSERT INTO uploads ({UPLOAD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            tuple(upload.get(field) for field in UPLOAD_FIELDS)
+        )
+
+    def find_upload(self, filename: str) -> dict | None:
+        row = self._conn().execute(
+            f'SELECT {UPLOAD_COLUMNS} FROM uploads WHERE filename = ?', (filename,)
+        ).fetchone()
+        return dict(zip(UPLOAD_FIELDS, row)) if row else None
+
+    def delete_upload(self, filename: str) -> dict | None:
+        row = self._conn().execute(
+            f'DELETE FROM uploads WHERE filename = ? RETURNING {UPLOAD_COLUMNS}', (filename,)
+        ).fetchone()
+        return dict(zip(UPLOAD_FIELDS, row)) if row else None
+
+    def iter_uploads(self, created_before: float, batch_size: int = 500):
+        cursor = self._conn().execute(
+            f'SELECT {UPLOAD_COLUMNS} FROM uploads WHERE created_at < ? ORDER BY created_at, filename',
+            (created_before,)
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                yield from (dict(zip(UPLOAD_FIELDS, row)) for row in rows)
+                if len(rows) < batch_size:
+                    return
+        finally:
+            cursor.close()
+
+    def referenced_media_urls(self, urls: list[str]) -> set[str]:
+        urls = list(urls)
+        if not urls:
+            return set()
+        placeholders = ', '.join('?' * len(urls))
+        found = set()
+        for table in ('chat', 'chat_archive'):
+            rows = self._conn().execute(
+                f"SELECT DISTINCT json_extract(media, '$.url') FROM {table} "
+                f"WHERE json_extract(media, '$.url') IN ({placeholders})",
+                urls
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        return found
+
+    def add_upload_bytes(self, username: str, delta: int) -> int:
+        row = self._conn().execute(
+            'INSERT INTO upload_usage (username, bytes) VALUES (?, ?) '
+            'ON CONFLICT (username) DO UPDATE SET bytes = bytes + excluded.bytes RETURNING bytes',
+            (username, delta)
+        ).fetchone()
+        return row[0]
+
+    def get_upload_bytes(self, username: str) -> int:
+        row = self._conn().execute('SELECT bytes FROM upload_usage WHERE username = ?', (username,)).fetchone()
+        return row[0] if row else 0
+
+    def add_blob_ref(self, sha256: str, size: int, mime_type: str) -> int:
+        row = self._conn().execute(
+            'INSERT INTO blobs (sha256, size, mime_type, refs, created_at) VALUES (?, ?, ?, 1, ?) '
+            'ON CONFLICT (sha256) DO UPDATE SET refs = refs + 1 RETURNING refs',
+            (sha256, size, mime_type, time.time())
+        ).fetchone()
+        return row[0]
+
+    def release_blob_ref(self, sha256: str) -> int:
+        row = self._conn().execute(
+            'UPDATE blobs SET refs = refs - 1 WHERE sha256 = ? AND refs > 0 RETURNING refs', (sha256,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def find_blob(self, sha256: str) -> dict | None:
+        row = self._conn().execute(
+            'SELECT sha256, size, mime_type, refs, created_at FROM blobs WHERE sha256 = ?', (sha256,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _blob_row(row)
+
+    def list_unreferenced_blobs(self, limit: int) -> list[dict]:
+        rows = self._conn().execute(
+            'SELECT sha256, size, mime_type, refs, created_at FROM blobs WHERE refs <= 0 LIMIT ?', (limit,)
+        ).fetchall()
+        return [_blob_row(row) for row in rows]
+
+    def delete_blob(self, sha256: str) -> bool:
+        cursor = self._conn().execute('DELETE FROM blobs WHERE sha256 = ? AND refs <= 0', (sha256,))
+        return cursor.rowcount > 0
+
+    # table is always one of the two literal message tables
+
+    def _find(self, message_id: str, table: str) -> dict | None:
+        row = self._conn().execute(f'SELECT {MESSAGE_COLUMNS} FROM {table} WHERE id = ?', (message_id,)).fetchone()
+        return _message_row(row) if row else None
+
+    def _delete(self, message_id: str, username: str, table: str) -> bool:
+        if username is None:
+            cursor = self._conn().execute(f'DELETE FROM {table} WHERE id = ?', (message_id,))
+        else:
+            cursor = self._conn().execute(f'DELETE FROM {table} WHERE id = ? AND username = ?', (message_id, username))
+        return cursor.rowcount > 0
+
+    def _list(self, limit: int, before: tuple, after: tuple, table: str) -> list[dict]:
+        conn = self._conn()
+
+        if after:
+            rows = conn.execute(
+                f'SELECT {MESSAGE_COLUMNS} FROM {table} WHERE (created_at, id) > (?, ?) '
+                'ORDER BY created_at, id LIMIT ?',
+                (after[0], after[1], limit)
+            ).fetchall()
+            return [_message_row(row) for row in rows]
+
+        if before:
+            rows = conn.execute(
+                f'SELECT {MESSAGE_COLUMNS} FROM {table} WHERE (created_at, id) < (?, ?) '
+                'ORDER BY created_at DESC, id DESC LIMIT ?',
+                (before[0], before[1], limit)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                f'SELECT {MESSAGE_COLUMNS} FROM {table} ORDER BY created_at DESC, id DESC LIMIT ?',
+                (limit,)
+            ).fetchall()
+
+        rows.reverse()
+        return [_message_row(row) for row in rows]
@@ -0,0 +1,118 @@
+import inspect
+import os
+import threading
+import time
+from functools import wraps
+from pymongo.errors import ConnectionFailure, WaitQueueTimeoutError
+from core.errors import ServiceUnavailable
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Consecutive connection failures before the breaker opens.
+MONGO_BREAKER_FAILURES = int(os.environ.get('MONGO_BREAKER_FAILURES', 3))
+# Seconds between background recovery probes while the breaker is open.
+MONGO_BREAKER_PROBE_INTERVAL = float(os.environ.get('MONGO_BREAKER_PROBE_INTERVAL', 2))
+
+
+class DatabaseUnavailable(ServiceUnavailable):
+    """Raised instead of blocking when MongoDB is known to be unhealthy."""
+
+
+class CircuitBreaker:
+    """Fail fast while MongoDB is down instead of letting every request
+    thread block for the full server selection timeout.
+
+    Closed: calls go through; connection failures are counted.
+    Open: calls raise DatabaseUnavailable immediately while a background
+    thread probes the server and closes the breaker once it answers.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+
+    def __init__(self, failure_threshold: int = MONGO_BREAKER_FAILURES,
+                 probe_interval: float = MONGO_BREAKER_PROBE_INTERVAL, probe=None):
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.probe = probe
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+        self._probe_thread = None
+
+    def before_call(self):
+        if self.state == self.OPEN:
+            raise DatabaseUnavailable("MongoDB is unavailable")
+
+    def record_success(self):
+        if self.failures or self.state != self.CLOSED:
+            with self._lock:
+                self.failures = 0
+                self.state = self.CLOSED
+                self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._start_probe()
+
+    def _start_probe(self):
+        if self.probe is None:
+            return
+        if self._probe_thread is not None and self._probe_thread.is_alive():
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while self.state == self.OPEN:
+            time.sleep(self.probe_interval)
+            try:
+                self.probe()
+            except Exception:
+                continue
+            self.record_success()
+            log.info("MongoDB reachable again, circuit breaker closed")
+
+
+breaker = CircuitBreaker()
+
+
+def _unavailable(e: ConnectionFailure) -> DatabaseUnavailable:
+    # A pool wait timeout means this process is saturated, not that
+    # MongoDB is down, so it fails the request without opening the breaker
+    if not isinstance(e, WaitQueueTimeoutError):
+        breaker.record_failure()
+    return DatabaseUnavailable(f"MongoDB is unavailable: {e}")
+
+
+def guarded(fn):
+    """Decorator for model functions: turn connection failures into
+    DatabaseUnavailable and feed them (except connection pool wait
+    timeouts) to the circuit breaker.
+
+    Generator functions are guarded for their whole iteration.
+    """
+    if inspect.isgeneratorfunction(fn):
+        @wraps(fn)
+        def generator_wrapper(*args, **kwargs):
+            try:
+                yield from fn(*args, **kwargs)
+            except ConnectionFailure as e:
+                raise _unavailable(e) from e
+
+        return generator_wrapper
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except ConnectionFailure as e:
+            raise _unavailable(e) from e
+
+    return wrapper
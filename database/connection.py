@@ -1,26 +1,177 @@
-from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError,ConnectionFailure
+import os
+import threading
+import time
+from pymongo import MongoClient, ASCENDING, monitoring
+from pymongo.errors import ConnectionFailure,CollectionInvalid,PyMongoError
 from pymongo.database import Database
 import typing
+from database.circuit import breaker
+from database.query_monitor import QueryMonitor
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://mongo:27017')
+MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'chat-server')
+# Per-command latency metrics and the slow-query log (see query_monitor)
+MONGO_COMMAND_MONITORING = os.environ.get('MONGO_COMMAND_MONITORING', '1') == '1'
+
+# Seconds between schema setup attempts while MongoDB is unreachable at startup
+MONGO_SCHEMA_RETRY_INTERVAL = float(os.environ.get('MONGO_SCHEMA_RETRY_INTERVAL', 5))
 
 global db_instance
 db_instance = None
+_connect_lock = threading.Lock()
 
-def connect_db(uri:str="mongodb://mongo:27017")->Database:
+# Collections that need options at creation time. The archive is written
+# once and read rarely, so it trades CPU for space with zstd. The cache
+# invalidation log (database/invalidation) is tailed, which only works on
+# a capped collection; creating it here keeps a publish from auto-creating
+# an ordinary one first.
+COLLECTIONS = {
+    'chat_archive': {'storageEngine': {'wiredTiger': {'configString': 'block_compressor=zstd'}}},
+    'cache_invalidations': {'capped': True, 'size': 1024 * 1024},
+}
 
-    global db_instance
+# (collection, keys, options) for every index the models rely on.
+# create_index is a no-op when an identical index already exists, so this
+# is safe to run on every startup.
+INDEXES = [
+    ('chat', [('id', ASCENDING)], {'unique': True, 'name': 'id_unique'}),
+    ('chat', [('created_at', ASCENDING), ('id', ASCENDING)], {'name': 'created_at_id'}),
+    ('chat_archive', [('id', ASCENDING)], {'unique': True, 'name': 'id_unique'}),
+    ('chat_archive', [('created_at', ASCENDING), ('id', ASCENDING)], {'name': 'created_at_id'}),
+    ('uploads', [('filename', ASCENDING)], {'unique': True, 'name': 'filename_unique'}),
+    ('uploads', [('owner', ASCENDING), ('created_at', ASCENDING)], {'name': 'owner_created_at'}),
+    ('uploads', [('created_at', ASCENDING), ('filename', ASCENDING)], {'name': 'created_at_filename'}),
+    ('chat', [('media.url', ASCENDING)], {'sparse': True, 'name': 'media_url'}),
+    ('chat_archive', [('media.url', ASCENDING)], {'sparse': True, 'name': 'media_url'}),
+    ('blobs', [('sha256', ASCENDING)], {'unique': True, 'name': 'sha256_unique'}),
+    ('blobs', [('refs', ASCENDING)], {'name': 'refs'}),
+    ('upload_usage', [('username', ASCENDING)], {'unique': True, 'name': 'username_unique'}),
+    ('users', [('username', ASCENDING)], {'unique': True, 'name': 'username_unique'}),
+    ('tokens', [('hash', ASCENDING)], {'unique': True, 'name': 'hash_unique'}),
+    ('tokens', [('expires_at', ASCENDING)], {'expireAfterSeconds': 0, 'name': 'expires_at_ttl'}),
+    ('xsrf_tokens', [('username', ASCENDING)], {'unique': True, 'name': 'username_unique'}),
+    ('xsrf_tokens', [('expires_at', ASCENDING)], {'expireAfterSeconds': 0, 'name': 'expires_at_ttl'}),
+]
 
-    if db_instance is None:
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def client_options() -> dict:
+    """MongoClient settings, overridable through MONGO_* environment variables."""
+    options = {
+        'maxPoolSize': _env_int('MONGO_MAX_POOL_SIZE', 100),
+        'minPoolSize': _env_int('MONGO_MIN_POOL_SIZE', 10),
+        'waitQueueTimeoutMS': _env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS', 1000),
+        'connectTimeoutMS': _env_int('MONGO_CONNECT_TIMEOUT_MS', 2000),
+        'socketTimeoutMS': _env_int('MONGO_SOCKET_TIMEOUT_MS', 5000),
+        'serverSelectionTimeoutMS': _env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 2000),
+    }
+
+    write_concern = os.environ.get('MONGO_WRITE_CONCERN')
+    if write_concern:
+        options['w'] = int(write_concern) if write_concern.isdigit() else write_concern
+
+    write_timeout = os.environ.get('MONGO_WRITE_TIMEOUT_MS')
+    if write_timeout:
+        options['wTimeoutMS'] = int(write_timeout)
+
+    read_concern = os.environ.get('MONGO_READ_CONCERN')
+    if read_concern:
+        options['readConcernLevel'] = read_concern
+
+    return options
+
+
+class BreakerListener(monitoring.CommandListener):
+    """Closes the circuit breaker whenever a command succeeds."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        breaker.record_success()
+
+    def failed(self, event):
+        pass
+
+
+def ensure_collections(db: Database):
+    """Create collections that need creation options, if missing."""
+    existing = set(db.list_collection_names())
+    for name, options in COLLECTIONS.items():
+        if name in existing:
+            continue
         try:
-            client = MongoClient(uri,serverSelectionTimeoutMS=6000)
-            db_instance = client["chat-server"]
+            db.create_collection(name, **options)
+        except CollectionInvalid:
+            pass
+
+
+def ensure_indexes(db: Database):
+    """Create all model indexes if they do not exist yet."""
+    for collection, keys, options in INDEXES:
+        db[collection].create_index(keys, **options)
+
 
-        except ServerSelectionTimeoutError:
-            raise ConnectionFailure("MongoDB server is not reachable, ensure docker container is running")
+def backfill_created_at(db: Database) -> int:
+    """Give messages stored before created_at existed the time encoded in
+    their ObjectId.
 
-        except ConnectionFailure as e:
-            raise ConnectionFailure(f"Failed to connect to MongoDB{e}")
+    Pagination, archiving and search indexing all key on (created_at, id),
+    and a range filter never matches a missing field, so such messages
+    would otherwise be unreachable. Only touches documents that lack the
+    field, so after the first run it is a single indexed no-op query.
 
+    Returns:
+        int: Number of messages updated
+    """
+    legacy = {'created_at': None, '_id': {'$type': 'objectId'}}
+    # Epoch seconds, matching what create_message stores
+    created_at = [{'$set': {'created_at': {'$divide': [{'$toLong': {'$toDate': '$_id'}}, 1000]}}}]
+
+    updated = 0
+    for collection in ('chat', 'chat_archive'):
+        updated += db[collection].update_many(legacy, created_at).modified_count
+    return updated
+
+
+def ensure_schema(db: Database):
+    """Create collections and indexes and backfill legacy documents. Run
+    once at startup (warm_up_db), never on the request path: building a
+    unique index over existing duplicates fails, and that must not fail
+    every request."""
+    ensure_collections(db)
+    ensure_indexes(db)
+    updated = backfill_created_at(db)
+    if updated:
+        log.info("Backfilled created_at on legacy messages", messages=updated)
+
+
+def connect_db(uri:str=None)->Database:
+    """The shared database handle, creating the client on first use.
+
+    MongoClient connects lazily, so this does no I/O; connection errors
+    surface from the first command.
+    """
+    global db_instance
+
+    if db_instance is None:
+        with _connect_lock:
+            if db_instance is None:
+                listeners = [BreakerListener()]
+                if MONGO_COMMAND_MONITORING:
+                    listeners.append(QueryMonitor())
+                client = MongoClient(uri or MONGO_URI, event_listeners=listeners, **client_options())
+                try:
+                    db_instance = client[MONGO_DB_NAME]
+                except BaseException:
+                    client.close()
+                    raise
 
     return db_instance
 
@@ -33,6 +184,59 @@ def return_db():
     return db_instance
 
 
-def get_db(uri="mongodb://mongo:27017", db_name="chat-server"):
-    """Get database connection (alias for compatibility)."""
-    return connect_db(uri)
\ No newline at end of file
+def get_db(uri=None, db_name=MONGO_DB_NAME):
+    """Get database connection (alias for compatibility).
+
+    Raises:
+        DatabaseUnavailable: Immediately, while the circuit breaker is open
+    """
+    breaker.before_call()
+    return connect_db(uri)
+
+
+def ping_db():
+    """Round-trip to MongoDB; raises if it cannot be reached."""
+    connect_db().command('ping')
+
+
+def _setup_schema() -> bool:
+    """ensure_schema, logging failures. Returns False only if MongoDB could
+    not be reached (worth retrying); other errors, e.g. a unique index over
+    duplicate data, are logged for an operator and not retried."""
+    try:
+        ensure_schema(connect_db())
+    except ConnectionFailure as e:
+        log.error("MongoDB schema setup failed, will retry", error=e)
+        return False
+    except PyMongoError:
+        log.exception("MongoDB schema setup failed")
+    return True
+
+
+def _schema_retry_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        if _setup_schema():
+            return
+
+
+def warm_up_db():
+    """Connect, build indexes and ping at startup so the first requests
+    do not pay for connection setup. The pool then keeps at least
+    MONGO_MIN_POOL_SIZE connections open in the background.
+
+    If MongoDB is down, schema setup is retried in a background thread
+    until it is reachable.
+    """
+    try:
+        ping_db()
+        breaker.record_success()
+    except ConnectionFailure as e:
+        breaker.record_failure()
+        log.error("MongoDB warm-up failed", error=e)
+
+    if not _setup_schema():
+        threading.Thread(target=_schema_retry_loop, args=(MONGO_SCHEMA_RETRY_INTERVAL,), daemon=True).start()
+
+
+breaker.probe = ping_db
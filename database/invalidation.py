@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import uuid
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+from database.circuit import DatabaseUnavailable
+from database.connection import get_db, COLLECTIONS
+from database.storage import STORAGE_BACKEND
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+INVALIDATION_COLLECTION = 'cache_invalidations'
+
+# Only needed when several server processes share one MongoDB; a single
+# process invalidates its own caches directly. Events travel through
+# MongoDB, so broadcast is off with the other storage backends.
+BROADCAST_ENABLED = (os.environ.get('CACHE_INVALIDATION_BROADCAST', '0') == '1'
+                     and STORAGE_BACKEND == 'mongo')
+
+_origin = uuid.uuid4().hex
+_subscribers: dict[str, list] = {}
+_listener_thread = None
+
+
+def subscribe(namespace: str, callback):
+    """Call callback(key) whenever another process invalidates a key in namespace."""
+    _subscribers.setdefault(namespace, []).append(callback)
+
+
+def publish(namespace: str, key: str):
+    """Tell other server processes to drop a cached key.
+
+    The caller is expected to have already invalidated its own cache, so
+    a failure here is logged rather than failing the caller: other
+    processes fall back to their cache TTLs.
+    """
+    if not BROADCAST_ENABLED:
+        return
+
+    try:
+        db = get_db()
+        db[INVALIDATION_COLLECTION].insert_one({
+            'origin': _origin,
+            'namespace': namespace,
+            'key': key
+        })
+    except (PyMongoError, DatabaseUnavailable) as e:
+        log.warning("Cache invalidation publish failed", namespace=namespace, error=e)
+
+
+def _ensure_collection(db):
+    """Create the capped collection, or convert an ordinary one that a
+    write created before it existed (tailable cursors need capped)."""
+    options = COLLECTIONS[INVALIDATION_COLLECTION]
+    try:
+        db.create_collection(INVALIDATION_COLLECTION, **options)
+    except CollectionInvalid:
+        if not db[INVALIDATION_COLLECTION].options().get('capped'):
+            db.command('convertToCapped', INVALIDATION_COLLECTION, size=options['size'])
+
+
+def _dispatch(event: dict):
+    if event.get('origin') == _origin:
+        return
+    for callback in _subscribers.get(event.get('namespace'), []):
+        callback(event.get('key'))
+
+
+def _tail(collection, last_id):
+    """Dispatch events after last_id (all of them if None) until the
+    cursor dies; returns the last event seen.
+
+    ObjectIds are generated by the publishing clients, so they do not
+    follow insertion order across processes; only $natural order does. The
+    capped collection is re-read in that order, skipping up to last_id. If
+    last_id has rolled out of the collection everything left is dispatched
+    (dropping a few extra cache entries is harmless).
+    """
+    if last_id is not None and not collection.find_one({'_id': last_id}, {'_id': 1}):
+        last_id = None
+    skipping = last_id is not None
+
+    cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+
+    while cursor.alive:
+        for event in cursor:
+            if skipping:
+                skipping = event['_id'] != last_id
+                continue
+            last_id = event['_id']
+            _dispatch(event)
+        # Caught up with what was there; if last_id rolled out after the
+        # check above, do not skip new events forever
+        skipping = False
+
+    return last_id
+
+
+def _listen():
+    last_id = None
+    started = False
+
+    while True:
+        try:
+            db = get_db()
+            _ensure_collection(db)
+            collection = db[INVALIDATION_COLLECTION]
+
+            if not started:
+                newest = collection.find_one(sort=[('$natural', -1)])
+                last_id = newest['_id'] if newest else None
+                started = True
+
+            last_id = _tail(collection, last_id)
+
+        except (PyMongoError, DatabaseUnavailable) as e:
+            log.warning("Cache invalidation listener error", error=e)
+
+        time.sleep(1)
+
+
+def start_listener():
+    """Start tailing the invalidation collection in a background thread."""
+    global _listener_thread
+
+    if not BROADCAST_ENABLED or _listener_thread is not None:
+        return
+
+    _listener_thread = threading.Thread(target=_listen, daemon=True)
+    _listener_thread.start()
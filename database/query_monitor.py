@@ -0,0 +1,172 @@
+import json
+import os
+from pymongo import monitoring
+from utils import metrics
+from utils.log import get_logger
+
+# Commands slower than this are logged with their (redacted) filter shape
+MONGO_SLOW_QUERY_MS = float(os.environ.get('MONGO_SLOW_QUERY_MS', 100))
+
+MONGO_COMMAND_DURATION = metrics.histogram(
+    'mongo_command_duration_seconds', 'MongoDB command latency as seen by the driver.',
+    ('collection', 'command'))
+MONGO_DOCUMENTS_RETURNED = metrics.counter(
+    'mongo_documents_returned_total', 'Documents in find/aggregate/getMore batches.',
+    ('collection', 'command'))
+MONGO_COMMANDS_FAILED = metrics.counter(
+    'mongo_commands_failed_total', 'MongoDB commands that returned an error.', ('collection', 'command'))
+MONGO_SLOW_COMMANDS = metrics.counter(
+    'mongo_slow_commands_total', 'MongoDB commands slower than MONGO_SLOW_QUERY_MS.', ('collection', 'command'))
+MONGO_UNBOUNDED_QUERIES = metrics.counter(
+    'mongo_unbounded_queries_total', 'find/count/aggregate commands with no filter and no limit.',
+    ('collection', 'command'))
+
+log = get_logger(__name__)
+
+# Command name -> field holding the filter(s) worth logging
+_FILTER_FIELDS = {
+    'find': ('filter',),
+    'count': ('query',),
+    'distinct': ('query',),
+    'findAndModify': ('query',),
+    'aggregate': ('pipeline',),
+    'update': ('updates',),
+    'delete': ('deletes',),
+}
+# Aggregation stages left as-is when redacting: field names and
+# directions, not data
+_KEEP_VALUES = {'$sort', '$limit', '$project'}
+
+
+def redact(value, key: str = None):
+    """The shape of a query document with every literal replaced by "?".
+
+    Field names and operators are kept, so {"username": "alice",
+    "created_at": {"$lt": 1.7e9}} becomes {"username": "?", "created_at":
+    {"$lt": "?"}}. Arrays of documents ($or clauses, pipeline stages) keep
+    every element; other arrays ($in values) only the first.
+    """
+    if key in _KEEP_VALUES:
+        return value
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if all(isinstance(item, dict) for item in value):
+            return [redact(item) for item in value]
+        return [redact(value[0])]
+    return '?'
+
+
+def _collection(command_name: str, command) -> str:
+    target = command.get('collection') if command_name == 'getMore' else command.get(command_name)
+    return target if isinstance(target, str) else '-'
+
+
+def _documents_returned(reply) -> int | None:
+    cursor = reply.get('cursor')
+    if not isinstance(cursor, dict):
+        return None
+    batch = cursor.get('firstBatch', cursor.get('nextBatch'))
+    return len(batch) if batch is not None else None
+
+
+def _cursor_id(reply) -> int:
+    cursor = reply.get('cursor')
+    return cursor.get('id', 0) if isinstance(cursor, dict) else 0
+
+
+def _unbounded(command_name: str, command) -> bool:
+    if command_name == 'find':
+        return not command.get('filter') and not command.get('limit')
+    if command_name == 'count':
+        return not command.get('query')
+    if command_name == 'aggregate':
+        stages = command.get('pipeline') or []
+        return not any('$match' in stage or '$limit' in stage for stage in stages)
+    return False
+
+
+def _shape(command_name: str, command) -> dict:
+    shape = {}
+    for field in _FILTER_FIELDS.get(command_name, ()):
+        if field in command:
+            value = command[field]
+            if field in ('updates', 'deletes'):
+                # [{"q": filter, "u": update}, ...] -> filter of the first
+                value = value[0].get('q') if value else None
+            shape[field] = redact(value)
+    for field in ('sort', 'limit'):
+        if field in command:
+            shape[field] = command[field]
+    return shape
+
+
+class QueryMonitor(monitoring.CommandListener):
+    """Records latency, documents returned and failures per collection and
+    command, and logs commands slower than MONGO_SLOW_QUERY_MS with their
+    filter shape (literal values redacted).
+
+    Commands on tailable cursors (the cache invalidation listener) wait on
+    the server by design, so they are recorded under their own command
+    label ("find:tailable", "getMore:tailable") and skip the slow and
+    unbounded query checks.
+
+    pymongo calls the listener on the thread running the command, so slow
+    query records carry the request id of the request that issued them.
+    """
+
+    def __init__(self, slow_query_ms: float = None):
+        self.slow_query_ms = MONGO_SLOW_QUERY_MS if slow_query_ms is None else slow_query_ms
+        # (connection_id, request_id) -> (collection, command document, tailable)
+        self._pending = {}
+        # Ids of open tailable cursors, to recognise their getMores
+        self._tailable_cursors = set()
+
+    def started(self, event):
+        collection = _collection(event.command_name, event.command)
+        if event.command_name == 'getMore':
+            tailable = event.command.get('getMore') in self._tailable_cursors
+        else:
+            tailable = bool(event.command.get('tailable'))
+        self._pending[(event.connection_id, event.request_id)] = (collection, event.command, tailable)
+
+        if not tailable and _unbounded(event.command_name, event.command):
+            MONGO_UNBOUNDED_QUERIES.inc(collection, event.command_name)
+
+    def _finish(self, event, failed: bool, reply=None):
+        collection, command, tailable = self._pending.pop((event.connection_id, event.request_id),
+                                                          ('-', None, False))
+        duration_ms = event.duration_micros / 1000
+        command_name = event.command_name
+
+        if tailable:
+            self._track_tailable(command, reply)
+            command_name = f"{command_name}:tailable"
+
+        MONGO_COMMAND_DURATION.observe(duration_ms / 1000, collection, command_name)
+        if failed:
+            MONGO_COMMANDS_FAILED.inc(collection, command_name)
+
+        documents = _documents_returned(reply) if reply is not None else None
+        if documents:
+            MONGO_DOCUMENTS_RETURNED.inc(collection, command_name, amount=documents)
+
+        if not tailable and self.slow_query_ms and duration_ms >= self.slow_query_ms:
+            MONGO_SLOW_COMMANDS.inc(collection, command_name)
+            shape = _shape(command_name, command) if command is not None else {}
+            log.warning("Slow query", collection=collection, command=command_name,
+                        duration_ms=round(duration_ms, 3), documents=documents, failed=failed,
+                        shape=json.dumps(shape, default=str, sort_keys=True))
+
+    def _track_tailable(self, command, reply):
+        if command is not None and 'getMore' in command:
+            self._tailable_cursors.discard(command['getMore'])
+        cursor_id = _cursor_id(reply) if reply is not None else 0
+        if cursor_id:
+            self._tailable_cursors.add(cursor_id)
+
+    def succeeded(self, event):
+        self._finish(event, False, event.reply)
+
+    def failed(self, event):
+        self._finish(event, True)
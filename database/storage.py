@@ -0,0 +1,62 @@
+import os
+import threading
+from database.backends.base import StorageBackend
+
+# 'mongo' (default), 'sqlite' or 'memory'
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', 'chat.db')
+# Record per-operation latency for the /metrics endpoint
+STORAGE_METRICS = os.environ.get('STORAGE_METRICS', '1') == '1'
+
+_backend = None
+_lock = threading.Lock()
+
+
+def create_backend(name: str = STORAGE_BACKEND) -> StorageBackend:
+    """Instantiate a storage backend by name."""
+    if name == 'mongo':
+        from database.backends.mongo import MongoBackend
+        return MongoBackend()
+
+    if name == 'sqlite':
+        from database.backends.sqlite import SQLiteBackend
+        backend = SQLiteBackend(SQLITE_PATH)
+        backend.ensure_schema()
+        return backend
+
+    if name == 'memory':
+        from database.backends.memory import MemoryBackend
+        return MemoryBackend()
+
+    raise ValueError(f"Unknown storage backend: {name}")
+
+
+def get_backend() -> StorageBackend:
+    """Return the configured storage backend, creating it on first use."""
+    global _backend
+
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                backend = create_backend()
+                if STORAGE_METRICS:
+                    from database.backends.instrumented import InstrumentedBackend
+                    backend = InstrumentedBackend(backend)
+                _backend = backend
+
+    return _backend
+
+
+def set_backend(backend: StorageBackend | None) -> StorageBackend | None:
+    """Replace the active backend (None resets to the configured one).
+
+    Returns:
+        StorageBackend: The previously active backend
+    """
+    global _backend
+
+    with _lock:
+        previous = _backend
+        _backend = backend
+
+    return previous
@@ -1,7 +1,185 @@
+import bisect
+import json
+import os
+import threading
+import time
 import uuid
-from database.connection import get_db
+from database import invalidation
+from database.storage import get_backend
+from utils.cache import LRUCache
+from utils.search_index import SearchIndex
 from utils.security import escape_html
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+RECENT_WINDOW_SIZE = MAX_PAGE_SIZE
+MESSAGE_CACHE_SIZE = 1024
+# Serialized messages kept ready for history responses
+MESSAGE_JSON_CACHE_SIZE = int(os.environ.get('MESSAGE_JSON_CACHE_SIZE', 10000))
+
+DEFAULT_SEARCH_LIMIT = 20
+
+# Messages fetched per storage round-trip when streaming the full history
+MESSAGE_STREAM_BATCH_SIZE = int(os.environ.get('MESSAGE_STREAM_BATCH_SIZE', 500))
+
+
+def _sort_key(message: dict) -> tuple[float, str]:
+    return (message.get('created_at') or 0.0, message['id'])
+
+
+class RecentMessages:
+    """Ordered in-process window of the newest chat messages.
+
+    The window always holds a contiguous suffix of the collection in
+    (created_at, id) order, so any page that falls inside it can be served
+    without a database round-trip. It is loaded lazily on the first history
+    read and kept current by create_message/delete_message. Writes made by
+    other server processes only reach it through cache invalidation
+    broadcast (CACHE_INVALIDATION_BROADCAST).
+    """
+
+    def __init__(self, maxsize: int = RECENT_WINDOW_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._messages = []
+        self._keys = []
+        self.loaded = False
+        # True while the window holds every message in the hot collection
+        self.complete = False
+        self.hits = 0
+        self.misses = 0
+        # Bumped on every write so a load that raced with a write is discarded
+        self._writes = 0
+
+    def load_token(self) -> int:
+        with self._lock:
+            return self._writes
+
+    def load(self, newest_first: list[dict], token: int):
+        with self._lock:
+            if token != self._writes:
+                return
+            self._messages = list(reversed(newest_first))
+            self._keys = [_sort_key(m) for m in self._messages]
+            self.complete = len(self._messages) < self.maxsize
+            self.loaded = True
+
+    def add(self, message: dict):
+        with self._lock:
+            self._writes += 1
+            if not self.loaded:
+                return
+            key = _sort_key(message)
+            index = bisect.bisect_right(self._keys, key)
+            if index == 0 and len(self._messages) >= self.maxsize:
+                self.complete = False
+                return
+            self._keys.insert(index, key)
+            self._messages.insert(index, message)
+            if len(self._messages) > self.maxsize:
+                del self._keys[0]
+                del self._messages[0]
+                self.complete = False
+
+    def remove(self, message_id: str):
+        with self._lock:
+            self._writes += 1
+            for index, message in enumerate(self._messages):
+                if message['id'] == message_id:
+                    del self._keys[index]
+                    del self._messages[index]
+                    return
+
+    def discard_before(self, key: tuple) -> list[str]:
+        """Drop messages older than key (they moved to the archive).
+
+        Returns:
+            list: Ids of the dropped messages
+        """
+        with self._lock:
+            self._writes += 1
+            end = bisect.bisect_left(self._keys, key)
+            dropped = [message['id'] for message in self._messages[:end]]
+            del self._keys[:end]
+            del self._messages[:end]
+            return dropped
+
+    def page(self, limit: int, before: tuple = None, after: tuple = None) -> list[dict] | None:
+        """Return the requested page (oldest first), or None if the window cannot answer it."""
+        with self._lock:
+            page = self._page(limit, before, after)
+            if page is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return page
+
+    def _page(self, limit, before, after):
+        if not self.loaded:
+            return None
+
+        if after is not None:
+            # Older keys may continue in the archive, which the window never holds
+            if not self._keys or after < self._keys[0]:
+                return None
+            start = bisect.bisect_right(self._keys, after)
+            return self._messages[start:start + limit]
+
+        end = bisect.bisect_left(self._keys, before) if before is not None else len(self._keys)
+        if end < limit and not self.complete:
+            return None
+        return self._messages[max(0, end - limit):end]
+
+    def clear(self):
+        with self._lock:
+            self._messages = []
+            self._keys = []
+            self.loaded = False
+            self.complete = False
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._messages),
+                'maxsize': self.maxsize,
+                'loaded': self.loaded,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+recent_messages = RecentMessages()
+message_cache = LRUCache(MESSAGE_CACHE_SIZE)
+# id -> json.dumps(message).encode(); messages never change once written
+message_json_cache = LRUCache(MESSAGE_JSON_CACHE_SIZE)
+# Per-process like the caches above: sees writes made by this process, plus
+# what index_messages_since picks up (services.search_service catches up
+# on other processes' messages periodically).
+search_index = SearchIndex()
+
+
+def _search_text(message: dict) -> str:
+    return f"{message['username']} {message.get('message', '')}"
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters for the recent-message window and the by-id LRU."""
+    return {
+        'recent': recent_messages.stats(),
+        'by_id': message_cache.stats(),
+        'json': message_json_cache.stats(),
+    }
+
+
+def clear_cache():
+    """Drop all cached messages; the next read reloads from storage."""
+    recent_messages.clear()
+    message_cache.clear()
+    message_json_cache.clear()
+
 
 def create_message(username: str, message: str, media: dict = None) -> dict:
     """Create a new chat message.
@@ -14,50 +192,180 @@ def create_message(username: str, message: str, media: dict = None) -> dict:
     Returns:
         dict: Created message with id, username, message, and optional media
     """
-    db = get_db()
-    messages = db['chat']
-
     message_id = str(uuid.uuid4())
     message_escaped = escape_html(message) if message else ''
     username_escaped = escape_html(username)
 
+    created_at = time.time()
+
     message_doc = {
         'id': message_id,
         'username': username_escaped,
-        'message': message_escaped
+        'message': message_escaped,
+        'created_at': created_at
     }
 
     if media:
         message_doc['media'] = media
 
-    messages.insert_one(message_doc)
+    get_backend().insert_message(message_doc)
 
     result = {
         'id': message_id,
         'username': username_escaped,
-        'message': message_escaped
+        'message': message_escaped,
+        'created_at': created_at
     }
 
     if media:
         result['media'] = media
 
+    _remember_message(result)
+    message_json_cache.set(message_id, json.dumps(result).encode())
+    invalidation.publish('message_created', message_id)
+
     return result
 
 
-def get_all_messages() -> list[dict]:
-    """Get all chat messages.
+def _remember_message(message: dict):
+    message_cache.set(message['id'], message)
+    recent_messages.add(message)
+    search_index.add(message['id'], _search_text(message), _sort_key(message))
+
+
+def _forget_message(message_id: str):
+    cached = message_cache.get(message_id)
+    message_cache.delete(message_id)
+    message_json_cache.delete(message_id)
+    recent_messages.remove(message_id)
+    search_index.remove(message_id, _search_text(cached) if cached else None)
+
+
+def _on_remote_create(message_id: str):
+    """Another server process created a message: add it to the caches."""
+    message = get_backend().find_message(message_id)
+    if message:
+        _remember_message(message)
+
+
+def message_json(message: dict, cache: bool = True) -> bytes:
+    """The message serialized as JSON, encoded once and then served from cache.
+
+    Args:
+        message: Message to serialize
+        cache: Store a newly encoded message (bulk reads pass False so they
+            do not evict the recent history)
+    """
+    encoded = message_json_cache.get(message['id'])
+    if encoded is None:
+        encoded = json.dumps(message).encode()
+        if cache:
+            message_json_cache.set(message['id'], encoded)
+    return encoded
+
+
+def encode_cursor(message: dict) -> str:
+    """Build an opaque pagination cursor from a message's sort key."""
+    created_at = message.get('created_at') or 0.0
+    return f"{created_at!r}_{message['id']}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    """Split a pagination cursor into its (created_at, id) sort key.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    created_at, sep, message_id = cursor.partition('_')
+    if not sep or not message_id:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return float(created_at), message_id
+
+
+def get_all_messages(limit: int = DEFAULT_PAGE_SIZE, before: str = None, after: str = None) -> tuple[list[dict], str | None]:
+    """Get one page of chat messages using keyset pagination.
+
+    Without a cursor the most recent page is returned. Pages are ordered by
+    (created_at, id) so they stay stable while new messages arrive. Pages
+    that run past the oldest message in the hot collection continue into
+    the archive, so retention is invisible to clients.
+
+    Args:
+        limit: Maximum number of messages to return (capped at MAX_PAGE_SIZE)
+        before: Cursor; return messages older than this one
+        after: Cursor; return messages newer than this one
 
     Returns:
-        list: All messages ordered by insertion (oldest first)
+        tuple: (messages oldest first, cursor for the next page or None)
+            The next cursor continues in the same direction: pass it as
+            `before` when paging back, or as `after` when paging forward.
+
+    Raises:
+        ValueError: If both cursors are given or a cursor is malformed
     """
-    db = get_db()
-    messages = db['chat']
+    if before and after:
+        raise ValueError("Only one of before/after may be given")
+
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    before_key = decode_cursor(before) if before else None
+    after_key = decode_cursor(after) if after else None
+
+    if not recent_messages.loaded:
+        _load_recent_messages()
+
+    if after_key is not None:
+        message_list = _page_forward(limit, after_key)
+    else:
+        message_list = _page_back(limit, before_key)
+
+    next_cursor = None
+    if message_list and len(message_list) == limit:
+        next_cursor = encode_cursor(message_list[-1] if after else message_list[0])
+
+    return message_list, next_cursor
+
+
+def _page_back(limit: int, before_key: tuple | None) -> list[dict]:
+    backend = get_backend()
+
+    message_list = recent_messages.page(limit, before_key)
+    if message_list is None:
+        message_list = backend.list_messages(limit, before_key)
+
+    # Archived messages are all older than the hot ones
+    if len(message_list) < limit:
+        boundary = _sort_key(message_list[0]) if message_list else before_key
+        message_list = backend.list_archived_messages(limit - len(message_list), boundary) + message_list
+
+    return message_list
+
+
+def _page_forward(limit: int, after_key: tuple) -> list[dict]:
+    message_list = recent_messages.page(limit, after=after_key)
+    if message_list is not None:
+        return message_list
+
+    backend = get_backend()
+    message_list = backend.list_archived_messages(limit, after=after_key)
 
-    message_list = list(messages.find({}, {'_id': 0}))
+    if len(message_list) < limit:
+        boundary = _sort_key(message_list[-1]) if message_list else after_key
+        message_list = message_list + backend.list_messages(limit - len(message_list), after=boundary)
 
     return message_list
 
 
+def _load_recent_messages():
+    token = recent_messages.load_token()
+
+    newest_first = get_backend().list_messages(recent_messages.maxsize)
+    newest_first.reverse()
+
+    recent_messages.load(newest_first, token)
+    for message in newest_first:
+        message_cache.set(message['id'], message)
+
+
 def get_message_by_id(message_id: str) -> dict | None:
     """Get a specific message by ID.
 
@@ -67,29 +375,171 @@ def get_message_by_id(message_id: str) -> dict | None:
     Returns:
         dict: Message document or None if not found
     """
-    db = get_db()
-    messages = db['chat']
+    message = message_cache.get(message_id)
+    if message is not None:
+        return message
 
-    message = messages.find_one({'id': message_id}, {'_id': 0})
+    backend = get_backend()
+    message = backend.find_message(message_id) or backend.find_archived_message(message_id)
+
+    if message:
+        message_cache.set(message_id, message)
 
     return message
 
 
-def delete_message(message_id: str) -> bool:
+def delete_message(message_id: str, username: str = None) -> bool:
     """Delete a message by ID.
 
     Args:
         message_id: Message ID to delete
+        username: If given, only delete the message when this user owns it
+
+    Returns:
+        bool: True if deleted, False if not found (or not owned by username)
+    """
+    owner = escape_html(username) if username is not None else None
+    backend = get_backend()
+
+    if not (backend.delete_message(message_id, owner) or backend.delete_archived_message(message_id, owner)):
+        # The cached copy may be one another process has since deleted;
+        # make the caller's follow-up lookup read storage
+        message_cache.delete(message_id)
+        return False
+
+    _forget_message(message_id)
+    invalidation.publish('message_deleted', message_id)
+
+    return True
+
+
+def archive_old_messages(max_age: float = 0, max_count: int = 0, batch_size: int = 1000) -> int:
+    """Move messages out of the hot collection into the archive.
+
+    A message is archived when it is older than max_age seconds or is not
+    among the newest max_count messages; 0 disables either limit. Messages
+    move oldest first in batches of batch_size so a large backlog does not
+    hold long locks.
+
+    Returns:
+        int: Number of messages archived
+    """
+    backend = get_backend()
+    cutoffs = []
+
+    if max_age > 0:
+        cutoffs.append((time.time() - max_age, ''))
+
+    if max_count > 0:
+        oldest_kept = backend.message_key_at(max_count - 1)
+        if oldest_kept is not None:
+            cutoffs.append(oldest_kept)
+
+    if not cutoffs:
+        return 0
+
+    cutoff = max(cutoffs)
+    archived = 0
+
+    while True:
+        moved = backend.archive_messages(cutoff, batch_size)
+        archived += moved
+        if moved < batch_size:
+            break
+
+    if archived:
+        _forget_archived(cutoff)
+        invalidation.publish('messages_archived', json.dumps(cutoff))
+
+    return archived
+
+
+def _forget_archived(cutoff: tuple):
+    """Drop messages older than cutoff from the recent window and the
+    by-id cache entries it loaded. Other by-id entries stay: an archived
+    message's content is unchanged."""
+    for message_id in recent_messages.discard_before(cutoff):
+        message_cache.delete(message_id)
+
+
+def _on_remote_archive(cutoff: str):
+    _forget_archived(tuple(json.loads(cutoff)))
+
+
+invalidation.subscribe('message_created', _on_remote_create)
+invalidation.subscribe('message_deleted', _forget_message)
+invalidation.subscribe('messages_archived', _on_remote_archive)
+
+
+def search_messages(query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
+    """Find messages whose text or username contains every word of query.
+
+    Each query word also matches words it is a prefix of. Results come
+    from the in-process search index, newest first, and include archived
+    messages.
+
+    Args:
+        query: Search words
+        limit: Maximum number of messages to return (capped at MAX_PAGE_SIZE)
+
+    Returns:
+        list: Matching messages, newest first
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    results = []
+
+    for message_id in search_index.search(query, limit):
+        message = get_message_by_id(message_id)
+        if message is None:
+            # Deleted by another process
+            search_index.remove(message_id)
+            continue
+        results.append(message)
+
+    return results
+
+
+def iter_messages(after: str = None, batch_size: int = MESSAGE_STREAM_BATCH_SIZE):
+    """Yield every message newer than the after cursor, oldest first.
+
+    Reads the archive and then the hot collection through storage cursors,
+    batch_size messages per round-trip, so the full history never has to
+    be held in memory.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    after_key = decode_cursor(after) if after else None
+    return _iter_messages(after_key, batch_size)
+
+
+def _iter_messages(after_key: tuple | None, batch_size: int):
+    backend = get_backend()
+    key = after_key
+
+    for archived in (True, False):
+        for message in backend.iter_messages(key, batch_size, archived=archived):
+            key = _sort_key(message)
+            yield message
+
+
+def index_messages_since(after_key: tuple = None, batch_size: int = 1000) -> int:
+    """Add every message newer than after_key to the search index.
+
+    Walks the archive and then the hot collection in (created_at, id)
+    order, so the index numbers documents oldest to newest. Messages that
+    are already indexed are skipped.
 
     Returns:
-        bool: True if deleted, False if not found
+        int: Number of messages added
     """
-    db = get_db()
-    messages = db['chat']
+    count = 0
 
-    result = messages.delete_one({'id': message_id})
+    for message in _iter_messages(after_key, batch_size):
+        if search_index.add(message['id'], _search_text(message), _sort_key(message)):
+            count += 1
 
-    return result.deleted_count > 0
+    return count
 
 
 def is_message_owner(message_id: str, username: str) -> bool:
@@ -1,6 +1,140 @@
+import base64
 import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
 import uuid
-from database.connection import get_db
+from datetime import datetime, timedelta, timezone
+from database import invalidation
+from database.storage import get_backend
+from utils.cache import LRUCache, MISSING
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Sessions expire after SESSION_TTL seconds of inactivity. Active sessions
+# slide forward (at most once per half TTL) but never past
+# SESSION_MAX_LIFETIME from login, which is also the auth cookie lifetime.
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 3600))
+SESSION_MAX_LIFETIME = int(os.environ.get('SESSION_MAX_LIFETIME', 86400))
+SESSION_SWEEP_INTERVAL = int(os.environ.get('SESSION_SWEEP_INTERVAL', 300))
+
+# Upper bound (seconds) on how long a cached session or XSRF token may be
+# served after it changed in storage without an invalidation reaching us.
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', 30))
+SESSION_CACHE_NEGATIVE_TTL = float(os.environ.get('SESSION_CACHE_NEGATIVE_TTL', 5))
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 10000))
+
+# 'db' stores one XSRF token per user in the storage backend.
+# 'hmac' issues stateless tokens signed over the session hash, so
+# verification is a CPU-only check with no database access.
+XSRF_MODE = os.environ.get('XSRF_MODE', 'db')
+# Signed tokens are issued once per login and bound to that session, so by
+# default they last as long as the session can; a shorter age would start
+# failing state-changing requests of long-lived sessions.
+XSRF_TOKEN_MAX_AGE = int(os.environ.get('XSRF_TOKEN_MAX_AGE', SESSION_MAX_LIFETIME))
+
+
+def _load_xsrf_keys() -> tuple[str, dict[str, bytes]]:
+    """Parse XSRF_SECRETS ("kid:secret,kid:secret").
+
+    The first key signs new tokens; the others are still accepted so keys
+    can be rotated without invalidating tokens already issued. Without
+    XSRF_SECRETS a random per-process key is used, which only works for a
+    single server process.
+    """
+    configured = os.environ.get('XSRF_SECRETS', '')
+    keys = {}
+    signing_kid = None
+
+    for entry in configured.split(','):
+        kid, sep, secret = entry.strip().partition(':')
+        if not sep or not kid or not secret:
+            continue
+        keys[kid] = secret.encode()
+        if signing_kid is None:
+            signing_kid = kid
+
+    if signing_kid is None:
+        signing_kid = 'local'
+        keys[signing_kid] = secrets.token_bytes(32)
+
+    return signing_kid, keys
+
+
+XSRF_SIGNING_KID, XSRF_KEYS = _load_xsrf_keys()
+
+# token hash -> session document, or None for a token known not to exist
+session_cache = LRUCache(SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+# username -> XSRF token
+xsrf_cache = LRUCache(SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+
+invalidation.subscribe('session', session_cache.delete)
+invalidation.subscribe('xsrf', xsrf_cache.delete)
+
+
+def get_session_cache_stats() -> dict:
+    """Hit/miss counters for the session and XSRF caches."""
+    return {
+        'sessions': session_cache.stats(),
+        'xsrf': xsrf_cache.stats(),
+    }
+
+
+def clear_session_cache():
+    session_cache.clear()
+    xsrf_cache.clear()
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _session_deadline(session: dict, now: datetime) -> datetime:
+    """Latest time a session may be renewed to.
+
+    Sessions stored before created_at existed are never renewed past
+    their current expiry (or one TTL from now if they have none), so they
+    age out instead of sliding forever.
+    """
+    created_at = session.get('created_at')
+    if created_at is None:
+        return session.get('expires_at') or now + timedelta(seconds=SESSION_TTL)
+    return created_at + timedelta(seconds=SESSION_MAX_LIFETIME)
+
+
+def _insert_session(username: str, issue_xsrf: bool) -> tuple[str, str | None]:
+    auth_token = str(uuid.uuid4())
+    token_hash = _hash_token(auth_token)
+    now = _utcnow()
+
+    session = {
+        'username': username,
+        'hash': token_hash,
+        'access_token': auth_token,
+        'created_at': now,
+        'expires_at': now + timedelta(seconds=SESSION_TTL)
+    }
+
+    xsrf_token = None
+    if issue_xsrf:
+        if XSRF_MODE == 'hmac':
+            xsrf_token = create_signed_xsrf_token(username, auth_token)
+        else:
+            xsrf_token = str(uuid.uuid4())
+            session['xsrf_token'] = xsrf_token
+
+    get_backend().insert_session(session)
+
+    session_cache.delete(token_hash)
+
+    return auth_token, xsrf_token
 
 
 def create_session(username: str) -> str:
@@ -12,39 +146,84 @@ def create_session(username: str) -> str:
     Returns:
         str: Authentication token (UUID) - unhashed version for cookie
     """
-    db = get_db()
-    tokens = db['tokens']
+    auth_token, _ = _insert_session(username, issue_xsrf=False)
+    return auth_token
 
-    auth_token = str(uuid.uuid4())
-    token_hash = hashlib.sha256(auth_token.encode()).hexdigest()
 
-    tokens.insert_one({
-        'username': username,
-        'hash': token_hash,
-        'access_token': auth_token
-    })
+def create_session_with_xsrf(username: str) -> tuple[str, str]:
+    """Create a session and its XSRF token in a single insert.
 
-    return auth_token
+    In db mode the XSRF token is stored on the session document; in hmac
+    mode it is signed and nothing extra is stored.
+
+    Args:
+        username: Username to create session for
+
+    Returns:
+        tuple: (auth token, XSRF token)
+    """
+    return _insert_session(username, issue_xsrf=True)
 
 
 def get_session(token: str) -> dict | None:
     """Get session by authentication token.
 
+    Lookups are served from session_cache when possible; unknown tokens are
+    cached too (for SESSION_CACHE_NEGATIVE_TTL) so invalid cookies do not
+    hit storage on every request. Expired sessions are rejected here rather
+    than waiting for the sweeper to remove them, and sessions past half
+    their idle TTL are renewed.
+
     Args:
         token: Authentication token (unhashed)
 
     Returns:
-        dict: Session document with username, hash, access_token, or None if not found
+        dict: Session document with username, hash, access_token, or None if not found or expired
     """
-    db = get_db()
-    tokens = db['tokens']
+    token_hash = _hash_token(token)
+
+    session = session_cache.get(token_hash, MISSING)
+
+    if session is MISSING:
+        session = get_backend().find_session(token_hash)
+
+        if not session:
+            session_cache.set(token_hash, None, ttl=SESSION_CACHE_NEGATIVE_TTL)
+            return None
+
+        session_cache.set(token_hash, session)
+
+    if session is None:
+        return None
 
-    token_hash = hashlib.sha256(token.encode()).hexdigest()
-    session = tokens.find_one({'hash': token_hash}, {'_id': 0})
+    now = _utcnow()
+    expires_at = session.get('expires_at')
+
+    if expires_at is not None and expires_at <= now:
+        session_cache.set(token_hash, None, ttl=SESSION_CACHE_NEGATIVE_TTL)
+        return None
+
+    if expires_at is None or expires_at - now < timedelta(seconds=SESSION_TTL / 2):
+        session = _renew_session(token_hash, session, now)
 
     return session
 
 
+def _renew_session(token_hash: str, session: dict, now: datetime) -> dict:
+    """Slide a session's expiry forward, capped at its maximum lifetime."""
+    expires_at = min(now + timedelta(seconds=SESSION_TTL), _session_deadline(session, now))
+
+    if session.get('expires_at') is not None and expires_at <= session['expires_at']:
+        return session
+
+    get_backend().update_session_expiry(token_hash, expires_at)
+
+    renewed = dict(session, expires_at=expires_at)
+    session_cache.set(token_hash, renewed)
+
+    return renewed
+
+
 def delete_session(token: str) -> bool:
     """Delete session by authentication token.
 
@@ -54,13 +233,13 @@ def delete_session(token: str) -> bool:
     Returns:
         bool: True if session was deleted, False if not found
     """
-    db = get_db()
-    tokens = db['tokens']
+    token_hash = _hash_token(token)
+    deleted = get_backend().delete_session(token_hash)
 
-    token_hash = hashlib.sha256(token.encode()).hexdigest()
-    result = tokens.delete_one({'hash': token_hash})
+    session_cache.delete(token_hash)
+    invalidation.publish('session', token_hash)
 
-    return result.deleted_count > 0
+    return deleted
 
 
 def get_username_from_token(token: str) -> str | None:
@@ -76,25 +255,63 @@ def get_username_from_token(token: str) -> str | None:
     return session['username'] if session else None
 
 
-def create_xsrf_token(username: str) -> str:
+def _sign_xsrf(key: bytes, token_hash: str, username: str, issued_at: int) -> str:
+    message = f"{token_hash}|{username}|{issued_at}".encode()
+    digest = hmac.new(key, message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def create_signed_xsrf_token(username: str, auth_token: str) -> str:
+    """Create a stateless XSRF token bound to a session.
+
+    Format: "<key id>.<issued at>.<signature>" where the signature is an
+    HMAC-SHA256 of the session hash, username and issue time.
+    """
+    issued_at = int(time.time())
+    signature = _sign_xsrf(XSRF_KEYS[XSRF_SIGNING_KID], _hash_token(auth_token), username, issued_at)
+    return f"{XSRF_SIGNING_KID}.{issued_at}.{signature}"
+
+
+def verify_signed_xsrf_token(username: str, token: str, auth_token: str) -> bool:
+    """Verify a stateless XSRF token without touching the database."""
+    try:
+        kid, issued_at, signature = token.split('.')
+        issued_at = int(issued_at)
+    except ValueError:
+        return False
+
+    key = XSRF_KEYS.get(kid)
+    if key is None:
+        return False
+
+    if time.time() - issued_at > XSRF_TOKEN_MAX_AGE:
+        return False
+
+    expected = _sign_xsrf(key, _hash_token(auth_token), username, issued_at)
+    # bytes: compare_digest raises TypeError on non-ASCII str
+    return hmac.compare_digest(expected.encode(), signature.encode())
+
+
+def create_xsrf_token(username: str, auth_token: str = None) -> str:
     """Create XSRF token for user.
 
     Args:
         username: Username to create token for
+        auth_token: Session token the XSRF token is bound to (required in hmac mode)
 
     Returns:
-        str: XSRF token (UUID)
+        str: XSRF token (UUID in db mode, signed token in hmac mode)
     """
-    db = get_db()
-    xsrf_tokens = db['xsrf_tokens']
+    if XSRF_MODE == 'hmac':
+        return create_signed_xsrf_token(username, auth_token)
 
     xsrf_token = str(uuid.uuid4())
+    expires_at = _utcnow() + timedelta(seconds=SESSION_MAX_LIFETIME)
 
-    xsrf_tokens.update_one(
-        {'username': username},
-        {'$set': {'xsrf_token': xsrf_token}},
-        upsert=True
-    )
+    get_backend().upsert_xsrf_token(username, xsrf_token, expires_at)
+
+    xsrf_cache.delete(username)
+    invalidation.publish('xsrf', username)
 
     return xsrf_token
 
@@ -108,25 +325,46 @@ def get_xsrf_token(username: str) -> str | None:
     Returns:
         str: XSRF token if exists, None otherwise
     """
-    db = get_db()
-    xsrf_tokens = db['xsrf_tokens']
+    xsrf_token = xsrf_cache.get(username, MISSING)
+    if xsrf_token is not MISSING:
+        return xsrf_token
+
+    xsrf_token = get_backend().find_xsrf_token(username)
 
-    result = xsrf_tokens.find_one({'username': username}, {'_id': 0})
-    return result['xsrf_token'] if result else None
+    if xsrf_token:
+        xsrf_cache.set(username, xsrf_token)
+    else:
+        xsrf_cache.set(username, None, ttl=SESSION_CACHE_NEGATIVE_TTL)
 
+    return xsrf_token
 
-def verify_xsrf_token(username: str, token: str) -> bool:
+
+def verify_xsrf_token(username: str, token: str, auth_token: str = None) -> bool:
     """Verify XSRF token for user.
 
     Args:
         username: Username
         token: XSRF token to verify
+        auth_token: Session token from the request (required in hmac mode)
 
     Returns:
         bool: True if token matches, False otherwise
     """
+    if XSRF_MODE == 'hmac':
+        if not auth_token:
+            return False
+        return verify_signed_xsrf_token(username, token, auth_token)
+
+    if auth_token:
+        session = get_session(auth_token)
+        if session and session.get('xsrf_token'):
+            if session['username'] != username:
+                return False
+            return hmac.compare_digest(session['xsrf_token'].encode(), token.encode())
+
+    # Sessions created without an XSRF token fall back to the per-user token
     stored_token = get_xsrf_token(username)
-    return stored_token == token if stored_token else False
+    return hmac.compare_digest(stored_token.encode(), token.encode()) if stored_token else False
 
 
 def get_authenticated_user(token: str) -> str | None:
@@ -139,3 +377,38 @@ def get_authenticated_user(token: str) -> str | None:
         str: Username if authenticated, None otherwise
     """
     return get_username_from_token(token)
+
+
+def sweep_expired_sessions() -> dict:
+    """Remove expired sessions and XSRF tokens.
+
+    With MongoDB the TTL indexes on expires_at do this too, but the TTL
+    monitor only runs once a minute and may be disabled; other backends
+    rely on this sweep alone. Documents written before expiry existed get
+    an expires_at so they are eventually reclaimed.
+
+    Returns:
+        dict: Number of documents deleted and backfilled per collection
+    """
+    now = _utcnow()
+    return get_backend().sweep_expired(
+        now,
+        now + timedelta(seconds=SESSION_TTL),
+        now + timedelta(seconds=SESSION_MAX_LIFETIME)
+    )
+
+
+def _sweep_loop(interval: int):
+    while True:
+        time.sleep(interval)
+        try:
+            sweep_expired_sessions()
+        except Exception:
+            log.exception("Session sweeper error")
+
+
+def start_session_sweeper(interval: int = SESSION_SWEEP_INTERVAL):
+    """Run sweep_expired_sessions every interval seconds in a daemon thread."""
+    thread = threading.Thread(target=_sweep_loop, args=(interval,), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,256 @@
+import os
+import time
+from database.storage import get_backend
+from utils.blob_store import BlobStore
+from utils.cache import LRUCache
+
+UPLOAD_CACHE_SIZE = 4096
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', 'uploads')
+# Content-addressed upload bodies; must be on the same filesystem as the
+# directory uploads are spooled to
+UPLOAD_BLOB_DIR = os.environ.get('UPLOAD_BLOB_DIR', os.path.join(UPLOAD_DIR, 'blobs'))
+# Bytes each user may keep uploaded (0 disables the quota)
+UPLOAD_QUOTA_BYTES = int(os.environ.get('UPLOAD_QUOTA_BYTES', 500 * 1024 * 1024))
+
+blob_store = BlobStore(UPLOAD_BLOB_DIR)
+
+# filename -> metadata; an upload's metadata never changes once written
+upload_cache = LRUCache(UPLOAD_CACHE_SIZE)
+
+class UploadQuotaExceeded(Exception):
+    """The upload would take the user past UPLOAD_QUOTA_BYTES."""
+
+
+def _url(filename: str) -> str:
+    return f"/uploads/{filename}"
+
+
+def get_quota_usage(owner: str) -> int:
+    """Bytes currently counted against owner's quota (one lookup)."""
+    return get_backend().get_upload_bytes(owner)
+
+
+def check_quota(owner: str, size: int) -> bool:
+    """Whether owner has room for size more bytes. A cheap early check;
+    create_upload enforces the quota atomically."""
+    return not UPLOAD_QUOTA_BYTES or get_quota_usage(owner) + size <= UPLOAD_QUOTA_BYTES
+
+
+def create_upload(source: str, file_id: str, filename: str, original_filename: str, mime_type: str,
+                  size: int, sha256: str, owner: str) -> dict:
+    """Store an uploaded file and record its metadata.
+
+    The content goes into the blob store under its SHA-256, so identical
+    uploads share one file; filename is a per-upload alias for it and the
+    blob's reference count goes up by one. size is added to the owner's
+    quota counter first, and taken back off if anything fails.
+
+    Args:
+        source: Spooled file holding the content; moved into the blob store
+        file_id: Upload ID
+        filename: Name the file is served under (/uploads/<filename>)
+        original_filename: Name the client sent
+        mime_type: MIME type detected at upload time
+        size: Size in bytes
+        sha256: Hex SHA-256 of the content
+        owner: Username of the uploader
+
+    Returns:
+        dict: The stored metadata document
+
+    Raises:
+        UploadQuotaExceeded: If the upload does not fit in owner's quota
+            (source is left in place)
+    """
+    upload = {
+        'id': file_id,
+        'filename': filename,
+        'original_filename': original_filename,
+        'mime_type': mime_type,
+        'size': size,
+        'sha256': sha256,
+        'owner': owner,
+        'created_at': time.time()
+    }
+
+    backend = get_backend()
+
+    # Reserve the bytes first so concurrent uploads cannot overshoot
+    if backend.add_upload_bytes(owner, size) > UPLOAD_QUOTA_BYTES > 0:
+        backend.add_upload_bytes(owner, -size)
+        raise UploadQuotaExceeded(owner)
+
+    try:
+        # Count the reference before the file goes into place, so a remover
+        # in any process either fails to delete the blob record or sees
+        # the new reference and keeps the file (see _remove_blob)
+        backend.add_blob_ref(sha256, size, mime_type)
+        try:
+            blob_store.store(source, sha256)
+            backend.insert_upload(upload)
+        except BaseException:
+            # The blob stays on disk until collect_unreferenced_blobs
+            backend.release_blob_ref(sha256)
+            raise
+
+    except BaseException:
+        backend.add_upload_bytes(owner, -size)
+        raise
+
+    upload_cache.set(filename, upload)
+
+    return upload
+
+
+def get_upload(filename: str) -> dict | None:
+    """Get an upload's metadata by the filename it is served under.
+
+    Returns:
+        dict: Metadata document or None if there is no such upload
+    """
+    upload = upload_cache.get(filename)
+    if upload is not None:
+        return upload
+
+    upload = get_backend().find_upload(filename)
+    if upload:
+        upload_cache.set(filename, upload)
+
+    return upload
+
+
+def upload_path(upload: dict) -> str:
+    """Path of the blob holding an upload's content."""
+    return blob_store.path(upload['sha256'])
+
+
+def upload_blob_name(upload: dict) -> str:
+    """The blob's path below UPLOAD_BLOB_DIR ("ab/cd/<hash>")."""
+    return blob_store.relative_path(upload['sha256'])
+
+
+def delete_upload(filename: str) -> bool:
+    """Delete an upload: its record, its bytes in the owner's quota, and
+    its reference to the blob (the blob file goes once nothing uses it).
+
+    Returns:
+        bool: True if the upload existed
+    """
+    backend = get_backend()
+    upload = backend.delete_upload(filename)
+    if upload is None:
+        return False
+
+    upload_cache.delete(filename)
+    backend.add_upload_bytes(upload['owner'], -upload['size'])
+    if backend.release_blob_ref(upload['sha256']) == 0:
+        _remove_blob(upload['sha256'])
+
+    return True
+
+
+def _remove_blob(sha256: str) -> bool:
+    """Delete an unreferenced blob's record and file.
+
+    Safe against uploads of the same content in other processes: the
+    record is only deleted while it has no references, and the file is
+    moved aside and put back if an upload recreated the record meanwhile.
+    That upload renames its own copy into place after counting its
+    reference, so the file is present whichever rename lands last.
+    """
+    backend = get_backend()
+    if not backend.delete_blob(sha256):
+        return False
+    blob_store.remove(sha256, still_needed=lambda: backend.find_blob(sha256) is not None)
+    return True
+
+
+def collect_orphaned_uploads(grace: float, batch_size: int = 500) -> int:
+    """Delete uploads no message links to.
+
+    Walks upload records older than grace in batch_size batches and asks
+    the store which of each batch's URLs appear as media.url in the hot or
+    archived messages (an indexed lookup), so memory stays bounded by the
+    batch size. The grace period leaves time to post the message after
+    uploading.
+
+    Returns:
+        int: Number of uploads deleted
+    """
+    backend = get_backend()
+    uploads = backend.iter_uploads(time.time() - grace, batch_size)
+    deleted = 0
+
+    while True:
+        batch = [upload for _, upload in zip(range(batch_size), uploads)]
+        if not batch:
+            return deleted
+
+        referenced = backend.referenced_media_urls([_url(upload['filename']) for upload in batch])
+        for upload in batch:
+            if _url(upload['filename']) not in referenced and delete_upload(upload['filename']):
+                deleted += 1
+
+
+def collect_unreferenced_blobs(batch_size: int = 500) -> int:
+    """Delete blobs whose reference count dropped to zero without the file
+    being removed (e.g. a failed upload).
+
+    Returns:
+        int: Number of blobs deleted
+    """
+    removed = 0
+    while True:
+        blobs = get_backend().list_unreferenced_blobs(batch_size)
+        removed_now = sum(1 for blob in blobs if _remove_blob(blob['sha256']))
+        removed += removed_now
+        if len(blobs) < batch_size or not removed_now:
+            return removed
+
+
+def collect_legacy_uploads(grace: float, batch_size: int = 500) -> int:
+    """Delete files stored directly in UPLOAD_DIR (before uploads had
+    records) that no message links to and that are older than grace.
+
+    The directory is scanned lazily and checked batch_size names at a time.
+
+    Returns:
+        int: Number of files deleted
+    """
+    cutoff = time.time() - grace
+    backend = get_backend()
+    deleted = 0
+
+    def flush(batch):
+        referenced = backend.referenced_media_urls([_url(name) for name in batch])
+        removed = 0
+        for name in batch:
+            if _url(name) not in referenced and get_upload(name) is None:
+                try:
+                    os.remove(os.path.join(UPLOAD_DIR, name))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    try:
+        entries = os.scandir(UPLOAD_DIR)
+    except FileNotFoundError:
+        return 0
+
+    with entries:
+        batch = []
+        for entry in entries:
+            # Dotfiles are spool/session files; directories hold blobs
+            if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                continue
+            if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                continue
+            batch.append(entry.name)
+            if len(batch) == batch_size:
+                deleted += flush(batch)
+                batch = []
+        if batch:
+            deleted += flush(batch)
+
+    return deleted
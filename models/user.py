@@ -1,37 +1,37 @@
-import bcrypt
-from database.connection import get_db
+from database.storage import get_backend
+from utils.passwords import hash_password, check_password
 from utils.security import escape_html
 
 
 def create_user(username: str, password: str) -> bool:
     """Create a new user with hashed password.
 
+    A single insert; the backend's unique username constraint rejects
+    duplicates, so concurrent registrations of the same name cannot both
+    succeed.
+
     Args:
         username: User's username (will be HTML-escaped)
         password: Plain text password (will be hashed with bcrypt)
 
     Returns:
         bool: True if user created successfully, False if username already exists
-    """
-    db = get_db()
-    users = db['users']
 
+    Raises:
+        HasherBusy: If the password hashing queue is full
+    """
     username_escaped = escape_html(username)
 
-    if users.find_one({'username': username_escaped}):
-        return False
-
-    salt = bcrypt.gensalt()
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
+    password_hash = hash_password(password)
+    # bcrypt hashes embed their salt: "$2b$<cost>$" + 22 salt characters
+    salt = password_hash[:29]
 
-    users.insert_one({
+    return get_backend().insert_user({
         'username': username_escaped,
         'salt': salt,
         'hash': password_hash
     })
 
-    return True
-
 
 def get_user(username: str) -> dict | None:
     """Get user by username.
@@ -42,13 +42,8 @@ def get_user(username: str) -> dict | None:
     Returns:
         dict: User document with username, salt, hash, or None if not found
     """
-    db = get_db()
-    users = db['users']
-
     username_escaped = escape_html(username)
-    user = users.find_one({'username': username_escaped}, {'_id': 0})
-
-    return user
+    return get_backend().find_user(username_escaped)
 
 
 def user_exists(username: str) -> bool:
@@ -72,6 +67,9 @@ def verify_password(username: str, password: str) -> bool:
 
     Returns:
         bool: True if password matches, False otherwise
+
+    Raises:
+        HasherBusy: If the password hashing queue is full
     """
     user = get_user(username)
 
@@ -80,4 +78,4 @@ def verify_password(username: str, password: str) -> bool:
 
     stored_hash = user['hash']
 
-    return bcrypt.checkpw(password.encode('utf-8'), stored_hash)
+    return check_password(password, stored_hash)
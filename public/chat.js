@@ -136,9 +136,9 @@ logoutBtn.addEventListener('click', async () => {
 async function loadMessages() {
     try {
         const response = await fetch('/chat-messages');
-        const messages = await response.json();
+        const page = await response.json();
 
-        messages.forEach(msg => {
+        page.messages.forEach(msg => {
             addMessage(msg.username, msg.message || '', msg.id, false, msg.media || null);
         });
 
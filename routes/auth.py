@@ -1,7 +1,8 @@
 from core.router import Router
 from core.response import Response
-from services.auth_service import register_user, login_user, logout_user
+from services.auth_service import register_user, login_user, logout_user, SESSION_MAX_LIFETIME
 from app.middleware.auth import require_auth
+from core.errors import ServiceUnavailable
 
 router = Router()
 
@@ -17,6 +18,7 @@ def handle_register(request):
     Returns:
         - 201 Created if successful
         - 400 Bad Request if validation fails
+        - 503 Service Unavailable if password hashing or the database is saturated
     """
     try:
         form_data = request.form_data()
@@ -38,6 +40,10 @@ def handle_register(request):
             response = Response.bad_request(message.encode())
             return response.to_bytes()
 
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Server busy, try again shortly", retry_after=e.retry_after)
+        return response.to_bytes()
+
     except Exception as e:
         response = Response.server_error(f"Registration failed: {str(e)}".encode())
         return response.to_bytes()
@@ -54,6 +60,7 @@ def handle_login(request):
     Returns:
         - 200 OK with cookies set if successful
         - 401 Unauthorized if credentials invalid
+        - 503 Service Unavailable if password hashing or the database is saturated
     """
     try:
         form_data = request.form_data()
@@ -69,8 +76,8 @@ def handle_login(request):
         if success:
             response = Response()
             response.status(200)
-            response.set_cookie('auth_token', auth_token, http_only=True, secure=True, max_age=3600)
-            response.set_cookie('auth', 'true', max_age=3600)
+            response.set_cookie('auth_token', auth_token, http_only=True, secure=True, max_age=SESSION_MAX_LIFETIME)
+            response.set_cookie('auth', 'true', max_age=SESSION_MAX_LIFETIME)
             response.text("Login successful")
             return response.to_bytes()
         else:
@@ -79,6 +86,10 @@ def handle_login(request):
             response.text("Invalid credentials")
             return response.to_bytes()
 
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Server busy, try again shortly", retry_after=e.retry_after)
+        return response.to_bytes()
+
     except Exception as e:
         response = Response.server_error(f"Login failed: {str(e)}".encode())
         return response.to_bytes()
@@ -106,6 +117,10 @@ def handle_logout(request):
         response.redirect('/')
         return response.to_bytes()
 
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Server busy, try again shortly", retry_after=e.retry_after)
+        return response.to_bytes()
+
     except Exception as e:
         response = Response.server_error(f"Logout failed: {str(e)}".encode())
         return response.to_bytes()
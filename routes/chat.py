@@ -1,26 +1,51 @@
 from core.router import Router
-from core.response import Response
-from services.chat_service import get_messages, post_message, delete_message
+from core.response import Response, StreamingResponse
+from services.chat_service import (
+    get_messages_json, encode_messages, stream_messages_json, post_message, delete_message, DEFAULT_PAGE_SIZE
+)
+from services.search_service import search_messages, DEFAULT_SEARCH_LIMIT
 from app.middleware.auth import require_auth, optional_auth
 from app.middleware.xsrf import require_xsrf
+from core.errors import ServiceUnavailable
 
 router = Router()
 
 
 @router.get('/chat-messages')
 def handle_get_messages(request):
-    """Get all chat messages.
+    """Get a page of chat messages.
 
     No authentication required.
 
+    Query params:
+        - limit: int, page size (default 50, max 200)
+        - before: cursor, return messages older than it
+        - after: cursor, return messages newer than it
+
+    Without a cursor the most recent page is returned.
+
     Returns:
-        200 OK with JSON array of messages
+        200 OK with JSON {"messages": [...], "next": cursor or null}
+        400 Bad Request if the query params are invalid
+        503 Service Unavailable if the database is down
     """
     try:
-        messages = get_messages()
+        limit = request.query_params.get('limit', DEFAULT_PAGE_SIZE)
+        before = request.query_params.get('before')
+        after = request.query_params.get('after')
+
+        try:
+            body = get_messages_json(int(limit), before, after)
+        except ValueError as e:
+            response = Response.bad_request(str(e).encode())
+            return response.to_bytes()
 
         response = Response()
-        response.json(messages)
+        response.json_bytes(body)
+        return response.to_bytes()
+
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
         return response.to_bytes()
 
     except Exception as e:
@@ -28,6 +53,85 @@ def handle_get_messages(request):
         return response.to_bytes()
 
 
+@router.get('/chat-messages/export')
+def handle_export_messages(request):
+    """Stream the full chat history, oldest first, archived messages included.
+
+    No authentication required.
+
+    Query params:
+        - after: cursor, only return messages newer than it
+
+    Returns:
+        200 OK with chunked JSON {"messages": [...]}
+        400 Bad Request if the cursor is invalid
+        503 Service Unavailable if the database is down
+    """
+    try:
+        after = request.query_params.get('after')
+
+        try:
+            body = stream_messages_json(after)
+        except ValueError as e:
+            response = Response.bad_request(str(e).encode())
+            return response.to_bytes()
+
+        response = StreamingResponse(body)
+        response.set_header("Content-Type", "application/json; charset=utf-8")
+        return response
+
+    except Exception as e:
+        response = Response.server_error(f"Failed to export messages: {str(e)}".encode())
+        return response.to_bytes()
+
+
+@router.get('/chat-messages/search')
+def handle_search_messages(request):
+    """Search chat messages.
+
+    No authentication required.
+
+    Query params:
+        - q: str, words that must all appear in the message text or username
+          (each word also matches as a prefix)
+        - limit: int, maximum results (default 20, max 200)
+
+    Returns:
+        200 OK with JSON {"messages": [...]}, newest first
+        400 Bad Request if the query params are invalid
+        503 Service Unavailable if the database is down
+    """
+    try:
+        query = request.query_params.get('q', '')
+        limit = request.query_params.get('limit', DEFAULT_SEARCH_LIMIT)
+
+        if not isinstance(query, str):
+            response = Response.bad_request(b"Only one q parameter is allowed")
+            return response.to_bytes()
+
+        try:
+            success, result = search_messages(query, int(limit))
+        except ValueError as e:
+            response = Response.bad_request(str(e).encode())
+            return response.to_bytes()
+
+        if not success:
+            response = Response.bad_request(result.encode())
+            return response.to_bytes()
+
+        response = Response()
+        response.json_bytes(encode_messages(result))
+        return response.to_bytes()
+
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
+        return response.to_bytes()
+
+    except Exception as e:
+        response = Response.server_error(f"Failed to search messages: {str(e)}".encode())
+        return response.to_bytes()
+
+
 @router.post('/chat-messages')
 @optional_auth
 def handle_post_message(request):
@@ -56,7 +160,7 @@ def handle_post_message(request):
                 return response.to_bytes()
 
             from models.session import verify_xsrf_token
-            if not verify_xsrf_token(username, xsrf_token):
+            if not verify_xsrf_token(username, xsrf_token, request.cookies.get('auth_token')):
                 response = Response.bad_request(b"Invalid XSRF token")
                 response.status(403)
                 return response.to_bytes()
@@ -86,6 +190,10 @@ def handle_post_message(request):
             response = Response.bad_request(result.encode())
             return response.to_bytes()
 
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
+        return response.to_bytes()
+
     except Exception as e:
         response = Response.server_error(f"Failed to post message: {str(e)}".encode())
         return response.to_bytes()
@@ -128,6 +236,10 @@ def handle_delete_message(request):
                 response = Response.not_found(message.encode())
                 return response.to_bytes()
 
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
+        return response.to_bytes()
+
     except Exception as e:
         response = Response.server_error(f"Failed to delete message: {str(e)}".encode())
         return response.to_bytes()
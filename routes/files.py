@@ -1,15 +1,25 @@
+import io
 import os
 import uuid
 from core.router import Router
 from core.response import Response
+from core.file_response import file_response, accel_redirect, X_ACCEL_REDIRECT_PREFIX
 from app.middleware.auth import require_auth
-from utils.multipart import parse_multipart
+from core.errors import ServiceUnavailable
+from models.upload import (
+    UPLOAD_DIR, UploadQuotaExceeded, create_upload, get_upload, upload_path, upload_blob_name, check_quota
+)
+from services.upload_service import upload_sessions
+from utils.upload_sessions import TooManyUploadSessions
+from utils.multipart import MultipartParser, MultipartError, PayloadTooLarge, SpoolingHandler
 from utils.mime import detect_mime_type
 
 router = Router()
 
-UPLOAD_DIR = "uploads"
 MAX_FILE_SIZE = 10 * 1024 * 1024
+# Room for the multipart framing and small form fields around the file
+MAX_UPLOAD_REQUEST_SIZE = MAX_FILE_SIZE + 64 * 1024
+UPLOAD_READ_SIZE = 64 * 1024
 
 ALLOWED_MIME_TYPES = {
     "image/jpeg": ".jpg",
@@ -25,7 +35,7 @@ def ensure_upload_directory():
         os.makedirs(UPLOAD_DIR)
 
 
-@router.post('/upload-file')
+@router.post('/upload-file', stream_body=True)
 @require_auth
 def handle_file_upload(request):
     """Handle file upload.
@@ -35,17 +45,21 @@ def handle_file_upload(request):
     Expects multipart/form-data with:
         - file: binary file data
 
+    The body is parsed as it arrives from the socket: the file part is
+    written to a temp file in UPLOAD_DIR while it is hashed and sniffed,
+    and the upload is rejected as soon as it crosses MAX_FILE_SIZE. The
+    content is then stored once per SHA-256; the returned filename is an
+    alias for it.
+
     Returns:
         201 Created with file metadata
         400 Bad Request if validation fails
-        413 Payload Too Large if file exceeds limit
+        413 Payload Too Large if file exceeds limit or the user's upload quota
     """
+    spool = None
+
     try:
-        content_type = None
-        for name, value in request.headers.items():
-            if name.lower() == 'content-type':
-                content_type = value
-                break
+        content_type = request.get_header('Content-Type')
 
         if not content_type or not content_type.startswith('multipart/form-data'):
             response = Response.bad_request(b"Expected multipart/form-data")
@@ -56,32 +70,43 @@ def handle_file_upload(request):
             response = Response.bad_request(b"Missing boundary in Content-Type")
             return response.to_bytes()
 
-        boundary = boundary_parts[1].strip()
+        boundary = boundary_parts[1].strip().strip('"')
 
-        multipart = parse_multipart(request)
+        content_length = int(request.get_header('Content-Length', 0) or 0)
+        if content_length > MAX_UPLOAD_REQUEST_SIZE:
+            return _payload_too_large()
 
-        print(f"Found {len(multipart.parts)} parts")
-        for part in multipart.parts:
-            print(f"Part name: {part.name}, filename: {part.filename}")
+        # Reject before reading the body if even the smallest file this
+        # request can carry would not fit
+        if not check_quota(request.user, content_length - (MAX_UPLOAD_REQUEST_SIZE - MAX_FILE_SIZE)):
+            return _quota_exceeded()
 
-        file_part = None
-        for part in multipart.parts:
-            if part.name == 'file' and part.filename:
-                file_part = part
-                break
+        ensure_upload_directory()
 
-        if not file_part:
-            print("No file part found with name='file' and filename")
-            response = Response.bad_request(b"No file provided")
+        body = request.body_stream or io.BytesIO(request.body)
+        spool = SpoolingHandler(UPLOAD_DIR, MAX_FILE_SIZE)
+        parser = MultipartParser(boundary, spool)
+
+        try:
+            while True:
+                chunk = body.read(UPLOAD_READ_SIZE)
+                if not chunk:
+                    break
+                parser.feed(chunk)
+            parser.close()
+        except PayloadTooLarge:
+            return _payload_too_large()
+        except MultipartError as e:
+            response = Response.bad_request(f"Invalid multipart body: {e}".encode())
             return response.to_bytes()
 
-        if len(file_part.content) > MAX_FILE_SIZE:
-            response = Response()
-            response.status(413)
-            response.text("File size exceeds 10MB limit")
+        file_part = spool.file('file')
+
+        if not file_part:
+            response = Response.bad_request(b"No file provided")
             return response.to_bytes()
 
-        detected_mime, detected_ext = detect_mime_type(file_part.content)
+        detected_mime = file_part.mime_type
 
         if detected_mime not in ALLOWED_MIME_TYPES:
             response = Response.bad_request(
@@ -89,43 +114,329 @@ def handle_file_upload(request):
             )
             return response.to_bytes()
 
-        ensure_upload_directory()
-
         file_id = str(uuid.uuid4())
         file_extension = ALLOWED_MIME_TYPES[detected_mime]
         filename = f"{file_id}{file_extension}"
-        filepath = os.path.join(UPLOAD_DIR, filename)
 
-        with open(filepath, 'wb') as f:
-            f.write(file_part.content)
+        try:
+            upload = create_upload(file_part.path, file_id, filename, file_part.filename, detected_mime,
+                                   file_part.size, file_part.sha256, request.user)
+        except UploadQuotaExceeded:
+            return _quota_exceeded()
+
+        return _upload_created(upload)
+
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
+        return response.to_bytes()
+
+    except Exception as e:
+        response = Response.server_error(f"File upload failed: {str(e)}".encode())
+        return response.to_bytes()
+
+    finally:
+        if spool is not None:
+            spool.discard()
+
+
+def _upload_created(upload: dict) -> bytes:
+    response = Response()
+    response.status(201)
+    response.json({
+        'id': upload['id'],
+        'filename': upload['filename'],
+        'original_filename': upload['original_filename'],
+        'mime_type': upload['mime_type'],
+        'size': upload['size'],
+        'sha256': upload['sha256'],
+        'url': f"/uploads/{upload['filename']}",
+        'uploaded_by': upload['owner'],
+        'created_at': upload['created_at']
+    })
+    return response.to_bytes()
+
+
+def _payload_too_large() -> bytes:
+    response = Response()
+    response.status(413)
+    response.text("File size exceeds 10MB limit")
+    return response.to_bytes()
+
+
+def _quota_exceeded() -> bytes:
+    response = Response()
+    response.status(413)
+    response.text("Upload quota exceeded")
+    return response.to_bytes()
+
+
+def _session_progress(session, status_code: int = 200) -> bytes:
+    progress = session.progress()
+    progress['url'] = f"/upload-sessions/{session.id}"
+    response = Response()
+    response.status(status_code)
+    response.set_header("Upload-Offset", str(progress['offset']))
+    response.json(progress)
+    return response.to_bytes()
+
+
+def _session_not_found() -> bytes:
+    response = Response.not_found(b"Upload session not found")
+    return response.to_bytes()
+
+
+@router.post('/upload-sessions')
+@require_auth
+def handle_create_upload_session(request):
+    """Start a resumable upload.
+
+    Requires authentication.
+
+    Expects JSON or form data:
+        - size: int, total file size in bytes
+        - filename: str, optional original filename
+
+    The file is then sent with PUT /upload-sessions/{id} in chunks of any
+    size, in any order and possibly in parallel, and assembled with
+    POST /upload-sessions/{id}/complete. Sessions left idle for
+    UPLOAD_SESSION_TTL are discarded.
+
+    Returns:
+        201 Created with the session's progress (id, size, offset, received,
+            missing byte ranges, url)
+        400 Bad Request if size is missing or invalid
+        413 Payload Too Large if size exceeds MAX_FILE_SIZE or the user's
+            upload quota
+        429 Too Many Requests if the user has too many open sessions
+    """
+    try:
+        data = request.json() or request.form_data()
+
+        try:
+            size = int(data.get('size'))
+        except (TypeError, ValueError):
+            response = Response.bad_request(b"size must be an integer")
+            return response.to_bytes()
+
+        if size <= 0:
+            response = Response.bad_request(b"size must be positive")
+            return response.to_bytes()
+
+        if size > MAX_FILE_SIZE:
+            return _payload_too_large()
+
+        if not check_quota(request.user, size):
+            return _quota_exceeded()
+
+        filename = data.get('filename')
+        if filename is not None and not isinstance(filename, str):
+            response = Response.bad_request(b"filename must be a string")
+            return response.to_bytes()
+
+        try:
+            session = upload_sessions.create(request.user, size, filename)
+        except TooManyUploadSessions:
+            response = Response()
+            response.status(429)
+            response.text("Too many open upload sessions")
+            return response.to_bytes()
+
+        return _session_progress(session, 201)
+
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
+        return response.to_bytes()
+
+    except Exception as e:
+        response = Response.server_error(f"Failed to start upload: {str(e)}".encode())
+        return response.to_bytes()
+
+
+@router.get('/upload-sessions/{session_id}')
+@require_auth
+def handle_get_upload_session(request):
+    """Report which bytes of a resumable upload have been received.
+
+    Returns:
+        200 OK with the session's progress; Upload-Offset is the length of
+            the contiguous prefix received so far
+        404 Not Found if the session does not exist or is not the user's
+    """
+    session = upload_sessions.get(request.path_params.get('session_id'), request.user)
+    if session is None:
+        return _session_not_found()
+
+    session.touch()
+    return _session_progress(session)
+
+
+@router.put('/upload-sessions/{session_id}', stream_body=True)
+@require_auth
+def handle_upload_chunk(request):
+    """Write one chunk of a resumable upload.
+
+    Headers:
+        - Upload-Offset: int, where in the file the body goes
+        - Content-Length: int, chunk size
+
+    The body is written straight into the session file at its offset as it
+    arrives. If the connection drops, the bytes that did arrive still
+    count; GET the session to see what is missing.
+
+    Returns:
+        200 OK with the session's progress
+        400 Bad Request if the offset is invalid, the chunk runs past the
+            end of the file, or the body is incomplete
+        404 Not Found if the session does not exist or is not the user's
+        409 Conflict if the session is being completed
+    """
+    session = upload_sessions.get(request.path_params.get('session_id'), request.user)
+    if session is None:
+        return _session_not_found()
+
+    try:
+        offset = int(request.get_header('Upload-Offset', ''))
+        length = int(request.get_header('Content-Length', ''))
+    except ValueError:
+        response = Response.bad_request(b"Upload-Offset and Content-Length are required")
+        return response.to_bytes()
+
+    if offset < 0 or length <= 0 or offset + length > session.size:
+        response = Response.bad_request(b"Chunk is outside the file")
+        return response.to_bytes()
+
+    if not session.begin_write():
+        response = Response.bad_request(b"Upload is being completed")
+        response.status(409)
+        return response.to_bytes()
+
+    written = 0
+    try:
+        body = request.body_stream or io.BytesIO(request.body)
+        fd = os.open(session.path, os.O_WRONLY)
+        try:
+            while written < length:
+                chunk = body.read(min(UPLOAD_READ_SIZE, length - written))
+                if not chunk:
+                    break
+                os.pwrite(fd, chunk, offset + written)
+                written += len(chunk)
+        finally:
+            os.close(fd)
+
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
+        return response.to_bytes()
+
+    except Exception as e:
+        response = Response.server_error(f"Chunk upload failed: {str(e)}".encode())
+        return response.to_bytes()
+
+    finally:
+        session.end_write(offset, offset + written)
+
+    if written < length:
+        response = Response.bad_request(b"Incomplete chunk")
+        return response.to_bytes()
+
+    return _session_progress(session)
+
 
-        file_metadata = {
-            'id': file_id,
-            'filename': filename,
-            'original_filename': file_part.filename,
-            'mime_type': detected_mime,
-            'size': len(file_part.content),
-            'url': f"/uploads/{filename}",
-            'uploaded_by': request.user
-        }
+@router.post('/upload-sessions/{session_id}/complete')
+@require_auth
+def handle_complete_upload_session(request):
+    """Assemble a resumable upload into a stored file.
+
+    The assembled file is hashed and its type is detected exactly as for
+    POST /upload-file.
+
+    Returns:
+        201 Created with file metadata (same as POST /upload-file)
+        400 Bad Request if the file type is not allowed (the session is
+            discarded)
+        404 Not Found if the session does not exist or is not the user's
+        409 Conflict if bytes are missing or chunks are still being written
+        413 Payload Too Large if the file does not fit in the user's quota
+        503 Service Unavailable if storage is down (the session is kept)
+    """
+    session = upload_sessions.get(request.path_params.get('session_id'), request.user)
+    if session is None:
+        return _session_not_found()
 
+    if not session.begin_complete():
         response = Response()
-        response.status(201)
-        response.json(file_metadata)
+        response.status(409)
+        response.set_header("Upload-Offset", str(session.progress()['offset']))
+        response.json({'error': "Upload is incomplete or still in progress", **session.progress()})
+        return response.to_bytes()
+
+    try:
+        sha256, head = session.digest()
+        detected_mime, _ = detect_mime_type(head)
+
+        if detected_mime not in ALLOWED_MIME_TYPES:
+            upload_sessions.remove(session.id)
+            response = Response.bad_request(
+                f"File type not allowed. Only images (JPEG, PNG, GIF) and MP4 videos are permitted.".encode()
+            )
+            return response.to_bytes()
+
+        file_id = str(uuid.uuid4())
+        filename = f"{file_id}{ALLOWED_MIME_TYPES[detected_mime]}"
+
+        try:
+            upload = create_upload(session.path, file_id, filename, session.filename, detected_mime,
+                                   session.size, sha256, request.user)
+        except UploadQuotaExceeded:
+            # Keep the session so it can be completed once space is freed
+            session.abort_complete()
+            return _quota_exceeded()
+
+        upload_sessions.remove(session.id)
+
+        return _upload_created(upload)
+
+    except ServiceUnavailable as e:
+        _release_completion(session)
+        response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
         return response.to_bytes()
 
     except Exception as e:
+        _release_completion(session)
         response = Response.server_error(f"File upload failed: {str(e)}".encode())
         return response.to_bytes()
 
 
+def _release_completion(session):
+    """Let a failed completion be retried, unless its file is already gone."""
+    if os.path.exists(session.path):
+        session.abort_complete()
+    else:
+        # The file already moved into the blob store; nothing to retry
+        upload_sessions.remove(session.id)
+
+
 @router.get('/uploads/{filename}')
 def handle_file_download(request):
     """Serve uploaded files.
 
+    filename is an upload alias: its metadata names the content-addressed
+    blob to send and provides the MIME type, ETag (the content's SHA-256)
+    and Last-Modified, so the blob is only opened to be sent with sendfile.
+    Files uploaded before metadata was recorded are read from UPLOAD_DIR
+    and sniffed instead. Supports conditional requests, Range (single, suffix
+    and multiple ranges) and If-Range.
+
+    With X_ACCEL_REDIRECT_PREFIX set, only the lookup happens here: the
+    response names the blob (<prefix>/blobs/ab/cd/<hash>) or legacy file
+    (<prefix>/uploads/<filename>) in X-Accel-Redirect and nginx sends it.
+
     Returns:
         200 OK with file content
+        206 Partial Content for satisfiable Range requests
+        304 Not Modified if the client's copy is current
         404 Not Found if file doesn't exist
+        416 Range Not Satisfiable if no requested range overlaps the file
     """
     try:
         filename = request.path_params.get('filename')
@@ -138,22 +449,30 @@ def handle_file_download(request):
             response = Response.bad_request(b"Invalid filename")
             return response.to_bytes()
 
-        filepath = os.path.join(UPLOAD_DIR, filename)
+        headers = {"Cache-Control": "public, max-age=31536000"}
 
-        if not os.path.exists(filepath):
-            response = Response.not_found(b"File not found")
-            return response.to_bytes()
+        upload = get_upload(filename)
 
-        with open(filepath, 'rb') as f:
-            file_content = f.read()
+        try:
+            if upload:
+                if X_ACCEL_REDIRECT_PREFIX:
+                    return accel_redirect(f"blobs/{upload_blob_name(upload)}", upload['mime_type'], headers)
+                return file_response(request, upload_path(upload), upload['mime_type'], headers,
+                                     etag=f'"{upload["sha256"]}"', last_modified=upload['created_at'])
 
-        mime_type, _ = detect_mime_type(file_content)
+            filepath = os.path.join(UPLOAD_DIR, filename)
+            with open(filepath, 'rb') as f:
+                mime_type, _ = detect_mime_type(f.read(16))
+            if X_ACCEL_REDIRECT_PREFIX:
+                return accel_redirect(f"uploads/{filename}", mime_type, headers)
+            return file_response(request, filepath, mime_type, headers)
 
-        response = Response()
-        response.status(200)
-        response.set_header("Content-Type", mime_type)
-        response.set_header("Cache-Control", "public, max-age=31536000")
-        response.body = file_content
+        except (FileNotFoundError, IsADirectoryError):
+            response = Response.not_found(b"File not found")
+            return response.to_bytes()
+
+    except ServiceUnavailable as e:
+        response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
         return response.to_bytes()
 
     except Exception as e:
@@ -0,0 +1,21 @@
+from core.router import Router
+from core.response import Response
+from utils.metrics import REGISTRY, CONTENT_TYPE
+
+router = Router()
+
+
+@router.get('/metrics')
+def handle_metrics(request):
+    """Expose the metrics registry in the Prometheus text format.
+
+    Meant for a scraper on the internal network; nginx does not proxy it.
+
+    Returns:
+        - 200 OK with every registered metric
+    """
+    response = Response()
+    response.set_header("Content-Type", CONTENT_TYPE)
+    response.set_header("Cache-Control", "no-store")
+    response.body = REGISTRY.expose()
+    return response.to_bytes()
@@ -7,14 +7,15 @@ from core.websocket import (
 )
 from models.session import get_authenticated_user
 from services.chat_service import post_message
+from utils.log import get_logger
+
+log = get_logger(__name__)
 
 ws_manager = WebSocketManager()
 
 
 def handle_websocket_upgrade(request, client_socket):
     """Handle WebSocket upgrade from HTTP request."""
-    print(f"WebSocket upgrade requested from {request.path}")
-
     websocket_key = None
 
     for name, value in request.headers.items():
@@ -23,7 +24,7 @@ def handle_websocket_upgrade(request, client_socket):
             break
 
     if not websocket_key:
-        print("No WebSocket key found")
+        log.warning("WebSocket upgrade without Sec-WebSocket-Key", path=request.path)
         return b"HTTP/1.1 400 Bad Request\r\n\r\n"
 
     auth_token = request.cookies.get('auth_token')
@@ -32,15 +33,13 @@ def handle_websocket_upgrade(request, client_socket):
     if auth_token:
         username = get_authenticated_user(auth_token)
 
-    print(f"WebSocket connection for user: {username if username else 'guest'}")
-
     handshake_response = create_handshake_response(websocket_key)
     client_socket.sendall(handshake_response)
 
     connection = WebSocketConnection(client_socket, username)
     ws_manager.add_connection(connection)
 
-    print(f"Total connections: {ws_manager.get_connection_count()}")
+    log.info("WebSocket connected", user=username or 'guest', connections=ws_manager.get_connection_count())
 
     connection.send_json({
         'type': 'welcome',
@@ -56,14 +55,11 @@ def handle_websocket_messages(connection: WebSocketConnection):
     """Handle incoming WebSocket messages from a connection."""
     buffer = b''
 
-    print(f"Starting message handling for connection")
-
     while not connection.closed:
         try:
             data = connection.socket.recv(4096)
 
             if not data:
-                print(f"No data received, closing connection")
                 break
 
             buffer += data
@@ -97,17 +93,18 @@ def handle_websocket_messages(connection: WebSocketConnection):
                 elif frame.is_text():
                     try:
                         message_data = json.loads(frame.payload.decode('utf-8'))
-                        print(f"Received message data: {message_data}")
+                        log.debug("WebSocket message", user=connection.username, type=message_data.get('type'),
+                                  size=len(frame.payload))
                         handle_message(connection, message_data)
                     except (json.JSONDecodeError, UnicodeDecodeError) as e:
-                        print(f"Error decoding message: {e}")
+                        log.warning("Undecodable WebSocket message", user=connection.username, error=e)
 
         except Exception as e:
-            print(f"Error in message handling: {e}")
+            log.exception("WebSocket message handling failed", user=connection.username)
             break
 
-    print(f"WebSocket connection closed")
     ws_manager.remove_connection(connection)
+    log.info("WebSocket closed", user=connection.username or 'guest')
     broadcast_online_users()
 
 
@@ -139,12 +136,9 @@ def handle_chat_message(connection: WebSocketConnection, data: dict):
 
     username = connection.username if connection.username else 'guest'
 
-    print(f"Chat message from {username}: {message_text[:50] if message_text else '[media]'}")
-
     success, result = post_message(username, message_text, media)
 
     if success:
-        print(f"Broadcasting message to {ws_manager.get_connection_count()} connections")
         broadcast_data = {
             'type': 'chat',
             'id': result['id'],
@@ -157,7 +151,7 @@ def handle_chat_message(connection: WebSocketConnection, data: dict):
 
         ws_manager.broadcast(broadcast_data)
     else:
-        print(f"Failed to post message: {result}")
+        log.warning("Chat message rejected", user=username, reason=result)
 
 
 def handle_webrtc_signal(connection: WebSocketConnection, data: dict):
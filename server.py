@@ -1,16 +1,33 @@
 import socket
 import os
+import re
 import threading
-from core.request import Request
-from core.response import Response
-from core.router import Router
-from routes import auth, chat, files
+from core.request import BodyStream, Request
+from core.response import Response, StreamingResponse
+from core.file_response import accel_redirect, X_ACCEL_REDIRECT_PREFIX
+from core.router import Router, response_status
+from routes import auth, chat, files, metrics
 from routes.websocket import handle_websocket_upgrade
+from database import invalidation
+from database.connection import warm_up_db
+from database.storage import STORAGE_BACKEND, get_backend
+from core.errors import ServiceUnavailable
+from models.session import start_session_sweeper
+from services.retention_service import start_retention_worker
+from services.search_service import start_search_index
+from services.upload_service import start_upload_session_sweeper, start_upload_gc_worker
+from utils.log import get_logger, configure_logging, new_request_id, set_request_id
+from utils.trace import start_trace, finish_trace, discard_trace, span
+
+log = get_logger("server")
 
 HOST = '0.0.0.0'
 PORT = 8080
 STATIC_DIR = 'public'
 
+# Accepted from X-Request-ID (nginx sets it); anything else gets a new id
+_REQUEST_ID_RE = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
 main_router = Router()
 
 
@@ -25,14 +42,37 @@ def register_routes():
     for route in files.router.routes:
         main_router.routes.append(route)
 
+    for route in metrics.router.routes:
+        main_router.routes.append(route)
+
+
+STATIC_CONTENT_TYPES = {
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.json': 'application/json',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.svg': 'image/svg+xml',
+    '.ico': 'image/x-icon',
+}
+
 
 def serve_static_file(path: str) -> bytes:
-    """Serve static files from public directory."""
+    """Serve static files from public directory.
+
+    With X_ACCEL_REDIRECT_PREFIX set, the file is handed to nginx's
+    internal <prefix>/public/ location instead of being read here.
+    """
     if path == '/':
         path = '/index.html'
 
-    if '..' in path or path.startswith('/'):
-        path = path.lstrip('/')
+    path = path.lstrip('/')
+
+    if '..' in path.split('/'):
+        response = Response.not_found(b"File not found")
+        return response.to_bytes()
 
     filepath = os.path.join(STATIC_DIR, path)
 
@@ -40,28 +80,15 @@ def serve_static_file(path: str) -> bytes:
         response = Response.not_found(b"File not found")
         return response.to_bytes()
 
+    content_type = STATIC_CONTENT_TYPES.get(os.path.splitext(filepath)[1], 'text/html')
+
+    if X_ACCEL_REDIRECT_PREFIX:
+        return accel_redirect(f"public/{path}", content_type)
+
     try:
         with open(filepath, 'rb') as f:
             content = f.read()
 
-        content_type = 'text/html'
-        if filepath.endswith('.css'):
-            content_type = 'text/css'
-        elif filepath.endswith('.js'):
-            content_type = 'application/javascript'
-        elif filepath.endswith('.json'):
-            content_type = 'application/json'
-        elif filepath.endswith('.png'):
-            content_type = 'image/png'
-        elif filepath.endswith('.jpg') or filepath.endswith('.jpeg'):
-            content_type = 'image/jpeg'
-        elif filepath.endswith('.gif'):
-            content_type = 'image/gif'
-        elif filepath.endswith('.svg'):
-            content_type = 'image/svg+xml'
-        elif filepath.endswith('.ico'):
-            content_type = 'image/x-icon'
-
         response = Response()
         response.status(200)
         response.set_header("Content-Type", content_type)
@@ -73,8 +100,28 @@ def serve_static_file(path: str) -> bytes:
         return response.to_bytes()
 
 
+def read_body(client_socket, received: bytes, content_length: int) -> bytes:
+    """Read the rest of a request body into a single bytes object."""
+    chunks = [received]
+    body_received = len(received)
+
+    while body_received < content_length:
+        chunk = client_socket.recv(min(65536, content_length - body_received))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        body_received += len(chunk)
+
+    return b''.join(chunks)
+
+
 def handle_client(client_socket, address):
-    """Handle incoming client connection."""
+    """Handle incoming client connection.
+
+    Each phase (read, parse, route, send, and auth/db/serialize inside the
+    handler) is recorded as a span of the request's trace; see utils.trace.
+    """
+    trace = None
     try:
         # Read initial chunk to get headers
         data = client_socket.recv(4096)
@@ -82,27 +129,31 @@ def handle_client(client_socket, address):
         if not data:
             return
 
-        # Check if we need to read more data (for file uploads, etc.)
-        header_end = data.find(b'\r\n\r\n')
-        if header_end != -1:
-            headers = data[:header_end].decode('utf-8', errors='ignore')
+        # Timed from the first bytes, not from accept, so an idle client
+        # does not count as a slow request
+        trace = start_trace()
+
+        with span('parse'):
+            request = Request(data)
 
-            # Check for Content-Length header
-            for line in headers.split('\r\n'):
-                if line.lower().startswith('content-length:'):
-                    content_length = int(line.split(':')[1].strip())
-                    body_received = len(data) - header_end - 4
+        request_id = request.get_header('X-Request-ID')
+        if not request_id or not _REQUEST_ID_RE.fullmatch(request_id):
+            request_id = new_request_id()
+        request.request_id = request_id
+        trace.request_id = request_id
+        set_request_id(request_id)
 
-                    # Read remaining body if needed
-                    while body_received < content_length:
-                        chunk = client_socket.recv(min(8192, content_length - body_received))
-                        if not chunk:
-                            break
-                        data += chunk
-                        body_received += len(chunk)
-                    break
+        content_length = int(request.get_header('Content-Length', 0) or 0)
 
-        request = Request(data)
+        # Streaming routes read the body themselves; everything else gets
+        # it buffered in request.body
+        route = main_router.find(request)
+        if route is not None and route.stream_body:
+            request.body_stream = BodyStream(client_socket, request.body, content_length)
+            request.body = b''
+        elif len(request.body) < content_length:
+            with span('read'):
+                request.body = read_body(client_socket, request.body, content_length)
 
         is_websocket = False
         for name, value in request.headers.items():
@@ -111,17 +162,43 @@ def handle_client(client_socket, address):
                 break
 
         if is_websocket:
+            discard_trace()
+            trace = None
             handle_websocket_upgrade(request, client_socket)
             return
 
         response_bytes = main_router.route(request)
 
         if response_bytes is None:
-            response_bytes = serve_static_file(request.path)
+            with span('static'):
+                response_bytes = serve_static_file(request.path)
+            trace.name = f"{request.method} static"
+            trace.status = response_status(response_bytes)
+
+        if isinstance(response_bytes, StreamingResponse):
+            try:
+                with span('send'):
+                    response_bytes.write_to(client_socket)
+            except Exception as e:
+                # Too late for an error response; closing the connection
+                # tells the client the body is incomplete.
+                if not response_bytes.headers_sent:
+                    raise
+                log.warning("Streaming response aborted", path=request.path, error=e)
+            return
+
+        with span('send'):
+            client_socket.sendall(response_bytes)
 
-        client_socket.sendall(response_bytes)
+    except ServiceUnavailable as e:
+        try:
+            response = Response.service_unavailable(b"Service temporarily unavailable", retry_after=e.retry_after)
+            client_socket.sendall(response.to_bytes())
+        except:
+            pass
 
     except Exception as e:
+        log.exception("Unhandled error", address=address[0] if address else None)
         try:
             response = Response.server_error(f"Server error: {str(e)}".encode())
             client_socket.sendall(response.to_bytes())
@@ -133,19 +210,32 @@ def handle_client(client_socket, address):
             client_socket.close()
         except:
             pass
+        # After close, so the client is not kept waiting on the bookkeeping
+        if trace is not None:
+            finish_trace()
 
 
 def run_server():
     """Start the TCP server."""
+    configure_logging()
     register_routes()
+    if STORAGE_BACKEND == 'mongo':
+        warm_up_db()
+        invalidation.start_listener()
+    else:
+        get_backend().ping()
+    start_session_sweeper()
+    start_retention_worker()
+    start_search_index()
+    start_upload_session_sweeper()
+    start_upload_gc_worker()
 
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server_socket.bind((HOST, PORT))
     server_socket.listen(100)
 
-    print(f"Server running on http://{HOST}:{PORT}")
-    print(f"Press Ctrl+C to stop the server")
+    log.info("Server running", url=f"http://{HOST}:{PORT}", storage=STORAGE_BACKEND)
 
     try:
         while True:
@@ -160,7 +250,7 @@ def run_server():
             client_thread.start()
 
     except KeyboardInterrupt:
-        print("\nShutting down server...")
+        log.info("Shutting down server")
 
     finally:
         server_socket.close()
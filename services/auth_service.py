@@ -1,5 +1,5 @@
-from models.user import create_user, verify_password, user_exists
-from models.session import create_session, delete_session, get_username_from_token, create_xsrf_token
+from models.user import create_user, verify_password
+from models.session import create_session_with_xsrf, delete_session, get_username_from_token, SESSION_MAX_LIFETIME
 from utils.validation import validate_password
 
 
@@ -8,9 +8,6 @@ def register_user(username: str, password: str) -> tuple[bool, str]:
     if not username or not password:
         return (False, "Username and password are required")
 
-    if user_exists(username):
-        return (False, "Username already exists")
-
     if not validate_password(password):
         return (False, "Password must be at least 8 characters with uppercase, lowercase, number, and special character (!@#$%^&()-_=)")
 
@@ -19,7 +16,7 @@ def register_user(username: str, password: str) -> tuple[bool, str]:
     if success:
         return (True, "User created successfully")
     else:
-        return (False, "Failed to create user")
+        return (False, "Username already exists")
 
 
 def login_user(username: str, password: str) -> tuple[bool, str | None, str | None]:
@@ -30,8 +27,7 @@ def login_user(username: str, password: str) -> tuple[bool, str | None, str | No
     if not verify_password(username, password):
         return (False, None, None)
 
-    auth_token = create_session(username)
-    xsrf_token = create_xsrf_token(username)
+    auth_token, xsrf_token = create_session_with_xsrf(username)
 
     return (True, auth_token, xsrf_token)
 
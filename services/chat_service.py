@@ -1,14 +1,68 @@
+import json
 from models.message import (
     create_message as create_message_model,
     get_all_messages as get_all_messages_model,
+    DEFAULT_PAGE_SIZE,
     delete_message as delete_message_model,
-    is_message_owner
+    get_message_by_id,
+    iter_messages,
+    message_json
 )
+from utils.trace import span
 
+# Messages joined into each chunk of a streamed history response
+STREAM_MESSAGES_PER_CHUNK = 100
+
+
+def get_messages(limit: int = DEFAULT_PAGE_SIZE, before: str = None, after: str = None) -> tuple[list[dict], str | None]:
+
+    return get_all_messages_model(limit, before, after)
+
+
+def encode_messages(messages: list[dict], **fields) -> bytes:
+    """JSON body {"messages": [...], **fields} built from cached message fragments.
+
+    Produces the same bytes as json.dumps, without re-serializing messages.
+    """
+    with span('serialize'):
+        parts = [b'{"messages": [', b', '.join(message_json(m) for m in messages), b']']
+        for name, value in fields.items():
+            parts.append(f', "{name}": '.encode() + json.dumps(value).encode())
+        parts.append(b'}')
+        return b''.join(parts)
+
+
+def get_messages_json(limit: int = DEFAULT_PAGE_SIZE, before: str = None, after: str = None) -> bytes:
+
+    messages, next_cursor = get_all_messages_model(limit, before, after)
+    return encode_messages(messages, next=next_cursor)
 
-def get_messages() -> list[dict]:
-   
-    return get_all_messages_model()
+
+def stream_messages_json(after: str = None):
+    """The whole history after the cursor as a JSON body {"messages": [...]},
+    produced in chunks while it is read from storage.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    return _stream_messages_json(iter_messages(after))
+
+
+def _stream_messages_json(messages):
+    yield b'{"messages": ['
+    fragments = []
+    separator = b''
+
+    for message in messages:
+        fragments.append(message_json(message, cache=False))
+        if len(fragments) == STREAM_MESSAGES_PER_CHUNK:
+            yield separator + b', '.join(fragments)
+            fragments = []
+            separator = b', '
+
+    if fragments:
+        yield separator + b', '.join(fragments)
+    yield b']}'
 
 
 def post_message(username: str, message: str, media: dict = None) -> tuple[bool, dict | str]:
@@ -26,12 +80,11 @@ def post_message(username: str, message: str, media: dict = None) -> tuple[bool,
 
 def delete_message(message_id: str, username: str) -> tuple[bool, str]:
    
-    if not is_message_owner(message_id, username):
-        return (False, "Forbidden: You can only delete your own messages")
+    if delete_message_model(message_id, username):
+        return (True, "Message deleted")
 
-    success = delete_message_model(message_id)
+    # Only a failed delete needs a second lookup to pick the right error
+    if get_message_by_id(message_id):
+        return (False, "Forbidden: You can only delete your own messages")
 
-    if success:
-        return (True, "Message deleted")
-    else:
-        return (False, "Message not found")
+    return (False, "Message not found")
@@ -0,0 +1,42 @@
+import os
+import threading
+import time
+from models.message import archive_old_messages
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Messages older than this many seconds move to the archive (0 disables).
+MESSAGE_RETENTION_MAX_AGE = float(os.environ.get('MESSAGE_RETENTION_MAX_AGE', 7 * 86400))
+# Only the newest this many messages stay hot (0 disables).
+MESSAGE_RETENTION_MAX_COUNT = int(os.environ.get('MESSAGE_RETENTION_MAX_COUNT', 0))
+MESSAGE_RETENTION_INTERVAL = int(os.environ.get('MESSAGE_RETENTION_INTERVAL', 600))
+MESSAGE_RETENTION_BATCH_SIZE = int(os.environ.get('MESSAGE_RETENTION_BATCH_SIZE', 1000))
+
+
+def run_retention() -> int:
+    """Archive every message outside the configured retention window."""
+    return archive_old_messages(
+        max_age=MESSAGE_RETENTION_MAX_AGE,
+        max_count=MESSAGE_RETENTION_MAX_COUNT,
+        batch_size=MESSAGE_RETENTION_BATCH_SIZE
+    )
+
+
+def _retention_loop(interval: int):
+    while True:
+        time.sleep(interval)
+        try:
+            run_retention()
+        except Exception:
+            log.exception("Message retention error")
+
+
+def start_retention_worker(interval: int = MESSAGE_RETENTION_INTERVAL):
+    """Run run_retention every interval seconds in a daemon thread."""
+    if not MESSAGE_RETENTION_MAX_AGE and not MESSAGE_RETENTION_MAX_COUNT:
+        return None
+
+    thread = threading.Thread(target=_retention_loop, args=(interval,), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from models.message import (
+    search_index,
+    search_messages as search_messages_model,
+    index_messages_since,
+    DEFAULT_SEARCH_LIMIT
+)
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH', 'search_index.snapshot')
+SEARCH_SNAPSHOT_INTERVAL = int(os.environ.get('SEARCH_SNAPSHOT_INTERVAL', 300))
+# Catch-up re-reads messages created this many seconds before the newest
+# indexed one, for messages committed late (e.g. while the snapshot was
+# loading, or by another process with a slower clock)
+SEARCH_CATCHUP_MARGIN = float(os.environ.get('SEARCH_CATCHUP_MARGIN', 60))
+# Seconds between catch-ups that index messages written by other server
+# processes (0 disables)
+SEARCH_CATCHUP_INTERVAL = int(os.environ.get('SEARCH_CATCHUP_INTERVAL', 30))
+
+
+def search_messages(query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> tuple[bool, list[dict] | str]:
+
+    if not query or not query.strip():
+        return (False, "Search query cannot be empty")
+
+    if len(query) > 200:
+        return (False, "Search query too long (max 200 characters)")
+
+    return (True, search_messages_model(query, limit))
+
+
+def load_search_index(path: str = SEARCH_INDEX_PATH) -> int:
+    """Load the search index snapshot and index anything newer than it.
+
+    Without a snapshot every stored message is read once and a snapshot
+    is written, so later restarts only read messages created since
+    (less SEARCH_CATCHUP_MARGIN).
+
+    Returns:
+        int: Number of messages added to the index
+    """
+    loaded = search_index.load(path)
+    count = catch_up_search_index() if loaded else index_messages_since()
+
+    if not loaded or count:
+        search_index.save(path)
+
+    return count
+
+
+def catch_up_search_index(margin: float = None) -> int:
+    """Index messages created since SEARCH_CATCHUP_MARGIN seconds before
+    the newest indexed one.
+
+    This picks up messages written by other processes, which only their
+    own index sees as they happen. Ones committed more than the margin
+    after their created_at are still missed until the index is rebuilt.
+
+    Returns:
+        int: Number of messages added
+    """
+    margin = SEARCH_CATCHUP_MARGIN if margin is None else margin
+    high_water = search_index.high_water()
+    if high_water is None:
+        return index_messages_since()
+    return index_messages_since((high_water[0] - margin, ''))
+
+
+def _catch_up_loop(interval: int):
+    while True:
+        time.sleep(interval)
+        try:
+            catch_up_search_index()
+        except Exception:
+            log.exception("Search index catch-up error")
+
+
+def _snapshot_loop(path: str, interval: int):
+    while True:
+        time.sleep(interval)
+        try:
+            search_index.save(path)
+        except Exception:
+            log.exception("Search index snapshot error")
+
+
+def start_search_index(path: str = SEARCH_INDEX_PATH, interval: int = SEARCH_SNAPSHOT_INTERVAL,
+                       catch_up_interval: int = SEARCH_CATCHUP_INTERVAL):
+    """Load the index, then snapshot it every interval seconds in a daemon
+    thread, and catch up on other processes' messages every
+    catch_up_interval seconds in another."""
+    try:
+        load_search_index(path)
+    except Exception as e:
+        log.warning("Search index load failed", error=e)
+
+    if catch_up_interval > 0:
+        threading.Thread(target=_catch_up_loop, args=(catch_up_interval,), daemon=True).start()
+
+    thread = threading.Thread(target=_snapshot_loop, args=(path, interval), daemon=True)
+    thread.start()
+    return thread
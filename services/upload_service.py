@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from models.upload import (
+    UPLOAD_DIR, collect_orphaned_uploads, collect_unreferenced_blobs, collect_legacy_uploads
+)
+from utils.upload_sessions import UploadSessionStore
+from utils.log import get_logger
+
+log = get_logger(__name__)
+
+# Where resumable upload files are assembled; must be on the same
+# filesystem as the blob store so finished files can be renamed into it.
+UPLOAD_SESSION_DIR = os.environ.get('UPLOAD_SESSION_DIR', UPLOAD_DIR)
+# Sessions with no activity for this many seconds are discarded
+UPLOAD_SESSION_TTL = float(os.environ.get('UPLOAD_SESSION_TTL', 24 * 3600))
+UPLOAD_SESSION_SWEEP_INTERVAL = int(os.environ.get('UPLOAD_SESSION_SWEEP_INTERVAL', 600))
+MAX_UPLOAD_SESSIONS_PER_USER = int(os.environ.get('MAX_UPLOAD_SESSIONS_PER_USER', 8))
+
+# Uploads no message links to are deleted once they are this old (0 disables)
+UPLOAD_ORPHAN_GRACE = float(os.environ.get('UPLOAD_ORPHAN_GRACE', 24 * 3600))
+UPLOAD_GC_INTERVAL = int(os.environ.get('UPLOAD_GC_INTERVAL', 3600))
+UPLOAD_GC_BATCH_SIZE = int(os.environ.get('UPLOAD_GC_BATCH_SIZE', 500))
+
+upload_sessions = UploadSessionStore(UPLOAD_SESSION_DIR, MAX_UPLOAD_SESSIONS_PER_USER)
+
+
+def sweep_upload_sessions() -> int:
+    """Discard abandoned upload sessions and stray partial files."""
+    return upload_sessions.sweep(UPLOAD_SESSION_TTL)
+
+
+def run_upload_gc() -> dict:
+    """Delete orphaned uploads, then any blobs and legacy files nothing uses."""
+    return {
+        'uploads': collect_orphaned_uploads(UPLOAD_ORPHAN_GRACE, UPLOAD_GC_BATCH_SIZE),
+        'blobs': collect_unreferenced_blobs(UPLOAD_GC_BATCH_SIZE),
+        'legacy_files': collect_legacy_uploads(UPLOAD_ORPHAN_GRACE, UPLOAD_GC_BATCH_SIZE),
+    }
+
+
+def _sweep_loop(interval: int):
+    while True:
+        time.sleep(interval)
+        try:
+            sweep_upload_sessions()
+        except Exception:
+            log.exception("Upload session sweep error")
+
+
+def _gc_loop(interval: int):
+    while True:
+        time.sleep(interval)
+        try:
+            run_upload_gc()
+        except Exception:
+            log.exception("Upload GC error")
+
+
+def start_upload_session_sweeper(interval: int = UPLOAD_SESSION_SWEEP_INTERVAL):
+    """Run sweep_upload_sessions every interval seconds in a daemon thread."""
+    thread = threading.Thread(target=_sweep_loop, args=(interval,), daemon=True)
+    thread.start()
+    return thread
+
+
+def start_upload_gc_worker(interval: int = UPLOAD_GC_INTERVAL):
+    """Run run_upload_gc every interval seconds in a daemon thread."""
+    if not UPLOAD_ORPHAN_GRACE:
+        return None
+
+    thread = threading.Thread(target=_gc_loop, args=(interval,), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,198 @@
+import hashlib
+import os
+import socket
+import tempfile
+import threading
+from urllib.parse import unquote
+
+import core.file_response as file_response_module
+import routes.files as files
+import server
+from database.backends.memory import MemoryBackend
+from database.storage import set_backend
+from models import upload as upload_model
+from utils.blob_store import BlobStore
+
+PREFIX = '/_accel'
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+def _http(port: int, path: str) -> tuple[int, dict, bytes]:
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        chunks = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+
+    head, _, body = b''.join(chunks).partition(b'\r\n\r\n')
+    lines = head.decode().split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, body
+
+
+class StubNginx:
+    """Just enough of nginx to exercise X-Accel-Redirect: proxies to the
+    app, and when the app answers with X-Accel-Redirect, serves the named
+    file from the matching internal location (aliases) itself."""
+
+    def __init__(self, app_port: int, aliases: dict):
+        self.app_port = app_port
+        self.aliases = aliases
+        self.upstream = None
+
+    def get(self, path: str) -> tuple[int, dict, bytes]:
+        if path.startswith(PREFIX + '/'):
+            # internal locations are not reachable from outside
+            return 404, {}, b''
+
+        self.upstream = _http(self.app_port, path)
+        status, headers, body = self.upstream
+
+        redirect = headers.get('X-Accel-Redirect')
+        if redirect is None:
+            return status, headers, body
+
+        uri = unquote(redirect)
+        for location, directory in self.aliases.items():
+            if uri.startswith(location):
+                filepath = os.path.join(directory, uri[len(location):])
+                break
+        else:
+            return 404, {}, b''
+
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        passed = {name: headers[name] for name in ('Content-Type', 'Cache-Control') if name in headers}
+        return 200, passed, content
+
+
+class _AccelEnv:
+    """App server on an ephemeral port with uploads, blobs and public files
+    in a temp directory, fronted by StubNginx."""
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.public = os.path.join(root, 'public')
+        self.uploads = os.path.join(root, 'uploads')
+        os.makedirs(self.public)
+        os.makedirs(self.uploads)
+
+        self.saved = (upload_model.blob_store, upload_model.UPLOAD_DIR, files.UPLOAD_DIR, server.STATIC_DIR,
+                      file_response_module.X_ACCEL_REDIRECT_PREFIX, files.X_ACCEL_REDIRECT_PREFIX,
+                      server.X_ACCEL_REDIRECT_PREFIX)
+        upload_model.blob_store = BlobStore(os.path.join(self.uploads, 'blobs'))
+        upload_model.UPLOAD_DIR = files.UPLOAD_DIR = self.uploads
+        server.STATIC_DIR = self.public
+        self.set_prefix(PREFIX)
+        upload_model.upload_cache.clear()
+        self.previous_backend = set_backend(MemoryBackend())
+
+        if not server.main_router.routes:
+            server.register_routes()
+
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+        self.nginx = StubNginx(self.port, {
+            f'{PREFIX}/blobs/': os.path.join(self.uploads, 'blobs'),
+            f'{PREFIX}/uploads/': self.uploads,
+            f'{PREFIX}/public/': self.public,
+        })
+        return self
+
+    def _serve(self):
+        while True:
+            try:
+                client, address = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=server.handle_client, args=(client, address), daemon=True).start()
+
+    def set_prefix(self, prefix: str):
+        file_response_module.X_ACCEL_REDIRECT_PREFIX = files.X_ACCEL_REDIRECT_PREFIX = prefix
+        server.X_ACCEL_REDIRECT_PREFIX = prefix
+
+    def __exit__(self, *exc):
+        self.listener.close()
+        (upload_model.blob_store, upload_model.UPLOAD_DIR, files.UPLOAD_DIR, server.STATIC_DIR,
+         file_response_module.X_ACCEL_REDIRECT_PREFIX, files.X_ACCEL_REDIRECT_PREFIX,
+         server.X_ACCEL_REDIRECT_PREFIX) = self.saved
+        upload_model.upload_cache.clear()
+        set_backend(self.previous_backend)
+        self.tmp.cleanup()
+
+    def upload(self, content: bytes) -> dict:
+        fd, source = tempfile.mkstemp(dir=self.uploads)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        sha256 = hashlib.sha256(content).hexdigest()
+        return upload_model.create_upload(source, 'u1', 'u1.png', 'cat.png', 'image/png', len(content),
+                                          sha256, 'alice')
+
+
+def test_upload_download_is_offloaded():
+    with _AccelEnv() as env:
+        upload = env.upload(PNG)
+
+        status, headers, body = env.nginx.get('/uploads/u1.png')
+        assert status == 200 and body == PNG
+        assert headers['Content-Type'] == 'image/png'
+        assert headers['Cache-Control'] == 'public, max-age=31536000'
+
+        _, upstream_headers, upstream_body = env.nginx.upstream
+        sha = upload['sha256']
+        assert upstream_headers['X-Accel-Redirect'] == f'{PREFIX}/blobs/{sha[:2]}/{sha[2:4]}/{sha}'
+        assert upstream_body == b''
+
+        # The internal location itself is not reachable
+        assert env.nginx.get(upstream_headers['X-Accel-Redirect'])[0] == 404
+    print("✓ test_upload_download_is_offloaded passed")
+
+
+def test_legacy_and_static_files_are_offloaded():
+    with _AccelEnv() as env:
+        with open(os.path.join(env.uploads, 'legacy.png'), 'wb') as f:
+            f.write(PNG)
+        with open(os.path.join(env.public, 'index.html'), 'wb') as f:
+            f.write(b'<h1>hi</h1>')
+
+        status, headers, body = env.nginx.get('/uploads/legacy.png')
+        assert (status, body) == (200, PNG)
+        assert env.nginx.upstream[1]['X-Accel-Redirect'] == f'{PREFIX}/uploads/legacy.png'
+
+        status, headers, body = env.nginx.get('/')
+        assert (status, headers['Content-Type'], body) == (200, 'text/html', b'<h1>hi</h1>')
+        assert env.nginx.upstream[1]['X-Accel-Redirect'] == f'{PREFIX}/public/index.html'
+    print("✓ test_legacy_and_static_files_are_offloaded passed")
+
+
+def test_decisions_stay_in_the_app():
+    with _AccelEnv() as env:
+        for path in ('/uploads/missing.png', '/missing.css', '/../server.py'):
+            status, _, _ = env.nginx.get(path)
+            assert status == 404, path
+            assert 'X-Accel-Redirect' not in env.nginx.upstream[1]
+
+        env.upload(PNG)
+        env.set_prefix('')
+        status, headers, body = env.nginx.get('/uploads/u1.png')
+        assert (status, body) == (200, PNG)
+        assert 'X-Accel-Redirect' not in headers and 'ETag' in headers
+    print("✓ test_decisions_stay_in_the_app passed")
+
+
+if __name__ == "__main__":
+    print("Running X-Accel-Redirect Tests...\n")
+
+    test_upload_download_is_offloaded()
+    test_legacy_and_static_files_are_offloaded()
+    test_decisions_stay_in_the_app()
+
+    print("\n✅ All 3 X-Accel-Redirect tests passed!")
@@ -0,0 +1,56 @@
+import time
+from utils.cache import LRUCache, MISSING
+
+
+def test_ttl_expiry():
+    cache = LRUCache(10, ttl=0.05)
+    cache.set('session', {'username': 'alice'})
+    assert cache.get('session') == {'username': 'alice'}
+
+    time.sleep(0.06)
+    assert cache.get('session') is None
+    assert 'session' not in cache
+    print("✓ test_ttl_expiry passed")
+
+
+def test_per_entry_ttl_override():
+    cache = LRUCache(10, ttl=60)
+    cache.set('short', 1, ttl=0.01)
+    cache.set('long', 2)
+
+    time.sleep(0.02)
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+    print("✓ test_per_entry_ttl_override passed")
+
+
+def test_negative_entry():
+    cache = LRUCache(10)
+    cache.set('unknown-token', None)
+
+    assert cache.get('unknown-token', MISSING) is None
+    assert cache.get('other-token', MISSING) is MISSING
+    print("✓ test_negative_entry passed")
+
+
+def test_hit_rate():
+    cache = LRUCache(10)
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+
+    assert cache.stats()['hit_rate'] == 0.75
+    print("✓ test_hit_rate passed")
+
+
+if __name__ == "__main__":
+    print("Running Cache Tests...\n")
+
+    test_ttl_expiry()
+    test_per_entry_ttl_override()
+    test_negative_entry()
+    test_hit_rate()
+
+    print("\n✅ All 4 cache tests passed!")
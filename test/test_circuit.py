@@ -0,0 +1,121 @@
+import time
+from pymongo.errors import AutoReconnect, OperationFailure, WaitQueueTimeoutError
+import database.connection as connection
+from database.circuit import CircuitBreaker, DatabaseUnavailable, guarded, breaker
+
+
+def test_opens_after_threshold():
+    circuit = CircuitBreaker(failure_threshold=2, probe_interval=60)
+
+    circuit.record_failure()
+    circuit.before_call()
+    circuit.record_failure()
+
+    assert circuit.state == CircuitBreaker.OPEN
+    try:
+        circuit.before_call()
+        assert False, "expected DatabaseUnavailable"
+    except DatabaseUnavailable:
+        pass
+    print("✓ test_opens_after_threshold passed")
+
+
+def test_success_resets_failures():
+    circuit = CircuitBreaker(failure_threshold=2, probe_interval=60)
+
+    circuit.record_failure()
+    circuit.record_success()
+    circuit.record_failure()
+
+    assert circuit.state == CircuitBreaker.CLOSED
+    print("✓ test_success_resets_failures passed")
+
+
+def test_probe_closes_breaker():
+    attempts = []
+
+    def probe():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise AutoReconnect("still down")
+
+    circuit = CircuitBreaker(failure_threshold=1, probe_interval=0.01, probe=probe)
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+
+    deadline = time.monotonic() + 2
+    while circuit.state == CircuitBreaker.OPEN and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert len(attempts) == 2
+    print("✓ test_probe_closes_breaker passed")
+
+
+def test_guarded_translates_connection_failures():
+    @guarded
+    def failing_query():
+        raise AutoReconnect("connection reset")
+
+    failures_before = breaker.failures
+    try:
+        failing_query()
+        assert False, "expected DatabaseUnavailable"
+    except DatabaseUnavailable:
+        assert breaker.failures == failures_before + 1
+    finally:
+        breaker.record_success()
+
+    print("✓ test_guarded_translates_connection_failures passed")
+
+
+def test_pool_wait_timeout_does_not_count_as_failure():
+    @guarded
+    def saturated_query():
+        raise WaitQueueTimeoutError("timed out waiting for a connection")
+
+    failures_before = breaker.failures
+    try:
+        saturated_query()
+        assert False, "expected DatabaseUnavailable"
+    except DatabaseUnavailable:
+        assert breaker.failures == failures_before
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    print("✓ test_pool_wait_timeout_does_not_count_as_failure passed")
+
+
+def test_schema_failure_stays_off_the_request_path():
+    calls = []
+
+    def failing_schema(db):
+        calls.append(db)
+        raise OperationFailure("E11000 duplicate key error", code=11000)
+
+    original = (connection.db_instance, connection.ensure_schema, connection.ping_db)
+    connection.db_instance = None
+    connection.ensure_schema = failing_schema
+    connection.ping_db = lambda: None
+    try:
+        # Logged, not raised, and not retried
+        connection.warm_up_db()
+        db = connection.get_db()
+        assert connection.get_db() is db
+        assert calls == [db]
+        db.client.close()
+    finally:
+        connection.db_instance, connection.ensure_schema, connection.ping_db = original
+    print("✓ test_schema_failure_stays_off_the_request_path passed")
+
+
+if __name__ == "__main__":
+    print("Running Circuit Breaker Tests...\n")
+
+    test_opens_after_threshold()
+    test_success_resets_failures()
+    test_probe_closes_breaker()
+    test_guarded_translates_connection_failures()
+    test_pool_wait_timeout_does_not_count_as_failure()
+    test_schema_failure_stays_off_the_request_path()
+
+    print("\n✅ All 6 circuit breaker tests passed!")
@@ -0,0 +1,158 @@
+import os
+import pytest
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+
+import database.connection as connection
+from models import message, session, user
+
+MONGO_TEST_URI = os.environ.get('MONGO_TEST_URI', 'mongodb://localhost:27017')
+TEST_DB_NAME = 'chat-server-index-test'
+
+# Commands that go through the query planner and can be explained.
+PLANNED_COMMANDS = {'find', 'delete', 'update', 'findAndModify', 'count', 'distinct', 'aggregate'}
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Collects every planned command the models send to MongoDB."""
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        if event.command_name in PLANNED_COMMANDS and event.database_name == TEST_DB_NAME:
+            self.commands.append(dict(event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _connect(recorder):
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=1000, event_listeners=[recorder])
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"MongoDB not reachable at {MONGO_TEST_URI}")
+    return client
+
+
+def _strip_command(command):
+    """Drop driver-added session/cluster fields so the command can be re-sent inside explain."""
+    return {k: v for k, v in command.items() if not k.startswith('$') and k not in ('lsid', 'txnNumber')}
+
+
+def _find_stages(plan, stage):
+    if isinstance(plan, dict):
+        if plan.get('stage') == stage:
+            return [plan]
+        found = []
+        for value in plan.values():
+            found.extend(_find_stages(value, stage))
+        return found
+    if isinstance(plan, list):
+        found = []
+        for item in plan:
+            found.extend(_find_stages(item, stage))
+        return found
+    return []
+
+
+def _run_model_queries():
+    """Exercise every model query once."""
+    user.create_user("index_alice", "Passw0rd!")
+    user.get_user("index_alice")
+    user.verify_password("index_alice", "Passw0rd!")
+
+    token = session.create_session("index_alice")
+    session.get_session(token)
+    xsrf = session.create_xsrf_token("index_alice")
+    session.verify_xsrf_token("index_alice", xsrf)
+    session.delete_session(token)
+    token, xsrf = session.create_session_with_xsrf("index_alice")
+    session.clear_session_cache()
+    session.verify_xsrf_token("index_alice", xsrf, token)
+    session.sweep_expired_sessions()
+
+    created = message.create_message("index_alice", "hello")
+    message.create_message("index_alice", "world")
+    _, next_cursor = message.get_all_messages(limit=1)
+    message.get_all_messages(limit=1, before=next_cursor)
+    message.get_all_messages(limit=1, after=message.encode_cursor(created))
+    message.get_message_by_id(created['id'])
+    message.is_message_owner(created['id'], "index_alice")
+    message.delete_message(created['id'], "someone_else")
+    message.delete_message(created['id'], "index_alice")
+
+
+def test_model_queries_use_indexes():
+    """Every model query must be answered from an index, never a COLLSCAN."""
+    recorder = CommandRecorder()
+    client = _connect(recorder)
+    client.drop_database(TEST_DB_NAME)
+    db = client[TEST_DB_NAME]
+
+    original_instance = connection.db_instance
+    connection.ensure_indexes(db)
+    connection.db_instance = db
+    message.clear_cache()
+    session.clear_session_cache()
+
+    try:
+        _run_model_queries()
+
+        assert recorder.commands, "no model queries were recorded"
+
+        collscans = []
+        for command in recorder.commands:
+            explained = db.command({'explain': _strip_command(command), 'verbosity': 'queryPlanner'})
+            winning_plan = explained['queryPlanner']['winningPlan']
+            if _find_stages(winning_plan, 'COLLSCAN'):
+                collscans.append(_strip_command(command))
+
+        assert not collscans, f"COLLSCAN in query plans: {collscans}"
+        print(f"✓ {len(recorder.commands)} model queries use indexes")
+
+    finally:
+        connection.db_instance = original_instance
+        message.clear_cache()
+        session.clear_session_cache()
+        client.drop_database(TEST_DB_NAME)
+        client.close()
+
+
+def test_ensure_indexes_is_idempotent():
+    """Running the index bootstrap twice must not fail."""
+    recorder = CommandRecorder()
+    client = _connect(recorder)
+    db = client[TEST_DB_NAME]
+
+    try:
+        connection.ensure_indexes(db)
+        connection.ensure_indexes(db)
+
+        chat_indexes = db['chat'].index_information()
+        assert chat_indexes['id_unique']['unique']
+        assert 'created_at_id' in chat_indexes
+        assert db['users'].index_information()['username_unique']['unique']
+        assert db['tokens'].index_information()['hash_unique']['unique']
+        assert db['xsrf_tokens'].index_information()['username_unique']['unique']
+        assert db['tokens'].index_information()['expires_at_ttl']['expireAfterSeconds'] == 0
+        assert db['xsrf_tokens'].index_information()['expires_at_ttl']['expireAfterSeconds'] == 0
+        print("✓ Index bootstrap is idempotent")
+
+    finally:
+        client.drop_database(TEST_DB_NAME)
+        client.close()
+
+
+if __name__ == '__main__':
+    print("Running index tests...\n")
+
+    test_ensure_indexes_is_idempotent()
+    test_model_queries_use_indexes()
+
+    print("\n✅ All index tests passed!")
@@ -0,0 +1,89 @@
+from pymongo.errors import AutoReconnect
+import database.invalidation as invalidation
+from database.circuit import DatabaseUnavailable
+
+
+def test_publish_failure_does_not_raise():
+    def unavailable():
+        raise DatabaseUnavailable()
+
+    class FailingDb(dict):
+        def __missing__(self, name):
+            raise AutoReconnect("connection reset")
+
+    original = (invalidation.BROADCAST_ENABLED, invalidation.get_db)
+    invalidation.BROADCAST_ENABLED = True
+    try:
+        invalidation.get_db = unavailable
+        invalidation.publish('session', 'token-hash')
+
+        invalidation.get_db = FailingDb
+        invalidation.publish('xsrf', 'alice')
+    finally:
+        invalidation.BROADCAST_ENABLED, invalidation.get_db = original
+    print("✓ test_publish_failure_does_not_raise passed")
+
+
+def test_dispatch_skips_own_events():
+    received = []
+    invalidation.subscribe('test-namespace', received.append)
+
+    invalidation._dispatch({'origin': invalidation._origin, 'namespace': 'test-namespace', 'key': 'own'})
+    invalidation._dispatch({'origin': 'other-process', 'namespace': 'test-namespace', 'key': 'theirs'})
+
+    assert received == ['theirs']
+    print("✓ test_dispatch_skips_own_events passed")
+
+
+class _CappedCollection:
+    """Events in $natural order; a tailing cursor sees each once, then dies."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def find_one(self, query, projection=None):
+        return next((event for event in self.events if event['_id'] == query['_id']), None)
+
+    def find(self, query, cursor_type=None):
+        class Cursor:
+            def __init__(self, events):
+                self.batches = [list(events)]
+
+            @property
+            def alive(self):
+                return bool(self.batches)
+
+            def __iter__(self):
+                return iter(self.batches.pop(0))
+
+        return Cursor(self.events)
+
+
+def test_resume_follows_natural_order():
+    received = []
+    invalidation.subscribe('resume-namespace', received.append)
+
+    def event(_id):
+        return {'_id': _id, 'origin': 'other-process', 'namespace': 'resume-namespace', 'key': _id}
+
+    # Ids from different clients: insertion order is not id order
+    collection = _CappedCollection([event('b'), event('a'), event('d'), event('c')])
+
+    assert invalidation._tail(collection, 'a') == 'c'
+    assert received == ['d', 'c']
+
+    # The last event seen rolled out of the capped collection
+    received.clear()
+    assert invalidation._tail(collection, 'z') == 'c'
+    assert received == ['b', 'a', 'd', 'c']
+    print("✓ test_resume_follows_natural_order passed")
+
+
+if __name__ == "__main__":
+    print("Running Cache Invalidation Tests...\n")
+
+    test_publish_failure_does_not_raise()
+    test_dispatch_skips_own_events()
+    test_resume_follows_natural_order()
+
+    print("\n✅ All 3 cache invalidation tests passed!")
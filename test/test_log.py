@@ -0,0 +1,127 @@
+import io
+import json
+import logging
+import threading
+import utils.log as log_module
+from utils.log import get_logger, configure_logging, shutdown_logging, set_request_id
+
+
+def _capture(level='info', log_format='logfmt') -> io.StringIO:
+    stream = io.StringIO()
+    configure_logging(level, log_format, stream)
+    return stream
+
+
+def _restore():
+    shutdown_logging()
+    logger = logging.getLogger(log_module.LOGGER_NAME)
+    logger.handlers = []
+    logger.propagate = True
+    logger.setLevel(logging.NOTSET)
+
+
+def test_logfmt_record_with_fields():
+    stream = _capture()
+    try:
+        log = get_logger('test')
+        set_request_id('req-1')
+        log.info("Upload stored", filename='a b.png', size=12)
+        set_request_id(None)
+        shutdown_logging()
+
+        line = stream.getvalue().strip()
+        assert 'level=info' in line
+        assert 'logger=chat.test' in line
+        assert 'msg="Upload stored"' in line
+        assert 'request_id=req-1' in line
+        assert 'filename="a b.png" size=12' in line
+    finally:
+        _restore()
+    print("✓ test_logfmt_record_with_fields passed")
+
+
+def test_json_record_with_exception():
+    stream = _capture(log_format='json')
+    try:
+        log = get_logger('test')
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log.exception("Worker failed", worker='gc')
+        shutdown_logging()
+
+        record = json.loads(stream.getvalue())
+        assert record['level'] == 'error'
+        assert record['worker'] == 'gc'
+        assert 'ValueError: boom' in record['exc']
+    finally:
+        _restore()
+    print("✓ test_json_record_with_exception passed")
+
+
+def test_disabled_level_skips_formatting():
+    rendered = []
+
+    class Expensive:
+        def __str__(self):
+            rendered.append(1)
+            return 'x'
+
+    stream = _capture(level='warning')
+    try:
+        log = get_logger('test')
+        log.debug("Frame", payload=Expensive())
+        log.info("Frame", payload=Expensive())
+        shutdown_logging()
+
+        assert stream.getvalue() == ''
+        assert rendered == []
+    finally:
+        _restore()
+    print("✓ test_disabled_level_skips_formatting passed")
+
+
+def test_formatting_happens_off_the_calling_thread():
+    threads = []
+
+    class Recorder:
+        def __str__(self):
+            threads.append(threading.current_thread())
+            return 'x'
+
+    stream = _capture()
+    try:
+        get_logger('test').info("Event", value=Recorder())
+        shutdown_logging()
+
+        assert 'value=x' in stream.getvalue()
+        assert threads and threading.current_thread() not in threads
+    finally:
+        _restore()
+    print("✓ test_formatting_happens_off_the_calling_thread passed")
+
+
+def test_request_id_is_per_thread():
+    seen = []
+    set_request_id('outer')
+
+    thread = threading.Thread(target=lambda: seen.append(log_module.get_request_id()))
+    thread.start()
+    thread.join()
+
+    assert seen == [None]
+    assert log_module.get_request_id() == 'outer'
+    set_request_id(None)
+    print("✓ test_request_id_is_per_thread passed")
+
+
+if __name__ == "__main__":
+    print("Running Logging Tests...\n")
+
+    test_logfmt_record_with_fields()
+    test_json_record_with_exception()
+    test_disabled_level_skips_formatting()
+    test_formatting_happens_off_the_calling_thread()
+    test_request_id_is_per_thread()
+
+    print("\n✅ All 5 logging tests passed!")
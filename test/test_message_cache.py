@@ -0,0 +1,159 @@
+import json
+
+from database import invalidation
+from database.backends.memory import MemoryBackend
+from database.storage import set_backend
+from models import message as message_model
+from services.chat_service import delete_message as delete_message_service
+from models.message import RecentMessages, _sort_key
+from services.chat_service import encode_messages
+from utils.cache import LRUCache
+
+
+def _message(i: int) -> dict:
+    return {'id': f"id-{i:03d}", 'username': 'alice', 'message': f"m{i}", 'created_at': float(i)}
+
+
+def _loaded_window(count: int, maxsize: int) -> RecentMessages:
+    window = RecentMessages(maxsize)
+    newest_first = [_message(i) for i in reversed(range(count))]
+    window.load(newest_first[:maxsize], window.load_token())
+    return window
+
+
+def test_lru_eviction():
+    cache = LRUCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.get('b') is None
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['misses'] == 1
+    print("✓ test_lru_eviction passed")
+
+
+def test_window_serves_latest_page():
+    window = _loaded_window(10, 5)
+
+    page = window.page(3)
+    assert [m['message'] for m in page] == ['m7', 'm8', 'm9']
+    assert window.stats()['hits'] == 1
+    print("✓ test_window_serves_latest_page passed")
+
+
+def test_window_misses_outside_range():
+    window = _loaded_window(10, 5)
+
+    assert window.page(3, before=_sort_key(_message(6))) is None
+    assert window.page(3, after=_sort_key(_message(2))) is None
+    assert window.page(3, after=_sort_key(_message(6)))[0]['message'] == 'm7'
+    assert window.stats()['misses'] == 2
+    print("✓ test_window_misses_outside_range passed")
+
+
+def test_complete_window_serves_partial_pages():
+    window = _loaded_window(3, 5)
+
+    assert [m['message'] for m in window.page(5)] == ['m0', 'm1', 'm2']
+    assert [m['message'] for m in window.page(5, before=_sort_key(_message(1)))] == ['m0']
+    print("✓ test_complete_window_serves_partial_pages passed")
+
+
+def test_window_write_through():
+    window = _loaded_window(5, 5)
+
+    window.add(_message(5))
+    assert [m['message'] for m in window.page(2)] == ['m4', 'm5']
+    assert window.stats()['size'] == 5
+
+    window.remove('id-005')
+    assert [m['message'] for m in window.page(2)] == ['m3', 'm4']
+    print("✓ test_window_write_through passed")
+
+
+def test_stale_load_is_discarded():
+    window = RecentMessages(5)
+    token = window.load_token()
+    window.add(_message(1))
+    window.load([_message(0)], token)
+
+    assert not window.loaded
+    assert window.page(1) is None
+    print("✓ test_stale_load_is_discarded passed")
+
+
+def test_encoded_page_matches_json_dumps():
+    message_model.message_json_cache.clear()
+    messages = [_message(1), dict(_message(2), message='quote " and <b>', media={'type': 'image'})]
+
+    try:
+        assert message_model.message_json(messages[0]) is message_model.message_json(messages[0])
+        assert encode_messages(messages, next='2.0_id-002') == \
+            json.dumps({'messages': messages, 'next': '2.0_id-002'}).encode()
+        assert encode_messages([], next=None) == json.dumps({'messages': [], 'next': None}).encode()
+    finally:
+        message_model.message_json_cache.clear()
+    print("✓ test_encoded_page_matches_json_dumps passed")
+
+
+def test_other_processes_writes_reach_the_caches():
+    backend = MemoryBackend()
+    set_backend(backend)
+    message_model.clear_cache()
+
+    try:
+        for i in range(3):
+            backend.insert_message(_message(i))
+        assert [m['id'] for m in message_model.get_all_messages(limit=10)[0]] == ['id-000', 'id-001', 'id-002']
+
+        # Another process adds id-003 and deletes id-001
+        backend.insert_message(_message(3))
+        invalidation._dispatch({'origin': 'other-process', 'namespace': 'message_created', 'key': 'id-003'})
+        backend.delete_message('id-001')
+        invalidation._dispatch({'origin': 'other-process', 'namespace': 'message_deleted', 'key': 'id-001'})
+
+        assert [m['id'] for m in message_model.get_all_messages(limit=10)[0]] == ['id-000', 'id-002', 'id-003']
+        assert message_model.get_message_by_id('id-001') is None
+    finally:
+        set_backend(None)
+        message_model.clear_cache()
+    print("✓ test_other_processes_writes_reach_the_caches passed")
+
+
+def test_failed_delete_does_not_trust_a_stale_cached_copy():
+    backend = MemoryBackend()
+    set_backend(backend)
+    message_model.clear_cache()
+
+    try:
+        backend.insert_message(_message(1))
+        assert message_model.get_message_by_id('id-001')
+
+        # Deleted by another process without a broadcast reaching us
+        backend.delete_message('id-001')
+        assert delete_message_service('id-001', 'bob') == (False, "Message not found")
+    finally:
+        set_backend(None)
+        message_model.clear_cache()
+    print("✓ test_failed_delete_does_not_trust_a_stale_cached_copy passed")
+
+
+if __name__ == "__main__":
+    print("Running Message Cache Tests...\n")
+
+    test_lru_eviction()
+    test_window_serves_latest_page()
+    test_window_misses_outside_range()
+    test_complete_window_serves_partial_pages()
+    test_window_write_through()
+    test_stale_load_is_discarded()
+    test_encoded_page_matches_json_dumps()
+    test_other_processes_writes_reach_the_caches()
+    test_failed_delete_does_not_trust_a_stale_cached_copy()
+
+    print("\n✅ All 9 message cache tests passed!")
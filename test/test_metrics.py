@@ -0,0 +1,142 @@
+import threading
+from core.request import Request
+from core.router import Router
+from core.websocket import WebSocketManager, WebSocketConnection
+from database.backends.instrumented import InstrumentedBackend
+from database.backends.memory import MemoryBackend
+from utils.metrics import Registry, Counter, Gauge, Histogram, REGISTRY
+
+
+def _samples(registry) -> dict:
+    samples = {}
+    for line in registry.expose().decode().splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_counter_merges_thread_shards():
+    registry = Registry()
+    counter = registry.register(Counter('jobs_total', 'Jobs.', ('kind',)))
+
+    def work():
+        for _ in range(1000):
+            counter.inc('a')
+        counter.inc('b', amount=2)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples = _samples(registry)
+    assert samples['jobs_total{kind="a"}'] == 8000
+    assert samples['jobs_total{kind="b"}'] == 16
+
+    # Finished threads' shards are folded in and dropped, not lost
+    assert counter._shards == []
+    counter.inc('a')
+    assert _samples(registry)['jobs_total{kind="a"}'] == 8001
+    print("✓ test_counter_merges_thread_shards passed")
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    histogram = registry.register(Histogram('latency_seconds', 'Latency.', ('route',), (0.1, 1.0)))
+    histogram.observe(0.05, '/a')
+    histogram.observe(0.1, '/a')
+    histogram.observe(0.5, '/a')
+    histogram.observe(3, '/a')
+
+    samples = _samples(registry)
+    assert samples['latency_seconds_bucket{route="/a",le="0.1"}'] == 2
+    assert samples['latency_seconds_bucket{route="/a",le="1"}'] == 3
+    assert samples['latency_seconds_bucket{route="/a",le="+Inf"}'] == 4
+    assert samples['latency_seconds_count{route="/a"}'] == 4
+    assert samples['latency_seconds_sum{route="/a"}'] == 3.65
+    assert '# TYPE latency_seconds histogram' in registry.expose().decode()
+    print("✓ test_histogram_exposition passed")
+
+
+def test_gauge_and_label_escaping():
+    registry = Registry()
+    gauge = registry.register(Gauge('queue_depth', 'Depth.', ('name',)))
+    gauge.set(3, 'a"b\\c')
+    gauge.inc('a"b\\c')
+    assert _samples(registry)['queue_depth{name="a\\"b\\\\c"}'] == 4
+
+    # Same name and shape returns the existing metric
+    assert registry.register(Gauge('queue_depth', 'Depth.', ('name',))) is gauge
+    try:
+        registry.register(Counter('queue_depth', 'Depth.'))
+        assert False, "conflicting registration accepted"
+    except ValueError:
+        pass
+    print("✓ test_gauge_and_label_escaping passed")
+
+
+def test_router_records_route_template():
+    router = Router()
+
+    @router.get('/things/{thing_id}')
+    def get_thing(request):
+        return b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n"
+
+    before = _samples(REGISTRY)
+    router.route(Request(b'GET /things/42 HTTP/1.1\r\n\r\n'))
+    router.route(Request(b'GET /things/43 HTTP/1.1\r\n\r\n'))
+    after = _samples(REGISTRY)
+
+    key = 'http_requests_total{method="GET",route="/things/{thing_id}",status="404"}'
+    assert after[key] - before.get(key, 0) == 2
+    count = 'http_request_duration_seconds_count{method="GET",route="/things/{thing_id}"}'
+    assert after[count] - before.get(count, 0) == 2
+    assert not any('/things/42' in name for name in after)
+    print("✓ test_router_records_route_template passed")
+
+
+def test_websocket_connection_gauge():
+    class Sink:
+        def sendall(self, data):
+            pass
+
+    manager = WebSocketManager()
+    connection = WebSocketConnection(Sink(), 'alice')
+    before = _samples(REGISTRY).get('websocket_connections', 0)
+
+    manager.add_connection(connection)
+    assert _samples(REGISTRY)['websocket_connections'] == before + 1
+    manager.broadcast({'type': 'ping'})
+
+    manager.remove_connection(connection)
+    manager.remove_connection(connection)
+    assert _samples(REGISTRY)['websocket_connections'] == before
+    print("✓ test_websocket_connection_gauge passed")
+
+
+def test_instrumented_backend():
+    backend = InstrumentedBackend(MemoryBackend())
+    key = 'storage_operation_duration_seconds_count{backend="memory",operation="find_user"}'
+    before = _samples(REGISTRY).get(key, 0)
+
+    assert backend.insert_user({'username': 'alice', 'password': 'x'})
+    assert backend.find_user('alice')['username'] == 'alice'
+    assert backend.find_user('bob') is None
+
+    assert _samples(REGISTRY)[key] - before == 2
+    print("✓ test_instrumented_backend passed")
+
+
+if __name__ == "__main__":
+    print("Running Metrics Tests...\n")
+
+    test_counter_merges_thread_shards()
+    test_histogram_exposition()
+    test_gauge_and_label_escaping()
+    test_router_records_route_template()
+    test_websocket_connection_gauge()
+    test_instrumented_backend()
+
+    print("\n✅ All 6 metrics tests passed!")
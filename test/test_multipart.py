@@ -1,5 +1,26 @@
+import hashlib
+import os
+import tempfile
+
 from core.request import Request
-from utils.multipart import parse_multipart
+from utils.multipart import (
+    parse_multipart, MultipartParser, MultipartError, PayloadTooLarge, SpoolingHandler, _CollectingHandler
+)
+
+BOUNDARY = '----WebKitFormBoundary'
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 40
+
+
+def _upload_body(content: bytes) -> bytes:
+    return (b'------WebKitFormBoundary\r\n'
+            b'Content-Disposition: form-data; name="caption"\r\n'
+            b'\r\n'
+            b'holiday\r\n'
+            b'------WebKitFormBoundary\r\n'
+            b'Content-Disposition: form-data; name="file"; filename="pic.png"\r\n'
+            b'Content-Type: image/png\r\n'
+            b'\r\n' + content + b'\r\n'
+            b'------WebKitFormBoundary--\r\n')
 
 
 def test_simple_text_fields():
@@ -117,6 +138,79 @@ def test_multiple_files():
     print("✓ test_multiple_files passed")
 
 
+def test_parser_chunk_boundaries():
+    # Content that contains a partial delimiter must survive any chunking
+    content = PNG + b'\r\n------WebKitFormBoun' + PNG
+    body = _upload_body(content)
+
+    for size in (1, 7, 64, 4096, len(body)):
+        handler = _CollectingHandler()
+        parser = MultipartParser(BOUNDARY, handler)
+        for start in range(0, len(body), size):
+            parser.feed(body[start:start + size])
+        parser.close()
+
+        assert [p.name for p in handler.parts] == ['caption', 'file']
+        assert handler.parts[0].content == b'holiday'
+        assert handler.parts[1].content == content
+    print("✓ test_parser_chunk_boundaries passed")
+
+
+def test_spooling_handler():
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = SpoolingHandler(tmp, 1024 * 1024)
+        parser = MultipartParser(BOUNDARY, spool)
+        body = _upload_body(PNG)
+        for start in range(0, len(body), 1000):
+            parser.feed(body[start:start + 1000])
+        parser.close()
+
+        spooled = spool.file('file')
+        assert spool.fields == {'caption': 'holiday'}
+        assert spooled.filename == 'pic.png'
+        assert spooled.size == len(PNG)
+        assert spooled.sha256 == hashlib.sha256(PNG).hexdigest()
+        assert spooled.mime_type == 'image/png'
+        with open(spooled.path, 'rb') as f:
+            assert f.read() == PNG
+
+        spool.discard()
+        assert os.listdir(tmp) == []
+    print("✓ test_spooling_handler passed")
+
+
+def test_spooling_stops_at_size_limit():
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = SpoolingHandler(tmp, 4096)
+        parser = MultipartParser(BOUNDARY, spool)
+        body = _upload_body(PNG * 100)
+
+        fed = 0
+        try:
+            for start in range(0, len(body), 1000):
+                parser.feed(body[start:start + 1000])
+                fed += 1000
+            assert False, "expected PayloadTooLarge"
+        except PayloadTooLarge:
+            pass
+
+        assert fed < 8000
+        spool.discard()
+        assert os.listdir(tmp) == []
+    print("✓ test_spooling_stops_at_size_limit passed")
+
+
+def test_incomplete_body_rejected():
+    parser = MultipartParser(BOUNDARY, _CollectingHandler())
+    parser.feed(_upload_body(b'data')[:-30])
+    try:
+        parser.close()
+        assert False, "expected MultipartError"
+    except MultipartError:
+        pass
+    print("✓ test_incomplete_body_rejected passed")
+
+
 if __name__ == "__main__":
     print("Running Multipart Parser Tests...\n")
 
@@ -125,5 +219,9 @@ if __name__ == "__main__":
     test_mixed_fields_and_file()
     test_boundary_extraction()
     test_multiple_files()
+    test_parser_chunk_boundaries()
+    test_spooling_handler()
+    test_spooling_stops_at_size_limit()
+    test_incomplete_body_rejected()
 
-    print("\n✅ All 5 multipart tests passed!")
+    print("\n✅ All 9 multipart tests passed!")
@@ -0,0 +1,110 @@
+import os
+import time
+import utils.passwords as passwords
+from utils.passwords import PasswordHasher, HasherBusy
+
+
+def _slow_job(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_inline_hash_and_check():
+    hasher = PasswordHasher(workers=0, queue_size=2, rounds=4)
+    hashed = hasher.hash("Passw0rd!")
+
+    assert hashed.startswith(b"$2b$04$")
+    assert hasher.check("Passw0rd!", hashed)
+    assert not hasher.check("wrong", hashed)
+    print("✓ test_inline_hash_and_check passed")
+
+
+def test_process_pool_hash_and_check():
+    hasher = PasswordHasher(workers=1, queue_size=2, rounds=4)
+
+    try:
+        hashed = hasher.hash("Passw0rd!")
+        assert hasher.check("Passw0rd!", hashed)
+    finally:
+        hasher.shutdown()
+
+    print("✓ test_process_pool_hash_and_check passed")
+
+
+def test_full_queue_rejects_immediately():
+    hasher = PasswordHasher(workers=0, queue_size=1, rounds=4)
+    hasher._slots.acquire()
+
+    try:
+        hasher.hash("Passw0rd!")
+        assert False, "expected HasherBusy"
+    except HasherBusy:
+        pass
+    finally:
+        hasher._slots.release()
+
+    assert hasher.rejected == 1
+    assert hasher.hash("Passw0rd!")
+    print("✓ test_full_queue_rejects_immediately passed")
+
+
+def test_timed_out_job_keeps_its_slot():
+    hasher = PasswordHasher(workers=1, queue_size=1, rounds=4)
+    original_timeout = passwords.PASSWORD_HASH_TIMEOUT
+    passwords.PASSWORD_HASH_TIMEOUT = 0.2
+
+    try:
+        try:
+            hasher._run(_slow_job, 1.0)
+            assert False, "expected HasherBusy"
+        except HasherBusy:
+            pass
+
+        # The worker is still busy with the timed-out job
+        try:
+            hasher.hash("Passw0rd!")
+            assert False, "expected HasherBusy"
+        except HasherBusy:
+            pass
+        assert hasher.rejected == 1
+
+        deadline = time.monotonic() + 5
+        while not hasher._slots.acquire(blocking=False):
+            assert time.monotonic() < deadline, "slot never released"
+            time.sleep(0.05)
+        hasher._slots.release()
+    finally:
+        passwords.PASSWORD_HASH_TIMEOUT = original_timeout
+        hasher.shutdown()
+
+    print("✓ test_timed_out_job_keeps_its_slot passed")
+
+
+def test_broken_pool_is_replaced():
+    hasher = PasswordHasher(workers=1, queue_size=2, rounds=4)
+
+    try:
+        try:
+            hasher._run(os._exit, 1)
+            assert False, "expected HasherBusy"
+        except HasherBusy:
+            pass
+
+        hashed = hasher.hash("Passw0rd!")
+        assert hasher.check("Passw0rd!", hashed)
+    finally:
+        hasher.shutdown()
+
+    print("✓ test_broken_pool_is_replaced passed")
+
+
+if __name__ == "__main__":
+    print("Running Password Hashing Tests...\n")
+
+    test_inline_hash_and_check()
+    test_process_pool_hash_and_check()
+    test_full_queue_rejects_immediately()
+    test_timed_out_job_keeps_its_slot()
+    test_broken_pool_is_replaced()
+
+    print("\n✅ All 5 password hashing tests passed!")
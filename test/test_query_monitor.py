@@ -0,0 +1,140 @@
+import io
+import json
+import logging
+from types import SimpleNamespace
+import utils.log as log_module
+from database.query_monitor import QueryMonitor, redact
+from utils.log import configure_logging, shutdown_logging
+from utils.metrics import REGISTRY
+
+
+def _sample(name: str) -> float:
+    for line in REGISTRY.expose().decode().splitlines():
+        if line.startswith(name + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+def _run(monitor, command_name, command, reply=None, duration_ms=1.0, request_id=1):
+    monitor.started(SimpleNamespace(command_name=command_name, command=command,
+                                    connection_id=('localhost', 27017), request_id=request_id))
+    event = SimpleNamespace(command_name=command_name, connection_id=('localhost', 27017),
+                            request_id=request_id, duration_micros=int(duration_ms * 1000), reply=reply)
+    if reply is None:
+        monitor.failed(event)
+    else:
+        monitor.succeeded(event)
+
+
+def test_redact_keeps_shape_only():
+    query = {
+        'username': 'alice',
+        'created_at': {'$lt': 1.7e9},
+        'id': {'$in': ['a', 'b', 'c']},
+        '$or': [{'media.url': '/uploads/x.png'}, {'message': 'secret'}],
+    }
+    assert redact(query) == {
+        'username': '?',
+        'created_at': {'$lt': '?'},
+        'id': {'$in': ['?']},
+        '$or': [{'media.url': '?'}, {'message': '?'}],
+    }
+    pipeline = [{'$match': {'username': 'bob'}}, {'$sort': {'created_at': -1}}, {'$limit': 50}]
+    assert redact(pipeline) == [{'$match': {'username': '?'}}, {'$sort': {'created_at': -1}}, {'$limit': 50}]
+    print("✓ test_redact_keeps_shape_only passed")
+
+
+def test_latency_and_documents_per_collection():
+    monitor = QueryMonitor(slow_query_ms=0)
+    labels = '{collection="chat",command="find"}'
+    count_before = _sample(f'mongo_command_duration_seconds_count{labels}')
+    docs_before = _sample(f'mongo_documents_returned_total{labels}')
+
+    reply = {'cursor': {'firstBatch': [{}, {}, {}], 'id': 0}, 'ok': 1}
+    _run(monitor, 'find', {'find': 'chat', 'filter': {'id': 'x'}, 'limit': 3}, reply)
+
+    assert _sample(f'mongo_command_duration_seconds_count{labels}') == count_before + 1
+    assert _sample(f'mongo_documents_returned_total{labels}') == docs_before + 3
+    assert monitor._pending == {}
+    print("✓ test_latency_and_documents_per_collection passed")
+
+
+def test_unbounded_and_failed_commands():
+    monitor = QueryMonitor(slow_query_ms=0)
+    unbounded = 'mongo_unbounded_queries_total{collection="chat",command="find"}'
+    failed = 'mongo_commands_failed_total{collection="tokens",command="delete"}'
+    unbounded_before, failed_before = _sample(unbounded), _sample(failed)
+
+    _run(monitor, 'find', {'find': 'chat', 'filter': {}}, {'cursor': {'firstBatch': []}, 'ok': 1})
+    _run(monitor, 'find', {'find': 'chat', 'filter': {}, 'limit': 50}, {'cursor': {'firstBatch': []}, 'ok': 1})
+    _run(monitor, 'delete', {'delete': 'tokens', 'deletes': [{'q': {'token': 't'}, 'limit': 1}]})
+
+    assert _sample(unbounded) == unbounded_before + 1
+    assert _sample(failed) == failed_before + 1
+    print("✓ test_unbounded_and_failed_commands passed")
+
+
+def test_slow_query_log_is_redacted():
+    stream = io.StringIO()
+    configure_logging('info', 'json', stream)
+    try:
+        monitor = QueryMonitor(slow_query_ms=100)
+        reply = {'cursor': {'firstBatch': [{}], 'id': 0}, 'ok': 1}
+        command = {'find': 'tokens', 'filter': {'token': 'hunter2'}, 'sort': {'created_at': -1}}
+        _run(monitor, 'find', command, reply, duration_ms=5)
+        _run(monitor, 'find', command, reply, duration_ms=250, request_id=2)
+        shutdown_logging()
+    finally:
+        logger = logging.getLogger(log_module.LOGGER_NAME)
+        logger.handlers = []
+        logger.propagate = True
+        logger.setLevel(logging.NOTSET)
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(records) == 1
+    record = records[0]
+    assert record['msg'] == 'Slow query'
+    assert record['collection'] == 'tokens' and record['duration_ms'] == 250
+    assert json.loads(record['shape']) == {'filter': {'token': '?'}, 'sort': {'created_at': -1}}
+    assert 'hunter2' not in stream.getvalue()
+    print("✓ test_slow_query_log_is_redacted passed")
+
+
+def test_tailable_cursors_are_not_slow_or_unbounded():
+    monitor = QueryMonitor(slow_query_ms=100)
+    collection = 'cache_invalidations'
+    slow = f'mongo_slow_commands_total{{collection="{collection}",command="getMore"}}'
+    unbounded = f'mongo_unbounded_queries_total{{collection="{collection}",command="find"}}'
+    waits = f'mongo_command_duration_seconds_count{{collection="{collection}",command="getMore:tailable"}}'
+    plain = f'mongo_command_duration_seconds_count{{collection="{collection}",command="getMore"}}'
+    before = {name: _sample(name) for name in (slow, unbounded, waits, plain)}
+
+    _run(monitor, 'find', {'find': collection, 'filter': {}, 'tailable': True, 'awaitData': True},
+         {'cursor': {'firstBatch': [], 'id': 42}, 'ok': 1})
+    for request_id in (2, 3):
+        _run(monitor, 'getMore', {'getMore': 42, 'collection': collection},
+             {'cursor': {'nextBatch': [], 'id': 42}, 'ok': 1}, duration_ms=1000, request_id=request_id)
+    # Once the cursor is closed its id is an ordinary getMore again
+    _run(monitor, 'getMore', {'getMore': 42, 'collection': collection},
+         {'cursor': {'nextBatch': [], 'id': 0}, 'ok': 1}, duration_ms=1000, request_id=4)
+    _run(monitor, 'getMore', {'getMore': 42, 'collection': collection},
+         {'cursor': {'nextBatch': [], 'id': 0}, 'ok': 1}, duration_ms=1000, request_id=5)
+
+    assert _sample(slow) == before[slow] + 1
+    assert _sample(unbounded) == before[unbounded]
+    assert _sample(waits) == before[waits] + 3
+    assert _sample(plain) == before[plain] + 1
+    assert monitor._pending == {} and monitor._tailable_cursors == set()
+    print("✓ test_tailable_cursors_are_not_slow_or_unbounded passed")
+
+
+if __name__ == "__main__":
+    print("Running Query Monitor Tests...\n")
+
+    test_redact_keeps_shape_only()
+    test_latency_and_documents_per_collection()
+    test_unbounded_and_failed_commands()
+    test_slow_query_log_is_redacted()
+    test_tailable_cursors_are_not_slow_or_unbounded()
+
+    print("\n✅ All 5 query monitor tests passed!")
@@ -0,0 +1,166 @@
+import os
+import socket
+import tempfile
+import threading
+
+from core.file_response import parse_byte_ranges, file_response, make_etag, RangeNotSatisfiable
+from core.request import Request
+
+CONTENT = bytes(range(256)) * 4
+
+
+def _request(*headers: str) -> Request:
+    raw = 'GET /uploads/a.mp4 HTTP/1.1\r\nHost: localhost\r\n' + ''.join(f'{h}\r\n' for h in headers) + '\r\n'
+    return Request(raw.encode())
+
+
+def _send(response) -> bytes:
+    if isinstance(response, bytes):
+        return response
+
+    server, client = socket.socketpair()
+    chunks = []
+
+    def read():
+        while True:
+            data = client.recv(65536)
+            if not data:
+                return
+            chunks.append(data)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        response.write_to(server)
+    finally:
+        server.close()
+        reader.join()
+        client.close()
+    return b"".join(chunks)
+
+
+def _serve(*headers: str) -> tuple[bytes, bytes]:
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(CONTENT)
+    try:
+        result = _send(file_response(_request(*headers), f.name, 'video/mp4'))
+    finally:
+        os.remove(f.name)
+    head, _, body = result.partition(b"\r\n\r\n")
+    return head, body
+
+
+def test_parse_byte_ranges():
+    assert parse_byte_ranges('bytes=0-99', 1000) == [(0, 99)]
+    assert parse_byte_ranges('bytes=900-', 1000) == [(900, 999)]
+    assert parse_byte_ranges('bytes=-100', 1000) == [(900, 999)]
+    assert parse_byte_ranges('bytes=-5000', 1000) == [(0, 999)]
+    assert parse_byte_ranges('bytes=990-2000', 1000) == [(990, 999)]
+    assert parse_byte_ranges('bytes=50-99, 0-49, 200-299', 1000) == [(0, 99), (200, 299)]
+    assert parse_byte_ranges('bytes=0-10,2000-3000', 1000) == [(0, 10)]
+
+    assert parse_byte_ranges('items=0-1', 1000) is None
+    assert parse_byte_ranges('bytes=10-5', 1000) is None
+    assert parse_byte_ranges('bytes=abc', 1000) is None
+    assert parse_byte_ranges('bytes=' + ','.join(['0-1'] * 17), 1000) is None
+
+    for header in ('bytes=1000-', 'bytes=-0', 'bytes=2000-3000'):
+        try:
+            parse_byte_ranges(header, 1000)
+            assert False, f"expected RangeNotSatisfiable for {header}"
+        except RangeNotSatisfiable:
+            pass
+    print("✓ test_parse_byte_ranges passed")
+
+
+def test_full_response_advertises_ranges():
+    head, body = _serve()
+    assert head.startswith(b"HTTP/1.1 200 OK")
+    assert b"Accept-Ranges: bytes" in head
+    assert b"ETag: \"" in head and b"Last-Modified: " in head
+    assert body == CONTENT
+    print("✓ test_full_response_advertises_ranges passed")
+
+
+def test_single_and_suffix_range():
+    head, body = _serve('Range: bytes=100-199')
+    assert head.startswith(b"HTTP/1.1 206 Partial Content")
+    assert b"Content-Range: bytes 100-199/1024" in head
+    assert b"Content-Length: 100" in head
+    assert body == CONTENT[100:200]
+
+    head, body = _serve('Range: bytes=-24')
+    assert b"Content-Range: bytes 1000-1023/1024" in head
+    assert body == CONTENT[1000:]
+    print("✓ test_single_and_suffix_range passed")
+
+
+def test_multiple_ranges():
+    head, body = _serve('Range: bytes=0-9, 500-509')
+    assert head.startswith(b"HTTP/1.1 206 Partial Content")
+    boundary = head.split(b"boundary=")[1].split(b"\r\n")[0]
+
+    parts = body.split(b"--" + boundary)
+    assert parts[-1] == b"--\r\n"
+    assert b"Content-Range: bytes 0-9/1024" in parts[1]
+    assert parts[1].endswith(b"\r\n\r\n" + CONTENT[0:10] + b"\r\n")
+    assert b"Content-Range: bytes 500-509/1024" in parts[2]
+    assert parts[2].endswith(b"\r\n\r\n" + CONTENT[500:510] + b"\r\n")
+    assert int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0]) == len(body)
+    print("✓ test_multiple_ranges passed")
+
+
+def test_unsatisfiable_and_if_range():
+    head, body = _serve('Range: bytes=5000-')
+    assert head.startswith(b"HTTP/1.1 416 Range Not Satisfiable")
+    assert b"Content-Range: bytes */1024" in head
+
+    head, body = _serve('Range: bytes=0-9', 'If-Range: "stale-etag"')
+    assert head.startswith(b"HTTP/1.1 200 OK") and body == CONTENT
+
+    with tempfile.NamedTemporaryFile() as f:
+        f.write(CONTENT)
+        f.flush()
+        etag = make_etag(os.stat(f.name))
+        result = _send(file_response(_request('Range: bytes=0-9', f'If-Range: {etag}'), f.name, 'video/mp4'))
+    assert result.startswith(b"HTTP/1.1 206") and result.endswith(CONTENT[:10])
+    print("✓ test_unsatisfiable_and_if_range passed")
+
+
+def test_conditional_requests():
+    with tempfile.NamedTemporaryFile() as f:
+        f.write(CONTENT)
+        f.flush()
+
+        def serve(*headers):
+            return _send(file_response(_request(*headers), f.name, 'video/mp4',
+                                       etag='"abc123"', last_modified=1700000000.0))
+
+        result = serve()
+        assert b'ETag: "abc123"' in result
+        assert b"Last-Modified: Tue, 14 Nov 2023 22:13:20 GMT" in result
+
+        for header in ('If-None-Match: "abc123"', 'If-None-Match: "x", W/"abc123"', 'If-None-Match: *',
+                       'If-Modified-Since: Tue, 14 Nov 2023 22:13:20 GMT'):
+            result = serve(header)
+            assert result.startswith(b"HTTP/1.1 304 Not Modified"), header
+            assert b'ETag: "abc123"' in result and b"Content-Length" not in result
+            assert result.endswith(b"\r\n\r\n")
+
+        assert serve('If-None-Match: "other"').startswith(b"HTTP/1.1 200 OK")
+        assert serve('If-Modified-Since: Mon, 13 Nov 2023 00:00:00 GMT').startswith(b"HTTP/1.1 200 OK")
+        assert serve('Range: bytes=0-9', 'If-Range: "abc123"').startswith(b"HTTP/1.1 206")
+    print("✓ test_conditional_requests passed")
+
+
+if __name__ == "__main__":
+    print("Running Range Request Tests...\n")
+
+    test_parse_byte_ranges()
+    test_full_response_advertises_ranges()
+    test_single_and_suffix_range()
+    test_multiple_ranges()
+    test_unsatisfiable_and_if_range()
+    test_conditional_requests()
+
+    print("\n✅ All 6 range request tests passed!")
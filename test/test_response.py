@@ -1,4 +1,8 @@
-from core.response import Response
+import socket
+import tempfile
+import threading
+
+from core.response import Response, StreamingResponse
 
 
 def test_basic_response():
@@ -26,6 +30,17 @@ def test_json_response():
     print("✓ test_json_response passed")
 
 
+def test_json_bytes_response():
+    response = Response()
+    response.json_bytes(b'{"messages": []}')
+    result = response.to_bytes()
+
+    assert b"Content-Type: application/json; charset=utf-8" in result
+    assert b"Content-Length: 16" in result
+    assert result.endswith(b'\r\n\r\n{"messages": []}')
+    print("✓ test_json_bytes_response passed")
+
+
 def test_html_response():
     response = Response()
     response.html("<h1>Hello</h1>")
@@ -131,6 +146,15 @@ def test_factory_server_error():
     print("✓ test_factory_server_error passed")
 
 
+def test_factory_service_unavailable():
+    response = Response.service_unavailable(b"Busy", retry_after=1)
+    result = response.to_bytes()
+
+    assert b"HTTP/1.1 503 Service Unavailable" in result
+    assert b"Retry-After: 1" in result
+    print("✓ test_factory_service_unavailable passed")
+
+
 def test_builder_chaining():
     response = Response().status(201).text("Created").set_header("Location", "/users/123")
     result = response.to_bytes()
@@ -192,11 +216,90 @@ def test_binary_body():
     print("✓ test_binary_body passed")
 
 
+def _stream_through_socket(response) -> bytes:
+    server, client = socket.socketpair()
+    chunks = []
+
+    def read():
+        while True:
+            data = client.recv(65536)
+            if not data:
+                return
+            chunks.append(data)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        response.write_to(server)
+    finally:
+        server.close()
+        reader.join()
+        client.close()
+    return b"".join(chunks)
+
+
+def test_streaming_chunked():
+    response = StreamingResponse(iter([b"hello", b"", b" world"]))
+    result = _stream_through_socket(response)
+
+    head, body = result.split(b"\r\n\r\n", 1)
+    assert b"Transfer-Encoding: chunked" in head
+    assert b"Content-Length" not in head
+    assert body == b"5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n"
+    print("✓ test_streaming_chunked passed")
+
+
+def test_streaming_known_length():
+    response = StreamingResponse(iter([b"abc", b"def"]), content_length=6)
+    result = _stream_through_socket(response)
+
+    assert b"Content-Length: 6" in result
+    assert result.endswith(b"\r\n\r\nabcdef")
+    print("✓ test_streaming_known_length passed")
+
+
+def test_streaming_file():
+    with tempfile.TemporaryFile() as f:
+        f.write(b"x" * 200000)
+        f.seek(0)
+        response = StreamingResponse(f)
+        result = _stream_through_socket(response)
+
+    head, body = result.split(b"\r\n\r\n", 1)
+    assert b"Content-Length: 200000" in head
+    assert body == b"x" * 200000
+    print("✓ test_streaming_file passed")
+
+
+def test_streaming_error_before_headers():
+    def failing():
+        raise RuntimeError("cursor failed")
+        yield b""
+
+    response = StreamingResponse(failing())
+    server, client = socket.socketpair()
+    try:
+        try:
+            response.write_to(server)
+            assert False, "expected RuntimeError"
+        except RuntimeError:
+            pass
+        assert not response.headers_sent
+    finally:
+        server.close()
+        client.close()
+
+    drained = StreamingResponse(iter([b"a", b"b"])).to_bytes()
+    assert b"Content-Length: 2" in drained and drained.endswith(b"ab")
+    print("✓ test_streaming_error_before_headers passed")
+
+
 if __name__ == "__main__":
     print("Running Response Tests...\n")
 
     test_basic_response()
     test_json_response()
+    test_json_bytes_response()
     test_html_response()
     test_status_change()
     test_custom_headers()
@@ -207,11 +310,16 @@ if __name__ == "__main__":
     test_factory_not_found()
     test_factory_bad_request()
     test_factory_server_error()
+    test_factory_service_unavailable()
     test_builder_chaining()
     test_content_length_auto_set()
     test_nosniff_header_always_set()
     test_empty_body()
     test_json_with_nested_data()
     test_binary_body()
+    test_streaming_chunked()
+    test_streaming_known_length()
+    test_streaming_file()
+    test_streaming_error_before_headers()
 
-    print("\n✅ All 18 tests passed!")
+    print("\n✅ All 24 tests passed!")
@@ -0,0 +1,127 @@
+import json
+import time
+
+from database.backends.memory import MemoryBackend
+from database.storage import set_backend
+from models import message
+from services import chat_service
+
+
+def _with_messages(count):
+    backend = MemoryBackend()
+    set_backend(backend)
+    message.clear_cache()
+    for n in range(count):
+        backend.insert_message({'id': f'id-{n:03d}', 'username': 'alice', 'message': f'm{n}',
+                                'created_at': 1000.0 + n})
+    return backend
+
+
+def _texts(messages):
+    return [m['message'] for m in messages]
+
+
+def test_archive_by_count():
+    backend = _with_messages(10)
+    try:
+        assert message.archive_old_messages(max_count=4, batch_size=3) == 6
+        assert _texts(backend.list_messages(10)) == ['m6', 'm7', 'm8', 'm9']
+        assert message.archive_old_messages(max_count=4) == 0
+    finally:
+        set_backend(None)
+    print("✓ test_archive_by_count passed")
+
+
+def test_archive_by_age():
+    backend = _with_messages(3)
+    try:
+        backend.insert_message({'id': 'fresh', 'username': 'alice', 'message': 'fresh', 'created_at': time.time()})
+        assert message.archive_old_messages(max_age=3600) == 3
+        assert _texts(backend.list_messages(10)) == ['fresh']
+    finally:
+        set_backend(None)
+    print("✓ test_archive_by_age passed")
+
+
+def test_pagination_crosses_into_archive():
+    _with_messages(10)
+    try:
+        message.archive_old_messages(max_count=4)
+        message.clear_cache()
+
+        page, cursor = message.get_all_messages(limit=3)
+        assert _texts(page) == ['m7', 'm8', 'm9']
+
+        page, cursor = message.get_all_messages(limit=3, before=cursor)
+        assert _texts(page) == ['m4', 'm5', 'm6']
+
+        page, cursor = message.get_all_messages(limit=3, before=cursor)
+        assert _texts(page) == ['m1', 'm2', 'm3']
+
+        page, cursor = message.get_all_messages(limit=3, before=cursor)
+        assert _texts(page) == ['m0'] and cursor is None
+
+        page, cursor = message.get_all_messages(limit=4, after=message.encode_cursor(page[0]))
+        assert _texts(page) == ['m1', 'm2', 'm3', 'm4']
+
+        page, cursor = message.get_all_messages(limit=4, after=cursor)
+        assert _texts(page) == ['m5', 'm6', 'm7', 'm8']
+
+        assert message.get_message_by_id('id-002')['message'] == 'm2'
+        assert message.delete_message('id-002', 'alice')
+        assert message.get_message_by_id('id-002') is None
+    finally:
+        set_backend(None)
+        message.clear_cache()
+    print("✓ test_pagination_crosses_into_archive passed")
+
+
+def test_export_streams_both_tiers():
+    _with_messages(250)
+    try:
+        message.archive_old_messages(max_count=100)
+
+        chunks = list(chat_service.stream_messages_json())
+        exported = json.loads(b''.join(chunks))['messages']
+        assert [m['id'] for m in exported] == [f'id-{n:03d}' for n in range(250)]
+        assert len(chunks) > 3
+
+        after = message.encode_cursor(exported[199])
+        exported = json.loads(b''.join(chat_service.stream_messages_json(after)))['messages']
+        assert [m['id'] for m in exported] == [f'id-{n:03d}' for n in range(200, 250)]
+    finally:
+        set_backend(None)
+        message.clear_cache()
+    print("✓ test_export_streams_both_tiers passed")
+
+
+def test_archiving_evicts_the_recent_window():
+    _with_messages(10)
+    try:
+        assert _texts(message.get_all_messages(limit=20)[0]) == [f'm{n}' for n in range(10)]
+        assert 'id-000' in message.message_cache
+
+        message.archive_old_messages(max_count=4)
+
+        assert message.recent_messages.stats()['size'] == 4
+        assert 'id-000' not in message.message_cache and 'id-009' in message.message_cache
+
+        page, cursor = message.get_all_messages(limit=6)
+        assert _texts(page) == ['m4', 'm5', 'm6', 'm7', 'm8', 'm9']
+        assert _texts(message.get_all_messages(limit=6, before=cursor)[0]) == ['m0', 'm1', 'm2', 'm3']
+    finally:
+        set_backend(None)
+        message.clear_cache()
+    print("✓ test_archiving_evicts_the_recent_window passed")
+
+
+if __name__ == "__main__":
+    print("Running Retention Tests...\n")
+
+    test_archive_by_count()
+    test_archive_by_age()
+    test_pagination_crosses_into_archive()
+    test_export_streams_both_tiers()
+    test_archiving_evicts_the_recent_window()
+
+    print("\n✅ All 5 retention tests passed!")
@@ -0,0 +1,74 @@
+from pymongo import monitoring
+
+import database.connection as connection
+from models import message, session, user
+from services import auth_service, chat_service
+from utils.passwords import password_hasher
+from test.test_indexes import TEST_DB_NAME, _connect
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to the test database."""
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        if event.database_name == TEST_DB_NAME:
+            self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def count(self, operation, *args) -> int:
+        """Run operation with cold caches and return how many commands it sent."""
+        message.clear_cache()
+        session.clear_session_cache()
+        self.commands = []
+        operation(*args)
+        return len(self.commands)
+
+
+def test_model_operations_are_single_round_trips():
+    counter = CommandCounter()
+    client = _connect(counter)
+    client.drop_database(TEST_DB_NAME)
+    db = client[TEST_DB_NAME]
+
+    original = (connection.db_instance, password_hasher.workers, password_hasher.rounds)
+    connection.ensure_indexes(db)
+    connection.db_instance = db
+    password_hasher.workers, password_hasher.rounds = 0, 4
+
+    try:
+        assert counter.count(user.create_user, "rt_alice", "Passw0rd!") == 1
+        assert counter.count(user.create_user, "rt_alice", "Passw0rd!") == 1
+        assert not user.create_user("rt_alice", "Passw0rd!")
+
+        assert counter.count(session.create_session_with_xsrf, "rt_alice") == 1
+        # one find for the user, one insert for session + XSRF token
+        assert counter.count(auth_service.login_user, "rt_alice", "Passw0rd!") == 2
+
+        created = message.create_message("rt_alice", "hello")
+        assert counter.count(chat_service.delete_message, created['id'], "rt_alice") == 1
+        assert message.get_message_by_id(created['id']) is None
+
+        print("✓ Model operations use a single round-trip")
+
+    finally:
+        connection.db_instance, password_hasher.workers, password_hasher.rounds = original
+        message.clear_cache()
+        session.clear_session_cache()
+        client.drop_database(TEST_DB_NAME)
+        client.close()
+
+
+if __name__ == '__main__':
+    print("Running round-trip tests...\n")
+
+    test_model_operations_are_single_round_trips()
+
+    print("\n✅ All round-trip tests passed!")
@@ -0,0 +1,180 @@
+import os
+import tempfile
+
+from database.backends.memory import MemoryBackend
+from database.storage import set_backend
+from models import message
+from services.search_service import catch_up_search_index
+from utils import search_index
+from utils.search_index import SearchIndex, tokenize
+
+
+def _index(*texts):
+    index = SearchIndex()
+    for n, text in enumerate(texts):
+        index.add(f'doc-{n}', text, n)
+    return index
+
+
+def test_tokenize():
+    assert tokenize("Hello, World! it&#x27;s") == ['hello', 'world', 'it', 's']
+    assert tokenize("&lt;b&gt;bold&lt;/b&gt;") == ['b', 'bold', 'b']
+    print("✓ test_tokenize passed")
+
+
+def test_and_query_newest_first():
+    index = _index("alice: hello world", "bob: hello there", "alice: goodbye world", "hello world again")
+
+    assert index.search("hello world") == ['doc-3', 'doc-0']
+    assert index.search("hello") == ['doc-3', 'doc-1', 'doc-0']
+    assert index.search("hello", limit=2) == ['doc-3', 'doc-1']
+    assert index.search("hello missing") == []
+    assert index.search("   ") == []
+    print("✓ test_and_query_newest_first passed")
+
+
+def test_prefix_matching():
+    index = _index("deploying the server", "deployment done", "display bug")
+
+    assert index.search("deploy") == ['doc-1', 'doc-0']
+    assert index.search("dis") == ['doc-2']
+    assert index.search("deploy serv") == ['doc-0']
+
+    # Short tokens match whole terms only
+    index.add('doc-3', "do it", 3)
+    assert index.search("d") == []
+    assert index.search("do") == ['doc-3']
+
+    original_max_terms = search_index.SEARCH_MAX_PREFIX_TERMS
+    search_index.SEARCH_MAX_PREFIX_TERMS = 1
+    try:
+        # "deploying" sorts before "deployment"
+        assert index.search("deploy") == ['doc-0']
+    finally:
+        search_index.SEARCH_MAX_PREFIX_TERMS = original_max_terms
+    print("✓ test_prefix_matching passed")
+
+
+def test_remove():
+    index = _index("hello world", "hello there")
+
+    assert index.remove('doc-1', "hello there")
+    assert index.search("hello") == ['doc-0']
+    assert index.search("there") == []
+    assert index.stats()['terms'] == 2
+
+    # Without the text the document is tombstoned
+    assert index.remove('doc-0')
+    assert index.search("hello") == []
+    assert not index.remove('doc-0')
+    print("✓ test_remove passed")
+
+
+def test_snapshot_round_trip():
+    index = _index("hello world", "hello there", "goodbye")
+    index.remove('doc-1')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.snapshot')
+        index.save(path)
+
+        restored = SearchIndex()
+        assert restored.load(path)
+        assert not SearchIndex().load(os.path.join(tmp, 'missing'))
+
+    assert restored.search("hello") == ['doc-0']
+    assert restored.high_water() == 2
+    assert len(restored) == 2
+
+    restored.add('doc-3', "hello again", 3)
+    assert restored.search("hello") == ['doc-3', 'doc-0']
+    print("✓ test_snapshot_round_trip passed")
+
+
+def test_unusable_snapshots_are_ignored():
+    index = _index("hello world", "hello there")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.snapshot')
+        index.save(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        for bad in (b'', b'\x80\x04garbage', b'{"version": 2}\n', b'[1, 2]\n', data[:-1], data + b'\0'):
+            with open(path, 'wb') as f:
+                f.write(bad)
+            assert not SearchIndex().load(path), bad
+
+        restored = SearchIndex()
+        with open(path, 'wb') as f:
+            f.write(data)
+        assert restored.load(path)
+        assert restored.search("hello") == ['doc-1', 'doc-0']
+    print("✓ test_unusable_snapshots_are_ignored passed")
+
+
+def test_model_keeps_index_current():
+    backend = MemoryBackend()
+    set_backend(backend)
+    message.clear_cache()
+    message.search_index.clear()
+
+    try:
+        backend.insert_message({'id': 'old', 'username': 'carol', 'message': 'stored earlier', 'created_at': 1.0})
+        assert message.index_messages_since() == 1
+
+        first = message.create_message("alice", "Deploy <finished>")
+        second = message.create_message("bob", "deploy started")
+
+        assert [m['id'] for m in message.search_messages("deploy")] == [second['id'], first['id']]
+        assert [m['id'] for m in message.search_messages("alice deploy")] == [first['id']]
+        assert [m['id'] for m in message.search_messages("finished")] == [first['id']]
+        assert [m['id'] for m in message.search_messages("earl")] == ['old']
+
+        message.delete_message(first['id'], "alice")
+        assert [m['id'] for m in message.search_messages("deploy")] == [second['id']]
+    finally:
+        set_backend(None)
+        message.clear_cache()
+        message.search_index.clear()
+    print("✓ test_model_keeps_index_current passed")
+
+
+def test_catch_up_indexes_late_messages():
+    backend = MemoryBackend()
+    set_backend(backend)
+    message.clear_cache()
+    message.search_index.clear()
+
+    try:
+        backend.insert_message({'id': 'm2', 'username': 'alice', 'message': 'first', 'created_at': 100.0})
+        assert catch_up_search_index() == 1
+
+        # Written by another process, committed after m2 was indexed
+        backend.insert_message({'id': 'm1', 'username': 'bob', 'message': 'late', 'created_at': 90.0})
+        backend.insert_message({'id': 'm0', 'username': 'bob', 'message': 'ancient', 'created_at': 1.0})
+
+        assert catch_up_search_index(margin=30) == 1
+        assert [m['id'] for m in message.search_messages("late")] == ['m1']
+        assert message.search_messages("ancient") == []
+        assert catch_up_search_index(margin=30) == 0
+    finally:
+        set_backend(None)
+        message.clear_cache()
+        message.search_index.clear()
+    print("✓ test_catch_up_indexes_late_messages passed")
+
+
+if __name__ == "__main__":
+    print("Running Search Index Tests...\n")
+
+    test_tokenize()
+    test_and_query_newest_first()
+    test_prefix_matching()
+    test_remove()
+    test_snapshot_round_trip()
+    test_unusable_snapshots_are_ignored()
+    test_model_keeps_index_current()
+    test_catch_up_indexes_late_messages()
+
+    print("\n✅ All 8 search index tests passed!")
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta, timezone
+import models.session as session
+from database.backends.memory import MemoryBackend
+from database.storage import set_backend
+from utils.cache import MISSING
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class _Clock:
+    """Replaces session._utcnow and the TTL settings for one test."""
+
+    def __init__(self, ttl=100, max_lifetime=250):
+        self.now = START
+        self.settings = (ttl, max_lifetime)
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+    def __enter__(self):
+        self.backend = MemoryBackend()
+        self.original = (session._utcnow, session.SESSION_TTL, session.SESSION_MAX_LIFETIME, set_backend(self.backend))
+        session._utcnow = lambda: self.now
+        session.SESSION_TTL, session.SESSION_MAX_LIFETIME = self.settings
+        session.session_cache.clear()
+        return self
+
+    def __exit__(self, *exc):
+        session._utcnow, session.SESSION_TTL, session.SESSION_MAX_LIFETIME, previous = self.original
+        set_backend(previous)
+        session.session_cache.clear()
+
+
+def _stored_expiry(clock, token):
+    return clock.backend.find_session(session._hash_token(token))['expires_at']
+
+
+def test_expired_session_rejected():
+    with _Clock() as clock:
+        token = session.create_session("alice")
+        assert session.get_username_from_token(token) == "alice"
+
+        clock.advance(101)
+        assert session.get_session(token) is None
+        # Cached as a negative entry, not looked up again
+        assert session.session_cache.get(session._hash_token(token), MISSING) is None
+    print("✓ test_expired_session_rejected passed")
+
+
+def test_renewed_past_half_ttl():
+    with _Clock() as clock:
+        token = session.create_session("alice")
+
+        clock.advance(40)
+        assert session.get_session(token)['expires_at'] == START + timedelta(seconds=100)
+        assert _stored_expiry(clock, token) == START + timedelta(seconds=100)
+
+        clock.advance(20)
+        renewed = session.get_session(token)
+        assert renewed['expires_at'] == START + timedelta(seconds=160)
+        assert _stored_expiry(clock, token) == START + timedelta(seconds=160)
+
+        # Still valid past the original expiry thanks to the renewal
+        clock.advance(60)
+        assert session.get_username_from_token(token) == "alice"
+    print("✓ test_renewed_past_half_ttl passed")
+
+
+def test_renewal_capped_at_max_lifetime():
+    with _Clock() as clock:
+        token = session.create_session("alice")
+
+        for _ in range(4):
+            clock.advance(60)
+            assert session.get_session(token) is not None
+
+        # 240s in: renewals stop at created_at + SESSION_MAX_LIFETIME
+        deadline = START + timedelta(seconds=250)
+        assert _stored_expiry(clock, token) == deadline
+
+        clock.advance(9)
+        assert session.get_session(token)['expires_at'] == deadline
+
+        clock.advance(1)
+        assert session.get_session(token) is None
+    print("✓ test_renewal_capped_at_max_lifetime passed")
+
+
+def test_legacy_session_without_expiry_gets_one():
+    with _Clock() as clock:
+        token = session.create_session("alice")
+        token_hash = session._hash_token(token)
+        del clock.backend.sessions[token_hash]['expires_at']
+        del clock.backend.sessions[token_hash]['created_at']
+        session.session_cache.clear()
+
+        assert session.get_session(token)['expires_at'] == START + timedelta(seconds=100)
+        assert _stored_expiry(clock, token) == START + timedelta(seconds=100)
+    print("✓ test_legacy_session_without_expiry_gets_one passed")
+
+
+def test_legacy_session_without_created_at_ages_out():
+    with _Clock() as clock:
+        token = session.create_session("alice")
+        del clock.backend.sessions[session._hash_token(token)]['created_at']
+        session.session_cache.clear()
+
+        clock.advance(60)
+        assert session.get_session(token)['expires_at'] == START + timedelta(seconds=100)
+
+        clock.advance(40)
+        assert session.get_session(token) is None
+    print("✓ test_legacy_session_without_created_at_ages_out passed")
+
+
+if __name__ == "__main__":
+    print("Running Session Tests...\n")
+
+    test_expired_session_rejected()
+    test_renewed_past_half_ttl()
+    test_renewal_capped_at_max_lifetime()
+    test_legacy_session_without_expiry_gets_one()
+    test_legacy_session_without_created_at_ages_out()
+
+    print("\n✅ All 5 session tests passed!")
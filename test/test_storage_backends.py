@@ -0,0 +1,317 @@
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import database.connection as connection
+from database.backends.memory import MemoryBackend
+from database.backends.mongo import MongoBackend
+from database.backends.sqlite import SQLiteBackend
+from test.test_indexes import MONGO_TEST_URI
+
+TEST_DB_NAME = 'chat-server-backend-test'
+
+
+@pytest.fixture(scope='module')
+def mongo_client():
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"MongoDB not reachable at {MONGO_TEST_URI}")
+    yield client
+    client.close()
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'mongo'])
+def backend(request):
+    if request.param == 'memory':
+        yield MemoryBackend()
+
+    elif request.param == 'sqlite':
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteBackend(os.path.join(tmp, 'chat.db'))
+            backend.ensure_schema()
+            yield backend
+
+    else:
+        client = request.getfixturevalue('mongo_client')
+        client.drop_database(TEST_DB_NAME)
+        db = client[TEST_DB_NAME]
+        connection.ensure_indexes(db)
+        yield MongoBackend(db)
+        client.drop_database(TEST_DB_NAME)
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _message(n, username='alice'):
+    return {'id': f'id-{n:03d}', 'username': username, 'message': f'm{n}', 'created_at': 1000.0 + n}
+
+
+def test_users(backend):
+    assert backend.insert_user({'username': 'alice', 'salt': b'salt', 'hash': b'hash'})
+    assert not backend.insert_user({'username': 'alice', 'salt': b'other', 'hash': b'other'})
+
+    user = backend.find_user('alice')
+    assert user['hash'] == b'hash'
+    assert backend.find_user('bob') is None
+    print("✓ test_users passed")
+
+
+def test_sessions(backend):
+    now = _now()
+    backend.insert_session({
+        'username': 'alice',
+        'hash': 'h1',
+        'access_token': 't1',
+        'xsrf_token': 'x1',
+        'created_at': now,
+        'expires_at': now + timedelta(hours=1)
+    })
+
+    session = backend.find_session('h1')
+    assert session['username'] == 'alice'
+    assert session['xsrf_token'] == 'x1'
+    assert session['expires_at'] == now + timedelta(hours=1)
+    assert session['expires_at'].tzinfo is not None
+
+    backend.update_session_expiry('h1', now + timedelta(hours=2))
+    assert backend.find_session('h1')['expires_at'] == now + timedelta(hours=2)
+
+    assert backend.delete_session('h1')
+    assert not backend.delete_session('h1')
+    assert backend.find_session('h1') is None
+    print("✓ test_sessions passed")
+
+
+def test_xsrf_upsert(backend):
+    expires_at = _now() + timedelta(hours=1)
+    backend.upsert_xsrf_token('alice', 'x1', expires_at)
+    backend.upsert_xsrf_token('alice', 'x2', expires_at)
+
+    assert backend.find_xsrf_token('alice') == 'x2'
+    assert backend.find_xsrf_token('bob') is None
+    print("✓ test_xsrf_upsert passed")
+
+
+def test_sweep_expired(backend):
+    now = _now()
+    for token_hash, expires_at in (('old', now - timedelta(minutes=1)), ('live', now + timedelta(hours=1))):
+        backend.insert_session({
+            'username': 'alice',
+            'hash': token_hash,
+            'access_token': token_hash,
+            'created_at': now - timedelta(hours=1),
+            'expires_at': expires_at
+        })
+    backend.insert_session({'username': 'alice', 'hash': 'legacy', 'access_token': 'legacy'})
+    backend.upsert_xsrf_token('alice', 'x1', now - timedelta(minutes=1))
+
+    result = backend.sweep_expired(now, now + timedelta(hours=1), now + timedelta(days=1))
+
+    assert result['tokens'] == {'deleted': 1, 'backfilled': 1}
+    assert result['xsrf_tokens']['deleted'] == 1
+    assert backend.find_session('old') is None
+    assert backend.find_session('live') is not None
+    assert backend.find_session('legacy')['expires_at'] == now + timedelta(hours=1)
+    assert backend.find_xsrf_token('alice') is None
+    print("✓ test_sweep_expired passed")
+
+
+def test_messages(backend):
+    backend.insert_message(dict(_message(1), media={'type': 'image', 'url': '/uploads/a.png'}))
+    backend.insert_message(_message(2, username='bob'))
+
+    assert backend.find_message('id-001')['media']['type'] == 'image'
+    assert 'media' not in backend.find_message('id-002')
+
+    assert not backend.delete_message('id-002', 'alice')
+    assert backend.delete_message('id-002', 'bob')
+    assert backend.find_message('id-002') is None
+    assert backend.delete_message('id-001')
+    assert not backend.delete_message('id-001')
+    print("✓ test_messages passed")
+
+
+def test_list_messages_keyset(backend):
+    for n in range(10):
+        backend.insert_message(_message(n))
+    # Same timestamp as id-005, ordered after it by id
+    backend.insert_message(dict(_message(5), id='id-005b', message='m5b'))
+
+    def texts(messages):
+        return [m['message'] for m in messages]
+
+    assert texts(backend.list_messages(3)) == ['m7', 'm8', 'm9']
+    assert texts(backend.list_messages(3, before=(1007.0, 'id-007'))) == ['m5', 'm5b', 'm6']
+    assert texts(backend.list_messages(3, before=(1005.0, 'id-005b'))) == ['m3', 'm4', 'm5']
+    assert texts(backend.list_messages(2, after=(1005.0, 'id-005'))) == ['m5b', 'm6']
+    assert texts(backend.list_messages(5, after=(1008.0, 'id-008'))) == ['m9']
+    assert backend.list_messages(5, before=(1000.0, 'id-000')) == []
+    print("✓ test_list_messages_keyset passed")
+
+
+def test_legacy_messages_without_created_at(mongo_client):
+    """Messages from before created_at existed are backfilled from their
+    ObjectId and reachable through every keyset query."""
+    from bson import ObjectId
+
+    mongo_client.drop_database(TEST_DB_NAME)
+    db = mongo_client[TEST_DB_NAME]
+    try:
+        base = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        db['chat'].insert_many([
+            {'_id': ObjectId.from_datetime(base + timedelta(seconds=n)), 'id': f'id-{n:03d}',
+             'username': 'alice', 'message': f'm{n}'}
+            for n in range(7)
+        ])
+        connection.ensure_schema(db)
+        backend = MongoBackend(db)
+
+        messages = backend.list_messages(100)
+        assert all(isinstance(m.get('created_at'), float) for m in messages)
+
+        seen = []
+        page = backend.list_messages(2)
+        while page:
+            seen = [m['message'] for m in page] + seen
+            oldest = page[0]
+            page = backend.list_messages(2, before=(oldest['created_at'], oldest['id']))
+        assert seen == [f'm{n}' for n in range(7)]
+
+        assert [m['message'] for m in backend.iter_messages(batch_size=3)] == seen
+        assert backend.archive_messages((messages[3]['created_at'], messages[3]['id']), 10) == 3
+        assert connection.backfill_created_at(db) == 0
+    finally:
+        mongo_client.drop_database(TEST_DB_NAME)
+    print("✓ test_legacy_messages_without_created_at passed")
+
+
+def test_iter_messages(backend):
+    for n in range(7):
+        backend.insert_message(_message(n))
+    backend.archive_messages((1002.0, 'id-002'), 10)
+
+    assert [m['message'] for m in backend.iter_messages(batch_size=2)] == ['m2', 'm3', 'm4', 'm5', 'm6']
+    assert [m['message'] for m in backend.iter_messages((1004.0, 'id-004'), batch_size=2)] == ['m5', 'm6']
+    assert [m['message'] for m in backend.iter_messages(batch_size=2, archived=True)] == ['m0', 'm1']
+    print("✓ test_iter_messages passed")
+
+
+def test_archive_messages(backend):
+    for n in range(10):
+        backend.insert_message(_message(n))
+
+    assert backend.message_key_at(0) == (1009.0, 'id-009')
+    assert backend.message_key_at(3) == (1006.0, 'id-006')
+    assert backend.message_key_at(10) is None
+
+    assert backend.archive_messages((1006.0, 'id-006'), 4) == 4
+    assert backend.archive_messages((1006.0, 'id-006'), 4) == 2
+    assert backend.archive_messages((1006.0, 'id-006'), 4) == 0
+
+    def texts(messages):
+        return [m['message'] for m in messages]
+
+    assert texts(backend.list_messages(10)) == ['m6', 'm7', 'm8', 'm9']
+    assert texts(backend.list_archived_messages(3)) == ['m3', 'm4', 'm5']
+    assert texts(backend.list_archived_messages(2, before=(1002.0, 'id-002'))) == ['m0', 'm1']
+    assert texts(backend.list_archived_messages(2, after=(1004.0, 'id-004'))) == ['m5']
+
+    assert backend.find_message('id-001') is None
+    assert backend.find_archived_message('id-001')['message'] == 'm1'
+    assert not backend.delete_archived_message('id-001', 'bob')
+    assert backend.delete_archived_message('id-001', 'alice')
+    assert backend.find_archived_message('id-001') is None
+    print("✓ test_archive_messages passed")
+
+
+def test_uploads(backend):
+    upload = {
+        'id': 'u1', 'filename': 'u1.png', 'original_filename': 'cat.png', 'mime_type': 'image/png',
+        'size': 1234, 'sha256': 'ab' * 32, 'owner': 'alice', 'created_at': 1000.5
+    }
+    backend.insert_upload(upload)
+
+    assert backend.find_upload('u1.png') == upload
+    assert backend.find_upload('u2.png') is None
+    print("✓ test_uploads passed")
+
+
+def test_blob_refs(backend):
+    sha = 'ab' * 32
+    assert backend.find_blob(sha) is None
+    assert backend.add_blob_ref(sha, 10, 'image/gif') == 1
+    assert backend.add_blob_ref(sha, 10, 'image/gif') == 2
+
+    blob = backend.find_blob(sha)
+    assert (blob['size'], blob['mime_type'], blob['refs']) == (10, 'image/gif', 2)
+
+    assert backend.release_blob_ref(sha) == 1
+    assert backend.release_blob_ref(sha) == 0
+    assert backend.release_blob_ref(sha) == 0
+    assert backend.find_blob(sha)['refs'] == 0
+    assert backend.release_blob_ref('cd' * 32) == 0
+    print("✓ test_blob_refs passed")
+
+
+def test_upload_collection_queries(backend):
+    for n in range(5):
+        backend.insert_upload({
+            'id': f'u{n}', 'filename': f'u{n}.png', 'original_filename': None, 'mime_type': 'image/png',
+            'size': 10, 'sha256': 'ab' * 32, 'owner': 'alice', 'created_at': 1000.0 + n
+        })
+    assert [u['filename'] for u in backend.iter_uploads(1003.0, batch_size=2)] == ['u0.png', 'u1.png', 'u2.png']
+
+    backend.insert_message(dict(_message(1), media={'url': '/uploads/u1.png', 'type': 'image/png'}))
+    backend.insert_message(dict(_message(2), media={'url': '/uploads/u2.png', 'type': 'image/png'}))
+    backend.insert_message(_message(3))
+    backend.archive_messages((1002.0, 'id-002'), 10)
+    urls = ['/uploads/u0.png', '/uploads/u1.png', '/uploads/u2.png']
+    assert backend.referenced_media_urls(urls) == {'/uploads/u1.png', '/uploads/u2.png'}
+    assert backend.referenced_media_urls([]) == set()
+
+    assert backend.delete_upload('u0.png')['owner'] == 'alice'
+    assert backend.delete_upload('u0.png') is None
+    assert backend.find_upload('u0.png') is None
+
+    assert backend.get_upload_bytes('alice') == 0
+    assert backend.add_upload_bytes('alice', 50) == 50
+    assert backend.add_upload_bytes('alice', -20) == 30
+    assert backend.get_upload_bytes('alice') == 30
+
+    backend.add_blob_ref('ab' * 32, 10, 'image/png')
+    backend.add_blob_ref('cd' * 32, 10, 'image/png')
+    backend.release_blob_ref('cd' * 32)
+    assert [blob['sha256'] for blob in backend.list_unreferenced_blobs(10)] == ['cd' * 32]
+    assert not backend.delete_blob('ab' * 32)
+    assert backend.delete_blob('cd' * 32)
+    assert backend.find_blob('cd' * 32) is None
+    print("✓ test_upload_collection_queries passed")
+
+
+if __name__ == "__main__":
+    print("Running Storage Backend Tests...\n")
+
+    tests = [test_users, test_sessions, test_xsrf_upsert, test_sweep_expired, test_messages,
+             test_list_messages_keyset, test_iter_messages, test_archive_messages, test_uploads,
+             test_blob_refs, test_upload_collection_queries]
+
+    for name in ('memory', 'sqlite'):
+        for test in tests:
+            with tempfile.TemporaryDirectory() as tmp:
+                if name == 'memory':
+                    instance = MemoryBackend()
+                else:
+                    instance = SQLiteBackend(os.path.join(tmp, 'chat.db'))
+                    instance.ensure_schema()
+                test(instance)
+
+    print(f"\n✅ All {len(tests)} storage backend tests passed on memory and sqlite!")
@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+import time
+import utils.trace as trace_module
+from core.request import Request
+from core.router import Router
+from database.backends.instrumented import InstrumentedBackend
+from database.backends.memory import MemoryBackend
+from utils.trace import start_trace, current_trace, finish_trace, span, export_trace
+
+
+def test_span_without_trace_is_a_no_op():
+    assert current_trace() is None
+    with span('db'):
+        pass
+    finish_trace()
+    print("✓ test_span_without_trace_is_a_no_op passed")
+
+
+def test_phases_through_router_and_backend():
+    backend = InstrumentedBackend(MemoryBackend())
+    router = Router()
+
+    @router.get('/users/{username}')
+    def get_user(request):
+        with span('auth'):
+            backend.find_user('alice')
+        with span('serialize'):
+            time.sleep(0.001)
+        return b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n"
+
+    trace = start_trace('req-1')
+    try:
+        router.route(Request(b'GET /users/alice HTTP/1.1\r\n\r\n'))
+    finally:
+        finish_trace()
+
+    names = [name for name, _, _, _ in trace.spans]
+    assert names == ['db', 'auth', 'serialize', 'route']
+    assert trace.name == 'GET /users/{username}'
+    assert trace.status == '200'
+
+    phases = trace.phases()
+    assert phases['route'] >= phases['auth'] >= phases['db']
+    assert phases['serialize'] >= 1_000_000
+    assert current_trace() is None
+    print("✓ test_phases_through_router_and_backend passed")
+
+
+def test_slow_request_is_exported():
+    path = os.path.join(tempfile.mkdtemp(), 'trace.json')
+    original = (trace_module.SLOW_REQUEST_MS, trace_module.TRACE_EXPORT_PATH)
+    trace_module.SLOW_REQUEST_MS = 1
+    trace_module.TRACE_EXPORT_PATH = path
+    try:
+        trace = start_trace('req-slow')
+        with span('db', 'find_user'):
+            time.sleep(0.002)
+        trace.name = 'GET /slow'
+        finish_trace()
+
+        start_trace('req-fast')
+        finish_trace()
+    finally:
+        trace_module.SLOW_REQUEST_MS, trace_module.TRACE_EXPORT_PATH = original
+
+    with open(path) as f:
+        content = f.read()
+
+    # The array is left open for appending; viewers accept that
+    events = json.loads(content.rstrip().rstrip(',') + ']')
+    assert [event['name'] for event in events] == ['GET /slow', 'db']
+    assert events[0]['args']['request_id'] == 'req-slow'
+    assert events[1]['args'] == {'detail': 'find_user'}
+    assert all(event['ph'] == 'X' for event in events)
+    assert events[0]['ts'] <= events[1]['ts']
+    assert events[1]['dur'] >= 2000
+    print("✓ test_slow_request_is_exported passed")
+
+
+def test_export_appends():
+    path = os.path.join(tempfile.mkdtemp(), 'trace.json')
+
+    for request_id in ('a', 'b'):
+        trace = start_trace(request_id)
+        trace_module.discard_trace()
+        trace.end_ns = time.perf_counter_ns()
+        export_trace(trace, path)
+
+    with open(path) as f:
+        events = json.loads(f.read().rstrip().rstrip(',') + ']')
+    assert [event['args']['request_id'] for event in events] == ['a', 'b']
+    print("✓ test_export_appends passed")
+
+
+if __name__ == "__main__":
+    print("Running Trace Tests...\n")
+
+    test_span_without_trace_is_a_no_op()
+    test_phases_through_router_and_backend()
+    test_slow_request_is_exported()
+    test_export_appends()
+
+    print("\n✅ All 4 trace tests passed!")
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from utils.upload_sessions import UploadSessionStore, TooManyUploadSessions
+
+CONTENT = os.urandom(100_000)
+
+
+def _write(session, start: int, end: int):
+    assert session.begin_write()
+    fd = os.open(session.path, os.O_WRONLY)
+    try:
+        os.pwrite(fd, CONTENT[start:end], start)
+    finally:
+        os.close(fd)
+    session.end_write(start, end)
+
+
+def test_out_of_order_parallel_chunks():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadSessionStore(tmp, max_per_owner=4)
+        session = store.create('alice', len(CONTENT), 'clip.mp4')
+        assert os.path.getsize(session.path) == len(CONTENT)
+
+        progress = session.progress()
+        assert (progress['offset'], progress['received'], progress['missing']) == (0, 0, [[0, len(CONTENT)]])
+
+        _write(session, 60_000, 80_000)
+        _write(session, 10_000, 30_000)
+        progress = session.progress()
+        assert progress['offset'] == 0
+        assert progress['received'] == 40_000
+        assert progress['missing'] == [[0, 10_000], [30_000, 60_000], [80_000, 100_000]]
+        assert not session.begin_complete()
+
+        bounds = [(0, 10_000), (30_000, 45_000), (45_000, 60_000), (80_000, 100_000), (20_000, 35_000)]
+        threads = [threading.Thread(target=_write, args=(session, start, end)) for start, end in bounds]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        progress = session.progress()
+        assert progress['complete'] and progress['offset'] == len(CONTENT)
+        assert session.begin_complete()
+        assert not session.begin_complete()
+        assert not session.begin_write()
+
+        sha256, head = session.digest()
+        assert sha256 == hashlib.sha256(CONTENT).hexdigest()
+        assert head == CONTENT[:16]
+    print("✓ test_out_of_order_parallel_chunks passed")
+
+
+def test_sessions_are_per_owner():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadSessionStore(tmp, max_per_owner=2)
+        first = store.create('alice', 10)
+        store.create('alice', 10)
+        try:
+            store.create('alice', 10)
+            assert False, "expected TooManyUploadSessions"
+        except TooManyUploadSessions:
+            pass
+        store.create('bob', 10)
+
+        assert store.get(first.id, 'alice') is first
+        assert store.get(first.id, 'bob') is None
+        assert store.get('missing') is None
+
+        assert store.remove(first.id)
+        assert not os.path.exists(first.path)
+        store.create('alice', 10)
+        assert len(store) == 3
+    print("✓ test_sessions_are_per_owner passed")
+
+
+def test_sweep_abandoned_sessions_and_stray_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = UploadSessionStore(tmp, max_per_owner=4)
+        idle = store.create('alice', 10)
+        active = store.create('alice', 10)
+        writing = store.create('alice', 10)
+        assert writing.begin_write()
+
+        idle.updated_at -= 100
+        writing.updated_at -= 100
+
+        stray = os.path.join(tmp, '.upload-crashed.part')
+        unrelated = os.path.join(tmp, 'keep.png')
+        for path in (stray, unrelated):
+            open(path, 'wb').close()
+            old = time.time() - 100
+            os.utime(path, (old, old))
+
+        assert store.sweep(ttl=50) == 2
+        assert store.get(idle.id) is None and not os.path.exists(idle.path)
+        assert store.get(active.id) is active and os.path.exists(active.path)
+        assert store.get(writing.id) is writing
+        assert not os.path.exists(stray)
+        assert os.path.exists(unrelated)
+    print("✓ test_sweep_abandoned_sessions_and_stray_files passed")
+
+
+if __name__ == "__main__":
+    print("Running Upload Session Tests...\n")
+
+    test_out_of_order_parallel_chunks()
+    test_sessions_are_per_owner()
+    test_sweep_abandoned_sessions_and_stray_files()
+
+    print("\n✅ All 3 upload session tests passed!")
@@ -0,0 +1,237 @@
+import os
+import tempfile
+import time
+
+from database.backends.memory import MemoryBackend
+from database.storage import set_backend
+from models import upload as upload_model
+from utils.blob_store import BlobStore
+
+SHA_A = 'ab' * 32
+SHA_B = 'cd' * 32
+
+
+def _spooled(directory: str, content: bytes) -> str:
+    fd, path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def test_blob_store_layout():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(os.path.join(tmp, 'blobs'))
+        path = store.path(SHA_A)
+        assert path == os.path.join(tmp, 'blobs', 'ab', 'ab', SHA_A)
+
+        assert store.store(_spooled(tmp, b'one'), SHA_A)
+        duplicate = _spooled(tmp, b'one')
+        assert not store.store(duplicate, SHA_A)
+        assert not os.path.exists(duplicate)
+        assert store.exists(SHA_A)
+
+        assert store.remove(SHA_A) and not store.remove(SHA_A)
+
+        store.store(_spooled(tmp, b'one'), SHA_A)
+        assert not store.remove(SHA_A, still_needed=lambda: True)
+        assert store.exists(SHA_A)
+        assert store.remove(SHA_A, still_needed=lambda: False)
+        assert os.listdir(os.path.dirname(path)) == []
+
+        for bad in ('../../etc/passwd', 'AB' * 32, 'ab' * 31):
+            try:
+                store.path(bad)
+                assert False, f"expected ValueError for {bad}"
+            except ValueError:
+                pass
+    print("✓ test_blob_store_layout passed")
+
+
+def test_identical_uploads_share_a_blob():
+    backend = MemoryBackend()
+    previous = set_backend(backend)
+    original_store = upload_model.blob_store
+
+    with tempfile.TemporaryDirectory() as tmp:
+        upload_model.blob_store = BlobStore(os.path.join(tmp, 'blobs'))
+        upload_model.upload_cache.clear()
+        try:
+            first = upload_model.create_upload(_spooled(tmp, b'gif'), 'u1', 'u1.gif', 'cat.gif', 'image/gif',
+                                               3, SHA_A, 'alice')
+            upload_model.create_upload(_spooled(tmp, b'gif'), 'u2', 'u2.gif', 'cat2.gif', 'image/gif',
+                                       3, SHA_A, 'bob')
+            upload_model.create_upload(_spooled(tmp, b'png'), 'u3', 'u3.png', 'dog.png', 'image/png',
+                                       3, SHA_B, 'bob')
+
+            assert backend.find_blob(SHA_A)['refs'] == 2
+            assert backend.find_blob(SHA_B)['refs'] == 1
+            assert sorted(os.listdir(tmp)) == ['blobs']
+
+            path = upload_model.upload_path(upload_model.get_upload('u2.gif'))
+            assert path == upload_model.upload_path(first)
+            with open(path, 'rb') as f:
+                assert f.read() == b'gif'
+
+            upload_model.upload_cache.clear()
+            assert upload_model.get_upload('u1.gif')['owner'] == 'alice'
+            assert upload_model.get_upload('missing.gif') is None
+        finally:
+            upload_model.blob_store = original_store
+            upload_model.upload_cache.clear()
+            set_backend(previous)
+    print("✓ test_identical_uploads_share_a_blob passed")
+
+
+def test_failed_record_releases_reference():
+    backend = MemoryBackend()
+    previous = set_backend(backend)
+    original_store = upload_model.blob_store
+
+    with tempfile.TemporaryDirectory() as tmp:
+        upload_model.blob_store = BlobStore(os.path.join(tmp, 'blobs'))
+        try:
+            upload_model.create_upload(_spooled(tmp, b'x'), 'u1', 'u1.png', 'a.png', 'image/png', 1, SHA_A, 'alice')
+            try:
+                # Same alias again: the record insert fails
+                upload_model.create_upload(_spooled(tmp, b'x'), 'u1', 'u1.png', 'a.png', 'image/png', 1, SHA_A, 'alice')
+                assert False, "expected duplicate upload to fail"
+            except ValueError:
+                pass
+            assert backend.find_blob(SHA_A)['refs'] == 1
+        finally:
+            upload_model.blob_store = original_store
+            upload_model.upload_cache.clear()
+            set_backend(previous)
+    print("✓ test_failed_record_releases_reference passed")
+
+
+class _UploadEnv:
+    """Memory backend plus blob store and upload dir in a temp directory."""
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = MemoryBackend()
+        self.previous = set_backend(self.backend)
+        self.saved = (upload_model.blob_store, upload_model.UPLOAD_DIR, upload_model.UPLOAD_QUOTA_BYTES)
+        upload_model.blob_store = BlobStore(os.path.join(self.tmp.name, 'blobs'))
+        upload_model.UPLOAD_DIR = self.tmp.name
+        upload_model.upload_cache.clear()
+        return self
+
+    def __exit__(self, *exc):
+        upload_model.blob_store, upload_model.UPLOAD_DIR, upload_model.UPLOAD_QUOTA_BYTES = self.saved
+        upload_model.upload_cache.clear()
+        set_backend(self.previous)
+        self.tmp.cleanup()
+
+    def upload(self, n: int, sha256: str, owner: str = 'alice', size: int = 3, age: float = 0) -> dict:
+        upload = upload_model.create_upload(_spooled(self.tmp.name, b'x' * size), f'u{n}', f'u{n}.png', None,
+                                            'image/png', size, sha256, owner)
+        if age:
+            self.backend.uploads[upload['filename']]['created_at'] -= age
+        return upload
+
+
+def test_quota_is_enforced_and_released():
+    with _UploadEnv() as env:
+        upload_model.UPLOAD_QUOTA_BYTES = 10
+        env.upload(1, SHA_A, size=6)
+        assert upload_model.get_quota_usage('alice') == 6
+        assert upload_model.check_quota('alice', 4) and not upload_model.check_quota('alice', 5)
+
+        source = _spooled(env.tmp.name, b'y' * 5)
+        try:
+            upload_model.create_upload(source, 'u2', 'u2.png', None, 'image/png', 5, SHA_B, 'alice')
+            assert False, "expected UploadQuotaExceeded"
+        except upload_model.UploadQuotaExceeded:
+            pass
+        assert os.path.exists(source)
+        assert upload_model.get_quota_usage('alice') == 6
+        assert env.backend.find_blob(SHA_B) is None
+
+        env.upload(3, SHA_B, owner='bob', size=5)
+        assert upload_model.delete_upload('u1.png')
+        assert upload_model.get_quota_usage('alice') == 0
+        assert upload_model.get_upload('u1.png') is None
+    print("✓ test_quota_is_enforced_and_released passed")
+
+
+def test_orphaned_uploads_are_collected():
+    with _UploadEnv() as env:
+        env.upload(1, SHA_A, age=100)
+        env.upload(2, SHA_A, age=100)
+        env.upload(3, SHA_B, age=100)
+        env.upload(4, SHA_B)
+        env.backend.insert_message({'id': 'm1', 'username': 'alice', 'message': '', 'created_at': 1.0,
+                                    'media': {'url': '/uploads/u2.png', 'type': 'image/png'}})
+
+        assert upload_model.collect_orphaned_uploads(grace=50, batch_size=2) == 2
+        assert upload_model.get_upload('u1.png') is None and upload_model.get_upload('u3.png') is None
+        assert upload_model.get_upload('u2.png') and upload_model.get_upload('u4.png')
+        assert upload_model.get_quota_usage('alice') == 6
+
+        # Each blob still has a live alias
+        assert upload_model.blob_store.exists(SHA_A) and upload_model.blob_store.exists(SHA_B)
+
+        assert upload_model.delete_upload('u4.png')
+        assert not upload_model.blob_store.exists(SHA_B)
+        assert env.backend.find_blob(SHA_B) is None
+    print("✓ test_orphaned_uploads_are_collected passed")
+
+
+def test_unreferenced_blobs_and_legacy_files_are_collected():
+    with _UploadEnv() as env:
+        upload_model.blob_store.store(_spooled(env.tmp.name, b'z'), SHA_A)
+        env.backend.add_blob_ref(SHA_A, 1, 'image/png')
+        env.backend.release_blob_ref(SHA_A)
+        assert upload_model.collect_unreferenced_blobs() == 1
+        assert not upload_model.blob_store.exists(SHA_A)
+
+        old = time.time() - 100
+        for name in ('old-linked.png', 'old-orphan.png', 'new-orphan.png', '.upload-x.part'):
+            path = os.path.join(env.tmp.name, name)
+            open(path, 'wb').close()
+            if name.startswith(('old', '.')):
+                os.utime(path, (old, old))
+        env.backend.insert_message({'id': 'm1', 'username': 'alice', 'message': '', 'created_at': 1.0,
+                                    'media': {'url': '/uploads/old-linked.png', 'type': 'image/png'}})
+
+        assert upload_model.collect_legacy_uploads(grace=50, batch_size=1) == 1
+        remaining = sorted(name for name in os.listdir(env.tmp.name) if name != 'blobs' and 'tmp' not in name)
+        assert remaining == ['.upload-x.part', 'new-orphan.png', 'old-linked.png']
+    print("✓ test_unreferenced_blobs_and_legacy_files_are_collected passed")
+
+
+def test_upload_racing_blob_removal_keeps_the_file():
+    with _UploadEnv() as env:
+        env.upload(1, SHA_A)
+        delete_blob = env.backend.delete_blob
+
+        def delete_then_upload(sha256):
+            # Another process uploads the same content right after the
+            # record is deleted, before the file is removed
+            deleted = delete_blob(sha256)
+            env.upload(2, SHA_A)
+            return deleted
+
+        env.backend.delete_blob = delete_then_upload
+        assert upload_model.delete_upload('u1.png')
+
+        assert upload_model.blob_store.exists(SHA_A)
+        assert env.backend.find_blob(SHA_A)['refs'] == 1
+        assert upload_model.get_upload('u2.png')
+    print("✓ test_upload_racing_blob_removal_keeps_the_file passed")
+
+
+if __name__ == "__main__":
+    print("Running Upload Storage Tests...\n")
+
+    test_blob_store_layout()
+    test_identical_uploads_share_a_blob()
+    test_failed_record_releases_reference()
+    test_quota_is_enforced_and_released()
+    test_orphaned_uploads_are_collected()
+    test_unreferenced_blobs_and_legacy_files_are_collected()
+    test_upload_racing_blob_removal_keeps_the_file()
+
+    print("\n✅ All 7 upload storage tests passed!")
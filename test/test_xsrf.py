@@ -0,0 +1,135 @@
+import time
+import models.session as session
+from core.request import Request
+from database.backends.memory import MemoryBackend
+from database.storage import set_backend
+from routes import chat
+
+
+def test_signed_token_round_trip():
+    token = session.create_signed_xsrf_token("alice", "auth-token-1")
+
+    assert session.verify_signed_xsrf_token("alice", token, "auth-token-1")
+    print("✓ test_signed_token_round_trip passed")
+
+
+def test_signed_token_bound_to_session_and_user():
+    token = session.create_signed_xsrf_token("alice", "auth-token-1")
+
+    assert not session.verify_signed_xsrf_token("alice", token, "auth-token-2")
+    assert not session.verify_signed_xsrf_token("bob", token, "auth-token-1")
+    print("✓ test_signed_token_bound_to_session_and_user passed")
+
+
+def test_tampered_token_rejected():
+    token = session.create_signed_xsrf_token("alice", "auth-token-1")
+    kid, issued_at, signature = token.split('.')
+
+    assert not session.verify_signed_xsrf_token("alice", f"{kid}.{int(issued_at) + 1}.{signature}", "auth-token-1")
+    assert not session.verify_signed_xsrf_token("alice", f"unknown.{issued_at}.{signature}", "auth-token-1")
+    assert not session.verify_signed_xsrf_token("alice", "garbage", "auth-token-1")
+    print("✓ test_tampered_token_rejected passed")
+
+
+def test_expired_token_rejected():
+    original_max_age = session.XSRF_TOKEN_MAX_AGE
+    session.XSRF_TOKEN_MAX_AGE = -1
+
+    try:
+        token = session.create_signed_xsrf_token("alice", "auth-token-1")
+        assert not session.verify_signed_xsrf_token("alice", token, "auth-token-1")
+    finally:
+        session.XSRF_TOKEN_MAX_AGE = original_max_age
+
+    print("✓ test_expired_token_rejected passed")
+
+
+def test_token_lasts_as_long_as_the_session():
+    assert session.XSRF_TOKEN_MAX_AGE >= session.SESSION_MAX_LIFETIME
+
+    # Issued at login two hours ago, still in use by a live session
+    issued_at = int(time.time()) - 7200
+    signature = session._sign_xsrf(session.XSRF_KEYS[session.XSRF_SIGNING_KID],
+                                   session._hash_token("auth-token-1"), "alice", issued_at)
+    token = f"{session.XSRF_SIGNING_KID}.{issued_at}.{signature}"
+
+    assert session.verify_signed_xsrf_token("alice", token, "auth-token-1")
+    print("✓ test_token_lasts_as_long_as_the_session passed")
+
+
+def test_key_rotation():
+    original = (session.XSRF_SIGNING_KID, session.XSRF_KEYS)
+
+    try:
+        session.XSRF_SIGNING_KID, session.XSRF_KEYS = 'k1', {'k1': b'old-secret'}
+        old_token = session.create_signed_xsrf_token("alice", "auth-token-1")
+
+        session.XSRF_SIGNING_KID, session.XSRF_KEYS = 'k2', {'k2': b'new-secret', 'k1': b'old-secret'}
+        new_token = session.create_signed_xsrf_token("alice", "auth-token-1")
+        assert new_token.startswith('k2.')
+        assert session.verify_signed_xsrf_token("alice", old_token, "auth-token-1")
+        assert session.verify_signed_xsrf_token("alice", new_token, "auth-token-1")
+
+        session.XSRF_KEYS = {'k2': b'new-secret'}
+        assert not session.verify_signed_xsrf_token("alice", old_token, "auth-token-1")
+    finally:
+        session.XSRF_SIGNING_KID, session.XSRF_KEYS = original
+
+    print("✓ test_key_rotation passed")
+
+
+def test_hmac_mode_requires_session():
+    original_mode = session.XSRF_MODE
+    session.XSRF_MODE = 'hmac'
+
+    try:
+        token = session.create_xsrf_token("alice", "auth-token-1")
+        assert session.verify_xsrf_token("alice", token, "auth-token-1")
+        assert not session.verify_xsrf_token("alice", token)
+    finally:
+        session.XSRF_MODE = original_mode
+
+    print("✓ test_hmac_mode_requires_session passed")
+
+
+def test_non_ascii_token_rejected():
+    previous = set_backend(MemoryBackend())
+    original_mode = session.XSRF_MODE
+
+    try:
+        for mode in ('db', 'hmac'):
+            session.XSRF_MODE = mode
+            auth_token, xsrf_token = session.create_session_with_xsrf("alice")
+
+            for forged in ('%C3%A9', xsrf_token + '%C3%A9'):
+                body = f"message=hi&xsrf_token={forged}".encode()
+                request = Request(
+                    b"POST /chat-messages HTTP/1.1\r\n"
+                    b"Content-Type: application/x-www-form-urlencoded\r\n"
+                    b"Cookie: auth_token=" + auth_token.encode() + b"\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                response = chat.router.route(request)
+                assert response.startswith(b"HTTP/1.1 403"), response[:40]
+    finally:
+        session.XSRF_MODE = original_mode
+        session.session_cache.clear()
+        session.xsrf_cache.clear()
+        set_backend(previous)
+
+    print("✓ test_non_ascii_token_rejected passed")
+
+
+if __name__ == "__main__":
+    print("Running XSRF Tests...\n")
+
+    test_signed_token_round_trip()
+    test_signed_token_bound_to_session_and_user()
+    test_tampered_token_rejected()
+    test_expired_token_rejected()
+    test_token_lasts_as_long_as_the_session()
+    test_key_rotation()
+    test_hmac_mode_requires_session()
+    test_non_ascii_token_rejected()
+
+    print("\n✅ All 8 XSRF tests passed!")
@@ -0,0 +1,80 @@
+import os
+import re
+import threading
+
+_SHA256_RE = re.compile(r'[0-9a-f]{64}')
+
+
+class BlobStore:
+    """Content-addressed files under root, named by their SHA-256.
+
+    A blob lives at <root>/ab/cd/<hash> (the first two byte pairs of the
+    hash as directories) so no directory grows past 65536 entries. Blobs
+    are immutable; storing content that is already present replaces the
+    file with an identical copy.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def relative_path(self, sha256: str) -> str:
+        """The blob's path below root ("ab/cd/<hash>"), '/'-separated."""
+        if not _SHA256_RE.fullmatch(sha256):
+            raise ValueError(f"Invalid blob hash: {sha256!r}")
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.root, *self.relative_path(sha256).split('/'))
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.isfile(self.path(sha256))
+
+    def store(self, source: str, sha256: str) -> bool:
+        """Move the file at source into the store as sha256.
+
+        source must be on the same filesystem as root. The new copy always
+        replaces any existing file rather than being dropped, so a blob
+        removed by another process between the existence check and the
+        rename is put back. Writers storing the same hash at once are safe:
+        the copies are identical, so whichever rename lands last wins.
+
+        Returns:
+            bool: True if a new blob was created, False if it already existed
+        """
+        target = self.path(sha256)
+        existed = os.path.isfile(target)
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+        return not existed
+
+    def remove(self, sha256: str, still_needed=None) -> bool:
+        """Delete a blob's file.
+
+        With still_needed, the file is first renamed aside and still_needed()
+        is called; if it returns True (another process took a reference in
+        the meantime) the file is renamed back instead of deleted.
+
+        Returns:
+            bool: True if the file was deleted
+        """
+        path = self.path(sha256)
+        if still_needed is None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                return False
+            return True
+
+        aside = f"{path}.{os.getpid()}.{threading.get_ident()}.removing"
+        try:
+            os.replace(path, aside)
+        except FileNotFoundError:
+            return False
+
+        if still_needed():
+            os.replace(aside, path)
+            return False
+
+        os.remove(aside)
+        return True
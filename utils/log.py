@@ -0,0 +1,199 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+from utils import metrics
+
+# debug, info, warning or error
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'info').upper()
+# 'logfmt' (key=value, default) or 'json'
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'logfmt')
+# Records waiting for the writer thread; beyond this they are dropped
+# rather than blocking the request that logged them
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+LOGGER_NAME = 'chat'
+
+LOG_RECORDS_DROPPED = metrics.counter(
+    'log_records_dropped_total', 'Log records dropped because the log queue was full.')
+
+# Correlation id of the request the current thread is handling
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+_listener = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def set_request_id(request_id: str | None) -> contextvars.Token:
+    """Tag every record logged from this thread with request_id.
+
+    Each connection runs in its own thread, which starts with an empty
+    context, so ids never leak between requests.
+    """
+    return _request_id.set(request_id)
+
+
+def get_request_id() -> str | None:
+    return _request_id.get()
+
+
+class StructuredLogger:
+    """Logger taking a short message plus key/value fields.
+
+        log.info("Upload stored", filename=name, size=size)
+
+    The level is checked before anything else, so a disabled call costs
+    one comparison; fields are only rendered by the writer thread.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def _log(self, level: int, message: str, fields: dict, exc_info=None):
+        if not self.logger.isEnabledFor(level):
+            return
+        self.logger.log(level, message, exc_info=exc_info,
+                        extra={'fields': fields, 'request_id': _request_id.get()})
+
+    def is_enabled_for(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def debug(self, message: str, **fields):
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message: str, **fields):
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message: str, **fields):
+        self._log(logging.WARNING, message, fields)
+
+    def error(self, message: str, **fields):
+        self._log(logging.ERROR, message, fields)
+
+    def exception(self, message: str, **fields):
+        """Log at error level with the current exception's traceback."""
+        self._log(logging.ERROR, message, fields, exc_info=True)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Logger for a module, e.g. get_logger(__name__)."""
+    return StructuredLogger(logging.getLogger(f"{LOGGER_NAME}.{name}"))
+
+
+def _logfmt_value(value) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' "=\\\n'):
+        return json.dumps(text)
+    return text
+
+
+class LogfmtFormatter(logging.Formatter):
+    """ts=... level=info logger=chat.x msg="..." request_id=... key=value"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            f"ts={self.formatTime(record)}",
+            f"level={record.levelname.lower()}",
+            f"logger={record.name}",
+            f"msg={_logfmt_value(record.getMessage())}",
+        ]
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            parts.append(f"request_id={request_id}")
+        for key, value in getattr(record, 'fields', {}).items():
+            parts.append(f"{key}={_logfmt_value(value)}")
+        if record.exc_text:
+            parts.append(f"exc={_logfmt_value(record.exc_text)}")
+        return ' '.join(parts)
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z"
+
+
+class JsonFormatter(LogfmtFormatter):
+    """One JSON object per line, same keys as LogfmtFormatter."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': self.formatTime(record),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            data['request_id'] = request_id
+        data.update(getattr(record, 'fields', {}))
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without formatting them.
+
+    The stock QueueHandler renders the message in the caller's thread;
+    here only a traceback is rendered up front (it cannot outlive the
+    except block), and a full queue drops the record instead of blocking.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, stream=None):
+    """Route the application's loggers through a queue to a background
+    thread that writes them to stream (stdout by default).
+
+    Safe to call again; the previous writer is flushed and replaced.
+
+    Returns:
+        logging.handlers.QueueListener: The running writer
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == 'json' else LogfmtFormatter())
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [_QueueHandler(log_queue)]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,247 @@
+import bisect
+import math
+import threading
+
+# Seconds; covers sub-millisecond cache hits up to slow uploads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bytes
+SIZE_BUCKETS = (128, 1024, 8 * 1024, 64 * 1024, 512 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _check(self, labelvalues: tuple):
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+
+    def expose(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for labelvalues, value in sorted(self.collect().items()):
+            lines.extend(self._sample_lines(labelvalues, value))
+        return lines
+
+
+class _ShardedMetric(_Metric):
+    """Updates go to a dict owned by the calling thread, so recording takes
+    no lock; collect merges the shards. Shards of threads that have exited
+    are folded into a retired total and dropped, so per-connection threads
+    do not accumulate."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: list[tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def collect(self) -> dict:
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    for key, value in list(shard.items()):
+                        self._merge(self._retired, key, value)
+            self._shards = live
+
+            merged = {key: self._copy(value) for key, value in self._retired.items()}
+            for _, shard in live:
+                # list() copies in one step under the GIL, so a concurrent
+                # insert by the owning thread cannot break the iteration
+                for key, value in list(shard.items()):
+                    self._merge(merged, key, value)
+
+        return merged
+
+
+class Counter(_ShardedMetric):
+    """Monotonically increasing count."""
+
+    type = 'counter'
+
+    def inc(self, *labelvalues, amount: float = 1):
+        shard = self._shard()
+        try:
+            shard[labelvalues] += amount
+        except KeyError:
+            self._check(labelvalues)
+            shard[labelvalues] = amount
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def _merge(target: dict, key, value):
+        target[key] = target.get(key, 0) + value
+
+    def _sample_lines(self, labelvalues, value) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labelvalues)} {_format_value(value)}"]
+
+
+class Histogram(_ShardedMetric):
+    """Observations counted into fixed buckets, plus their sum and count."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues):
+        shard = self._shard()
+        state = shard.get(labelvalues)
+        if state is None:
+            self._check(labelvalues)
+            # one count per bucket, then +Inf, sum
+            state = shard[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @staticmethod
+    def _copy(value):
+        return list(value)
+
+    @staticmethod
+    def _merge(target: dict, key, value):
+        current = target.get(key)
+        if current is None:
+            target[key] = list(value)
+        else:
+            for i, v in enumerate(value):
+                current[i] += v
+
+    def _sample_lines(self, labelvalues, state) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), state):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}")
+        labels = _labels(self.labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A value that goes up and down. Set rarely enough that a lock is fine;
+    set_function reads the value at scrape time instead."""
+
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._lock = threading.Lock()
+        # An unlabelled gauge reads 0 until first set, rather than missing
+        self._values: dict = {} if self.labelnames else {(): 0}
+        self._function = None
+
+    def set(self, value: float, *labelvalues):
+        self._check(labelvalues)
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues, amount: float = 1):
+        self._check(labelvalues)
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set_function(self, function):
+        """Report function() (no labels) instead of a stored value."""
+        self._function = function
+
+    def collect(self) -> dict:
+        if self._function is not None:
+            return {(): self._function()}
+        with self._lock:
+            return dict(self._values)
+
+    def _sample_lines(self, labelvalues, value) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labelvalues)} {_format_value(value)}"]
+
+
+class Registry:
+    """Named metrics and their Prometheus text exposition."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Re-importing a module must not create a second series
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def get(self, name: str) -> _Metric | None:
+        with self._lock:
+            return self._metrics.get(name)
+
+    def expose(self) -> bytes:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return ('\n'.join(lines) + '\n').encode()
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
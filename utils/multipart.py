@@ -1,6 +1,24 @@
 from core.request import Request
-import typing
+import hashlib
+import os
+import tempfile
 from typing import List
+from utils.mime import detect_mime_type
+
+# Longest header block accepted for a single part
+MAX_PART_HEADER_SIZE = 16 * 1024
+# Largest non-file field kept in memory
+MAX_FIELD_SIZE = 64 * 1024
+# Bytes of a file part kept for MIME sniffing
+SNIFF_SIZE = 16
+
+
+class MultipartError(ValueError):
+    """Malformed multipart body."""
+
+
+class PayloadTooLarge(ValueError):
+    """A part exceeded its size limit."""
 
 
 class Part:
@@ -17,74 +35,242 @@ class Multipart:
         self.boundary = boundary
         self.parts = parts
 
-def parse_part(part):
-    index = part.find(b'\r\n\r\n')
-    headers = part[:index]
-    data = part[index+len(b'\r\n\r\n'):]
 
-    headers_list = headers.split(b'\r\n')
-    
+def parse_part_headers(raw: bytes) -> tuple[dict, str | None, str | None]:
+    """Parse a part's header block into (headers, field name, filename)."""
     header_dic = {}
     name = None
     filename = None
 
-    for h in headers_list:
-        h = h.decode()
-        pair = h.split(':')
-        if len(pair)==2:
-            k,v = pair[0].strip(),pair[1].strip()
-            header_dic[k] = v
+    for line in raw.split(b'\r\n'):
+        k, sep, v = line.decode('utf-8', errors='replace').partition(':')
+        if not sep:
+            continue
+        k, v = k.strip(), v.strip()
+        header_dic[k] = v
 
-            if k == 'Content-Disposition':
-                values = v.split('; ')
-                
+        if k.lower() == 'content-disposition':
+            for val in v.split(';'):
+                key, _, value = val.strip().partition('=')
+                if key == 'name':
+                    name = value.strip('"')
+                elif key == 'filename':
+                    filename = value.strip('"')
 
-                for val in values:
-                    if val.strip().startswith('name='):
-                        name = val.strip().split('=')[1].strip('"')
-                    
-                    if val.strip().startswith('filename='):
-                        filename = val.strip().split('=')[1].strip('"')
-                    
-                    
+    return header_dic, name, filename
 
-    
-    return Part(header_dic,name,filename,data)
 
+class MultipartParser:
+    """Push-style multipart/form-data parser.
 
-    
-def parse_multipart(request: Request):
+    Feed the body in chunks of any size; the handler is called with
+    part_begin(headers, name, filename), part_data(bytes) and part_end().
+    Only a rolling buffer of about one chunk plus the delimiter length is
+    held; each boundary search resumes with just a delimiter-length overlap
+    from the previous chunk.
+    """
 
-    content_type = request.get_header("Content-Type")
-    print(f"Content-Type: {content_type}")
+    PREAMBLE, HEADERS, BODY, AFTER_DELIMITER, DONE = range(5)
 
-    boundary_index = content_type.find("boundary=")
-    boundary = content_type[boundary_index+len("boundary="):]
-    print(f"Boundary extracted: '{boundary}'")
+    def __init__(self, boundary: str, handler):
+        self.handler = handler
+        self.state = self.PREAMBLE
+        self._first_delimiter = b'--' + boundary.encode()
+        self._delimiter = b'\r\n--' + boundary.encode()
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes):
+        """Parse the next chunk of the body.
+
+        Raises:
+            MultipartError: If the body is malformed
+            PayloadTooLarge: If the handler rejects a part's size
+        """
+        self._buffer += data
+
+        while True:
+            if self.state == self.PREAMBLE:
+                index = self._buffer.find(self._first_delimiter)
+                if index == -1:
+                    # Keep just enough to match a delimiter split across chunks
+                    del self._buffer[:max(0, len(self._buffer) - len(self._first_delimiter) + 1)]
+                    return
+                del self._buffer[:index + len(self._first_delimiter)]
+                self.state = self.AFTER_DELIMITER
+
+            elif self.state == self.AFTER_DELIMITER:
+                if len(self._buffer) < 2:
+                    return
+                marker = bytes(self._buffer[:2])
+                del self._buffer[:2]
+                if marker == b'--':
+                    self.state = self.DONE
+                elif marker == b'\r\n':
+                    self.state = self.HEADERS
+                else:
+                    raise MultipartError("Invalid multipart delimiter")
+
+            elif self.state == self.HEADERS:
+                index = self._buffer.find(b'\r\n\r\n')
+                if index == -1:
+                    if len(self._buffer) > MAX_PART_HEADER_SIZE:
+                        raise MultipartError("Part headers too large")
+                    return
+                headers, name, filename = parse_part_headers(bytes(self._buffer[:index]))
+                del self._buffer[:index + 4]
+                self.handler.part_begin(headers, name, filename)
+                self.state = self.BODY
+
+            elif self.state == self.BODY:
+                index = self._buffer.find(self._delimiter)
+                if index == -1:
+                    safe = len(self._buffer) - len(self._delimiter) + 1
+                    if safe > 0:
+                        self.handler.part_data(bytes(self._buffer[:safe]))
+                        del self._buffer[:safe]
+                    return
+                if index:
+                    self.handler.part_data(bytes(self._buffer[:index]))
+                del self._buffer[:index + len(self._delimiter)]
+                self.handler.part_end()
+                self.state = self.AFTER_DELIMITER
+
+            else:
+                self._buffer.clear()
+                return
+
+    def close(self):
+        """Signal the end of the body.
+
+        Raises:
+            MultipartError: If the closing delimiter was never seen
+        """
+        if self.state != self.DONE:
+            raise MultipartError("Incomplete multipart body")
+
+
+class _CollectingHandler:
+    """Keeps every part in memory (used by parse_multipart)."""
 
-    delimiter = b"--" + boundary.encode()
-    print(f"Delimiter: {delimiter[:50]}")
-    print(f"Body length: {len(request.body)}")
-    print(f"Body start: {request.body[:200]}")
+    def __init__(self):
+        self.parts = []
+        self._chunks = None
+        self._part = None
 
-    parts_data = request.body.split(delimiter)
-    print(f"Split into {len(parts_data)} parts")
+    def part_begin(self, headers, name, filename):
+        self._part = (headers, name, filename)
+        self._chunks = []
 
-    parts = []
+    def part_data(self, data):
+        self._chunks.append(data)
 
-    for part in parts_data[1:-1]:
+    def part_end(self):
+        headers, name, filename = self._part
+        self.parts.append(Part(headers, name, filename, b''.join(self._chunks)))
 
-        part = parse_part(part)
-        parts.append(part)
 
+class SpooledFile:
+    """A file part written to disk while it was received."""
 
-    return Multipart(boundary,parts)
+    def __init__(self, name: str, filename: str, path: str):
+        self.name = name
+        self.filename = filename
+        self.path = path
+        self.size = 0
+        self.sha256 = None
+        self.mime_type = None
+        self.extension = None
+
+
+class SpoolingHandler:
+    """Parser handler that streams file parts to temp files.
+
+    File parts are written to a temp file in directory while their SHA-256
+    is computed and their first bytes are kept for MIME sniffing; other
+    fields are kept in memory up to MAX_FIELD_SIZE. A file part larger than
+    max_file_size raises PayloadTooLarge as soon as it crosses the limit.
+    """
+
+    def __init__(self, directory: str, max_file_size: int):
+        self.directory = directory
+        self.max_file_size = max_file_size
+        self.files: list[SpooledFile] = []
+        self.fields: dict[str, str] = {}
+        self._file = None
+        self._current = None
+        self._hash = None
+        self._head = b''
+        self._field = None
+
+    def part_begin(self, headers, name, filename):
+        if filename:
+            fd, path = tempfile.mkstemp(dir=self.directory, prefix='.upload-', suffix='.part')
+            # mkstemp creates 0600; uploads are served by other processes
+            os.fchmod(fd, 0o644)
+            self._file = os.fdopen(fd, 'wb')
+            self._current = SpooledFile(name, filename, path)
+            self._hash = hashlib.sha256()
+            self._head = b''
+            self.files.append(self._current)
+        else:
+            self._field = (name, bytearray())
+
+    def part_data(self, data):
+        if self._current is None:
+            name, value = self._field
+            value += data
+            if len(value) > MAX_FIELD_SIZE:
+                raise PayloadTooLarge(f"Field {name} is too large")
+            return
+
+        self._current.size += len(data)
+        if self._current.size > self.max_file_size:
+            raise PayloadTooLarge("File is too large")
+
+        if len(self._head) < SNIFF_SIZE:
+            self._head += data[:SNIFF_SIZE - len(self._head)]
+        self._hash.update(data)
+        self._file.write(data)
 
-    
+    def part_end(self):
+        if self._current is None:
+            name, value = self._field
+            self.fields[name] = value.decode('utf-8', errors='replace')
+            self._field = None
+            return
+
+        self._file.close()
+        self._current.sha256 = self._hash.hexdigest()
+        self._current.mime_type, self._current.extension = detect_mime_type(self._head)
+        self._file = None
+        self._current = None
+
+    def file(self, name: str) -> SpooledFile | None:
+        """First file part with the given field name."""
+        for spooled in self.files:
+            if spooled.name == name and spooled.filename:
+                return spooled
+        return None
+
+    def discard(self, keep: SpooledFile = None):
+        """Delete every temp file except keep."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for spooled in self.files:
+            if spooled is not keep and os.path.exists(spooled.path):
+                os.remove(spooled.path)
+
+
+def parse_multipart(request: Request):
+    """Parse a fully buffered multipart request into in-memory parts."""
+    content_type = request.get_header("Content-Type")
+
+    boundary_index = content_type.find("boundary=")
+    boundary = content_type[boundary_index+len("boundary="):]
 
-       
-if __name__ == "__main__":
-    multipart_request = b'''POST /form-path HTTP/1.1\r\nHost: localhost:8080\r\nContent-Type: multipart/form-data; boundary=---------------------------123456789012345678901234567890\r\nContent-Length: <length>\r\n\r\n-----------------------------123456789012345678901234567890\r\nContent-Disposition: form-data; name="text_field1"\r\n\r\nText data for field 1\r\n-----------------------------123456789012345678901234567890\r\nContent-Disposition: form-data; name="text_field2"\r\n\r\nText data for field 2\r\n-----------------------------123456789012345678901234567890\r\nContent-Disposition: form-data; name="file_field1"; filename="example.txt"\r\nContent-Type: text/plain\r\n\r\nContents of example.txt file...\r\n-----------------------------123456789012345678901234567890\r\nContent-Disposition: form-data; name="image_field1"; filename="image1.jpg"\r\nContent-Type: image/jpeg\r\n\r\n<JPEG binary data>\r\n-----------------------------123456789012345678901234567890\r\nContent-Disposition: form-data; name="text_field3"\r\n\r\nText data for field 3\r\n-----------------------------123456789012345678901234567890\r\nContent-Disposition: form-data; name="file_field2"; filename="example2.txt"\r\nContent-Type: text/plain\r\n\r\nContents of example2.txt file...\r\n-----------------------------123456789012345678901234567890\r\nContent-Disposition: form-data; name="image_field2"; filename="image2.jpg"\r\nContent-Type: image/jpeg\r\n\r\n<JPEG binary data>\r\n-----------------------------123456789012345678901234567890--\r\n'''
-    parse_multipart(Request(multipart_request))
-    
+    handler = _CollectingHandler()
+    parser = MultipartParser(boundary, handler)
+    parser.feed(request.body)
 
+    return Multipart(boundary, handler.parts)
@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from core.errors import ServiceUnavailable
+
+# bcrypt work factor for new hashes; existing hashes keep their own cost.
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+
+# Worker processes dedicated to hashing. 0 hashes inline on the caller's
+# thread (useful for tests and single-user development).
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+# Hashes allowed in flight (running + waiting). Beyond this new requests
+# are rejected immediately instead of queueing behind a login storm.
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', PASSWORD_HASH_WORKERS * 4 or 4))
+
+# Optional CPU list ("2,3") the hashing workers are pinned to.
+PASSWORD_HASH_CPUS = os.environ.get('PASSWORD_HASH_CPUS', '')
+
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 30))
+
+
+class HasherBusy(ServiceUnavailable):
+    """Raised when the password hashing queue is full, a hash takes longer
+    than PASSWORD_HASH_TIMEOUT, or the hashing pool broke."""
+
+
+def _pin_worker(cpus: tuple[int, ...]):
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated, bounded process pool.
+
+    Hashing never happens on request threads, so a burst of logins only
+    competes for the hashing workers' cores.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE_SIZE,
+                 rounds: int = BCRYPT_ROUNDS, cpus: str = PASSWORD_HASH_CPUS):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.rounds = rounds
+        self.cpus = tuple(int(cpu) for cpu in cpus.split(',') if cpu.strip())
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_pin_worker,
+                    initargs=(self.cpus,)
+                )
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy("Password hashing queue is full")
+
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+
+        executor = None
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        except BaseException as e:
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self._discard_executor(executor)
+                raise HasherBusy("Password hashing pool is unavailable") from e
+            raise
+
+        # The slot is held until the job actually finishes, not until the
+        # caller stops waiting, so timed-out jobs still count against
+        # queue_size while they occupy a worker.
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+        except FutureTimeoutError as e:
+            # Drops the job if it has not started yet
+            future.cancel()
+            raise HasherBusy("Password hashing timed out") from e
+        except BrokenProcessPool as e:
+            self._discard_executor(executor)
+            raise HasherBusy("Password hashing pool is unavailable") from e
+
+    def _discard_executor(self, executor):
+        """Forget a broken pool (e.g. a worker was OOM-killed) so the next
+        call starts a fresh one."""
+        with self._lock:
+            if executor is not None and self._executor is executor:
+                self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def hash(self, password: str) -> bytes:
+        return self._run(_hashpw, password.encode('utf-8'), self.rounds)
+
+    def check(self, password: str, hashed: bytes) -> bool:
+        return self._run(_checkpw, password.encode('utf-8'), hashed)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password: str) -> bytes:
+    """Hash a password with bcrypt on the hashing pool.
+
+    Raises:
+        HasherBusy: If the hashing queue is full
+    """
+    return password_hasher.hash(password)
+
+
+def check_password(password: str, hashed: bytes) -> bool:
+    """Check a password against a bcrypt hash on the hashing pool.
+
+    Raises:
+        HasherBusy: If the hashing queue is full
+    """
+    return password_hasher.check(password, hashed)
@@ -0,0 +1,285 @@
+import bisect
+import html
+import json
+import os
+import re
+import sys
+import threading
+from array import array
+
+SNAPSHOT_VERSION = 2
+
+# Query tokens shorter than this match whole terms only; shorter prefixes
+# would union most of the index on every search
+SEARCH_MIN_PREFIX = int(os.environ.get('SEARCH_MIN_PREFIX', 3))
+# Terms a single prefix may expand to (alphabetically first ones win)
+SEARCH_MAX_PREFIX_TERMS = int(os.environ.get('SEARCH_MAX_PREFIX_TERMS', 64))
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens; HTML entities are decoded first so escaped
+    text matches what users typed."""
+    return _TOKEN_RE.findall(html.unescape(text).lower())
+
+
+def _intersect(left: array, right: array) -> array:
+    result = array('I')
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] == right[j]:
+            result.append(left[i])
+            i += 1
+            j += 1
+        elif left[i] < right[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+class SearchIndex:
+    """Thread-safe in-memory inverted index over short documents.
+
+    Documents get increasing integer numbers in the order they are added,
+    and every posting list is an array('I') of those numbers in ascending
+    order, so adding the newest document is an append and a higher number
+    means a more recent document. Terms are also kept in a sorted list for
+    prefix lookups.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: dict[str, array] = {}
+        self._terms: list[str] = []
+        # doc number -> key (None once removed), and the reverse
+        self._keys: list = []
+        self._numbers: dict = {}
+        self._high_water = None
+
+    def add(self, key, text: str, sort_key=None) -> bool:
+        """Index text under key. Adding an existing key is a no-op.
+
+        Args:
+            key: Document key returned by search
+            text: Text to tokenize
+            sort_key: Remembered for the newest document (see high_water)
+
+        Returns:
+            bool: False if key was already indexed
+        """
+        terms = set(tokenize(text))
+
+        with self._lock:
+            if key in self._numbers:
+                return False
+
+            number = len(self._keys)
+            self._keys.append(key)
+            self._numbers[key] = number
+            self._high_water = sort_key
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = array('I')
+                    bisect.insort(self._terms, term)
+                postings.append(number)
+
+            return True
+
+    def remove(self, key, text: str = None) -> bool:
+        """Drop a document.
+
+        Without its text the document is only tombstoned: it stops matching,
+        but its numbers stay in the posting lists.
+        """
+        with self._lock:
+            number = self._numbers.pop(key, None)
+            if number is None:
+                return False
+
+            self._keys[number] = None
+
+            for term in set(tokenize(text)) if text else ():
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                index = bisect.bisect_left(postings, number)
+                if index < len(postings) and postings[index] == number:
+                    del postings[index]
+                if not postings:
+                    del self._postings[term]
+                    del self._terms[bisect.bisect_left(self._terms, term)]
+
+            return True
+
+    def _prefix_postings(self, prefix: str) -> array:
+        if len(prefix) < SEARCH_MIN_PREFIX:
+            return self._postings.get(prefix, array('I'))
+
+        start = bisect.bisect_left(self._terms, prefix)
+        lists = []
+        for term in self._terms[start:start + SEARCH_MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            lists.append(self._postings[term])
+
+        if len(lists) == 1:
+            return lists[0]
+        return array('I', sorted(set().union(*lists)))
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """Keys of documents containing every query token, newest first.
+
+        Tokens of at least SEARCH_MIN_PREFIX characters also match indexed
+        terms they are a prefix of (up to SEARCH_MAX_PREFIX_TERMS of them);
+        shorter tokens match whole terms only.
+        """
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+
+        with self._lock:
+            matches = None
+            for postings in sorted((self._prefix_postings(t) for t in tokens), key=len):
+                matches = postings if matches is None else _intersect(matches, postings)
+                if not matches:
+                    return []
+
+            keys = []
+            for number in reversed(matches):
+                key = self._keys[number]
+                if key is not None:
+                    keys.append(key)
+                    if len(keys) == limit:
+                        break
+            return keys
+
+    def high_water(self):
+        """sort_key of the most recently added document, or None."""
+        with self._lock:
+            return self._high_water
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._numbers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'documents': len(self._numbers),
+                'terms': len(self._terms),
+                'postings': sum(len(p) for p in self._postings.values()),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._postings = {}
+            self._terms = []
+            self._keys = []
+            self._numbers = {}
+            self._high_water = None
+
+    def save(self, path: str):
+        """Write a snapshot atomically (temp file + rename).
+
+        The file is a JSON header line (keys, high water mark, terms and
+        posting list lengths) followed by the posting lists' raw uint32
+        data. Only references are taken under the lock; the lists are
+        copied and written outside it, cut at the documents that existed
+        when the references were taken.
+        """
+        with self._lock:
+            postings = list(self._postings.items())
+            keys = list(self._keys)
+            high_water = self._high_water
+
+        count = len(keys)
+        terms = []
+        chunks = []
+        for term, numbers in postings:
+            # Slicing is atomic, so concurrent appends and removals cannot
+            # tear it; anything added after the references were taken is cut
+            numbers = numbers[:]
+            del numbers[bisect.bisect_left(numbers, count):]
+            if numbers:
+                terms.append([term, len(numbers)])
+                chunks.append(numbers.tobytes())
+
+        header = {
+            'version': SNAPSHOT_VERSION,
+            'byteorder': sys.byteorder,
+            'itemsize': array('I').itemsize,
+            'keys': keys,
+            'high_water': high_water,
+            'terms': terms,
+        }
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header, separators=(',', ':')).encode() + b'\n')
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """Replace the index with a snapshot written by save.
+
+        Returns:
+            bool: False if there is no usable snapshot at path
+        """
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                data = f.read()
+            postings = _read_postings(header, data)
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        if postings is None:
+            return False
+
+        keys = header['keys']
+        high_water = header['high_water']
+        if isinstance(high_water, list):
+            high_water = tuple(high_water)
+
+        with self._lock:
+            self._postings = postings
+            self._terms = sorted(postings)
+            self._keys = keys
+            self._high_water = high_water
+            self._numbers = {key: number for number, key in enumerate(keys) if key is not None}
+
+        return True
+
+
+def _read_postings(header, data: bytes) -> dict[str, array] | None:
+    """Posting lists from a snapshot's header and raw data, or None if the
+    snapshot is from another version or does not add up."""
+    if not isinstance(header, dict) or header.get('version') != SNAPSHOT_VERSION:
+        return None
+    if header['itemsize'] != array('I').itemsize or not isinstance(header['keys'], list):
+        return None
+
+    count = len(header['keys'])
+    itemsize = header['itemsize']
+    postings = {}
+    offset = 0
+
+    for term, length in header['terms']:
+        numbers = array('I')
+        numbers.frombytes(data[offset:offset + length * itemsize])
+        offset += length * itemsize
+        if header['byteorder'] != sys.byteorder:
+            numbers.byteswap()
+        if len(numbers) != length or not isinstance(term, str) or (numbers and numbers[-1] >= count):
+            return None
+        postings[term] = numbers
+
+    if offset != len(data):
+        return None
+
+    return postings
@@ -0,0 +1,173 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from utils import metrics
+from utils.log import get_logger
+
+# Requests slower than this are logged with their phase breakdown (0 disables)
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+# Append traces to this file in Chrome's trace event format; load it in
+# chrome://tracing or ui.perfetto.dev. Empty disables export.
+TRACE_EXPORT_PATH = os.environ.get('TRACE_EXPORT_PATH', '')
+# Export every request instead of only the slow ones
+TRACE_EXPORT_ALL = os.environ.get('TRACE_EXPORT_ALL', '0') == '1'
+
+REQUEST_PHASE_DURATION = metrics.histogram(
+    'http_request_phase_duration_seconds',
+    'Time per request phase (read, parse, route, auth, db, serialize, send); nested phases overlap.',
+    ('phase',))
+
+log = get_logger(__name__)
+
+_current = contextvars.ContextVar('trace', default=None)
+
+_export_lock = threading.Lock()
+_export_file = None
+
+
+class Trace:
+    """Spans recorded while one request is handled.
+
+    Spans are (name, start_ns, end_ns, detail) tuples in perf_counter_ns
+    time, appended when they end; they may nest (db inside auth inside
+    route). Only the thread handling the request records into it.
+    """
+
+    def __init__(self, request_id: str = None):
+        self.request_id = request_id
+        self.start_ns = time.perf_counter_ns()
+        # Wall clock at start, to place the trace on the export timeline
+        self.start_wall_ns = time.time_ns()
+        self.end_ns = None
+        self.spans: list[tuple[str, int, int, str | None]] = []
+        self.name = None
+        self.status = None
+
+    def add(self, name: str, start_ns: int, end_ns: int, detail: str = None):
+        self.spans.append((name, start_ns, end_ns, detail))
+
+    def phases(self) -> dict[str, int]:
+        """Total nanoseconds per span name."""
+        totals = {}
+        for name, start_ns, end_ns, _ in self.spans:
+            totals[name] = totals.get(name, 0) + end_ns - start_ns
+        return totals
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+    def to_events(self) -> list[dict]:
+        """The trace as Chrome trace events ("X" complete events, in µs)."""
+        pid = os.getpid()
+        tid = threading.get_ident()
+
+        def timestamp(ns):
+            return (self.start_wall_ns + ns - self.start_ns) / 1000
+
+        events = [{
+            'name': self.name or 'request', 'cat': 'request', 'ph': 'X',
+            'ts': timestamp(self.start_ns), 'dur': self.duration_ns / 1000,
+            'pid': pid, 'tid': tid,
+            'args': {'request_id': self.request_id, 'status': self.status},
+        }]
+        for name, start_ns, end_ns, detail in self.spans:
+            event = {
+                'name': name, 'cat': 'phase', 'ph': 'X',
+                'ts': timestamp(start_ns), 'dur': (end_ns - start_ns) / 1000,
+                'pid': pid, 'tid': tid,
+            }
+            if detail:
+                event['args'] = {'detail': detail}
+            events.append(event)
+        return events
+
+
+def start_trace(request_id: str = None) -> Trace:
+    """Begin tracing the request handled by this thread."""
+    trace = Trace(request_id)
+    _current.set(trace)
+    return trace
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, detail: str = None):
+    """Time the block as a phase of the current request (a no-op when no
+    request is being traced, e.g. in background workers)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+
+    start_ns = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        trace.add(name, start_ns, time.perf_counter_ns(), detail)
+
+
+def record_span(name: str, start_ns: int, detail: str = None):
+    """Add a span that started at start_ns and ends now, for callers that
+    already keep their own perf_counter_ns timestamp."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, start_ns, time.perf_counter_ns(), detail)
+
+
+def discard_trace():
+    """Stop tracing without recording anything (e.g. the connection
+    became a long-lived WebSocket)."""
+    _current.set(None)
+
+
+def finish_trace():
+    """End the current request's trace: record its phases, log it if it
+    was slow, and export it if configured."""
+    trace = _current.get()
+    if trace is None:
+        return
+    _current.set(None)
+    trace.end_ns = time.perf_counter_ns()
+
+    phases = trace.phases()
+    for name, total_ns in phases.items():
+        REQUEST_PHASE_DURATION.observe(total_ns / 1e9, name)
+
+    duration_ms = trace.duration_ns / 1e6
+    slow = SLOW_REQUEST_MS > 0 and duration_ms >= SLOW_REQUEST_MS
+
+    if slow:
+        breakdown = {f"{name}_ms": round(total_ns / 1e6, 3) for name, total_ns in phases.items()}
+        log.warning("Slow request", request=trace.name, status=trace.status,
+                    duration_ms=round(duration_ms, 3), **breakdown)
+
+    if TRACE_EXPORT_PATH and (slow or TRACE_EXPORT_ALL):
+        export_trace(trace)
+
+
+def export_trace(trace: Trace, path: str = None):
+    """Append a trace's events to a Chrome trace event file.
+
+    The file is a JSON array left open at the end, which the trace viewers
+    accept, so traces can be appended without rewriting it.
+    """
+    global _export_file
+
+    data = ''.join(json.dumps(event) + ',\n' for event in trace.to_events())
+
+    with _export_lock:
+        if _export_file is None or _export_file.name != (path or TRACE_EXPORT_PATH):
+            if _export_file is not None:
+                _export_file.close()
+            _export_file = open(path or TRACE_EXPORT_PATH, 'a', encoding='utf-8')
+            if _export_file.tell() == 0:
+                _export_file.write('[\n')
+        _export_file.write(data)
+        _export_file.flush()
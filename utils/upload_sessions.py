@@ -0,0 +1,225 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+# Bytes of the assembled file kept for MIME sniffing
+SNIFF_SIZE = 16
+SESSION_FILE_PREFIX = '.session-'
+SPOOL_FILE_PREFIX = '.upload-'
+PART_SUFFIX = '.part'
+
+
+class TooManyUploadSessions(Exception):
+    """The owner already has the maximum number of open sessions."""
+
+
+class UploadSession:
+    """A resumable upload: a preallocated file that chunks are written into
+    at their offsets, plus the byte ranges received so far.
+
+    Chunks may arrive in any order and in parallel; each writer calls
+    begin_write first and end_write with the range it actually wrote, even
+    if the transfer broke off partway.
+    """
+
+    def __init__(self, session_id: str, owner: str, size: int, filename: str, path: str):
+        self.id = session_id
+        self.owner = owner
+        self.size = size
+        self.filename = filename
+        self.path = path
+        self.created_at = self.updated_at = time.time()
+        self._lock = threading.Lock()
+        # Sorted, non-overlapping, non-adjacent [start, end) ranges
+        self._ranges: list[tuple[int, int]] = []
+        self._writers = 0
+        self.completing = False
+
+    def begin_write(self) -> bool:
+        """Register a chunk writer; False once the session is completing."""
+        with self._lock:
+            if self.completing:
+                return False
+            self._writers += 1
+            self.updated_at = time.time()
+            return True
+
+    def end_write(self, start: int, end: int):
+        with self._lock:
+            self._writers -= 1
+            self.updated_at = time.time()
+            if end > start:
+                self._add_range(start, end)
+
+    def touch(self):
+        with self._lock:
+            self.updated_at = time.time()
+
+    def _add_range(self, start: int, end: int):
+        merged = []
+        for range_start, range_end in self._ranges:
+            if range_end < start or range_start > end:
+                merged.append((range_start, range_end))
+            else:
+                start, end = min(start, range_start), max(end, range_end)
+        merged.append((start, end))
+        merged.sort()
+        self._ranges = merged
+
+    def begin_complete(self) -> bool:
+        """Claim the session for assembly; False if chunks are still being
+        written, another request is completing it, or bytes are missing."""
+        with self._lock:
+            if self.completing or self._writers or self._ranges != [(0, self.size)]:
+                return False
+            self.completing = True
+            return True
+
+    def abort_complete(self):
+        with self._lock:
+            self.completing = False
+
+    def idle(self, now: float, ttl: float) -> bool:
+        with self._lock:
+            return not self._writers and not self.completing and now - self.updated_at > ttl
+
+    def progress(self) -> dict:
+        with self._lock:
+            ranges = list(self._ranges)
+
+        missing = []
+        position = 0
+        for start, end in ranges:
+            if start > position:
+                missing.append([position, start])
+            position = end
+        if position < self.size:
+            missing.append([position, self.size])
+
+        return {
+            'id': self.id,
+            'size': self.size,
+            'filename': self.filename,
+            # Contiguous bytes from the start, for clients that upload in order
+            'offset': ranges[0][1] if ranges and ranges[0][0] == 0 else 0,
+            'received': sum(end - start for start, end in ranges),
+            'missing': missing,
+            'complete': not missing,
+        }
+
+    def digest(self, read_size: int = 1024 * 1024) -> tuple[str, bytes]:
+        """SHA-256 of the assembled file and its first SNIFF_SIZE bytes."""
+        sha256 = hashlib.sha256()
+        head = b''
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = f.read(read_size)
+                if not chunk:
+                    break
+                if not head:
+                    head = chunk[:SNIFF_SIZE]
+                sha256.update(chunk)
+        return sha256.hexdigest(), head
+
+
+class UploadSessionStore:
+    """Open upload sessions, kept in process memory with their files in
+    directory. Sessions do not survive a restart; sweep removes the files
+    they leave behind.
+    """
+
+    def __init__(self, directory: str, max_per_owner: int):
+        self.directory = directory
+        self.max_per_owner = max_per_owner
+        self._lock = threading.Lock()
+        self._sessions: dict[str, UploadSession] = {}
+
+    def create(self, owner: str, size: int, filename: str = None) -> UploadSession:
+        """Open a session and preallocate its (sparse) file.
+
+        Raises:
+            TooManyUploadSessions: If owner already has max_per_owner sessions
+        """
+        session_id = str(uuid.uuid4())
+        path = os.path.join(self.directory, f"{SESSION_FILE_PREFIX}{session_id}{PART_SUFFIX}")
+        session = UploadSession(session_id, owner, size, filename, path)
+
+        with self._lock:
+            if sum(1 for s in self._sessions.values() if s.owner == owner) >= self.max_per_owner:
+                raise TooManyUploadSessions(owner)
+            self._sessions[session_id] = session
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            try:
+                os.ftruncate(fd, size)
+            finally:
+                os.close(fd)
+        except BaseException:
+            self.remove(session_id)
+            raise
+
+        return session
+
+    def get(self, session_id: str, owner: str = None) -> UploadSession | None:
+        """The session, if it exists and (when given) belongs to owner."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None or (owner is not None and session.owner != owner):
+            return None
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        """Forget a session and delete its file if it is still there."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        try:
+            os.remove(session.path)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def sweep(self, ttl: float, now: float = None) -> int:
+        """Remove sessions idle for longer than ttl, and session or spool
+        files older than ttl that no open session owns (left behind by a
+        restart or crash).
+
+        Returns:
+            int: Number of sessions and stray files removed
+        """
+        now = time.time() if now is None else now
+
+        with self._lock:
+            idle = [s.id for s in self._sessions.values() if s.idle(now, ttl)]
+            live_paths = {s.path for s in self._sessions.values()}
+
+        removed = sum(1 for session_id in idle if self.remove(session_id))
+
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return removed
+
+        for name in names:
+            if not name.endswith(PART_SUFFIX) or not name.startswith((SESSION_FILE_PREFIX, SPOOL_FILE_PREFIX)):
+                continue
+            path = os.path.join(self.directory, name)
+            if path in live_paths:
+                continue
+            try:
+                if now - os.stat(path).st_mtime > ttl:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)